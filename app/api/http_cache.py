@@ -0,0 +1,74 @@
+from flask import request, make_response
+
+from app.core.cache import trend_cache, body_etag, COMPRESSORS
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/xml", "text/html", "text/xml", "text/plain"}
+
+# Cache-Control profiles (browser max-age, shared/CDN s-maxage, stale-while-revalidate).
+# Routes opt in through cached_response(profile=...); anything else is revalidated on every use.
+CACHE_PROFILES = {
+    "default": "no-cache",
+    "stats": "public, max-age=10, s-maxage=15, stale-while-revalidate=30",
+    "list": "public, max-age=30, s-maxage=60, stale-while-revalidate=300",
+    "detail": "public, max-age=60, s-maxage=120, stale-while-revalidate=600",
+    "page": "public, max-age=60, s-maxage=120, stale-while-revalidate=600",
+    "sitemap": "public, max-age=300, s-maxage=600, stale-while-revalidate=3600",
+    "private": "private, no-store",
+}
+
+# Admin area must never be stored by a CDN or the browser cache
+PRIVATE_PREFIXES = ("/admin", "/api/admin")
+
+
+def cached_response(body, meta, content_type="application/json", profile="list"):
+    """
+    Response with an explicit Cache-Control profile. For bodies served from the trend cache
+    the ETag is the one stored with the entry; without meta it is computed in finalize_response.
+    """
+    response = make_response(body, 200, {"Content-Type": content_type})
+    response.headers["Cache-Control"] = CACHE_PROFILES[profile]
+    if meta and meta.get("etag"):
+        response.set_etag(meta["etag"])
+    return response
+
+
+def finalize_response(response):
+    """
+    after_request hook of the blueprint:
+    ETag / 304 handling, a conservative default Cache-Control (no-cache), and gzip/br compression with the
+    compressed body taken from (or stored in) Redis under its ETag.
+    """
+    if request.path.startswith(PRIVATE_PREFIXES):
+        response.headers["Cache-Control"] = CACHE_PROFILES["private"]
+        return response
+
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+        return response
+
+    # Not opted in: shared caches and browsers must revalidate (ETag) before reusing it
+    response.headers.setdefault("Cache-Control", CACHE_PROFILES["default"])
+
+    data = response.get_data()
+    etag, _ = response.get_etag()
+    if not etag:
+        etag = body_etag(data)
+
+    encoding = None
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add("Accept-Encoding")
+        if len(data) >= MIN_COMPRESS_SIZE:
+            encoding = request.accept_encodings.best_match(list(COMPRESSORS))
+
+    # Each encoding of the same body is a distinct representation with its own validator
+    response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    response.make_conditional(request)
+    if response.status_code != 200 or not encoding:
+        return response # 304 Not Modified, or sent uncompressed
+
+    response.set_data(trend_cache.compressed(encoding, etag, data))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -1,36 +1,74 @@
-from flask import Blueprint, jsonify, render_template, request, make_response, abort, Response, redirect
-from app.database.models import SessionLocal, Trend, RawNews, TrendArrivals, SystemSettings
-from sqlalchemy import desc, func
+from flask import Blueprint, jsonify, render_template, request, abort, Response, redirect, stream_with_context
+from app.database.models import SessionLocal, Trend, RawNews, SystemSettings
+from sqlalchemy import desc, func, tuple_
+from sqlalchemy.orm import defer, load_only
 from datetime import datetime, timedelta
 from xml.sax.saxutils import escape
 from app.config import Config
-from bs4 import BeautifulSoup
+from app.core.preprocessing import display_text, make_preview
+from app.core.cache import trend_cache, body_etag, LocalLRU
+from app.api.http_cache import cached_response, finalize_response
+from app.core.counters import stats_counters
+from app.core.relations import load_related, load_related_many
+from app.core.cards import build_card, serialize_card, latest_source
+from app.core.identifiers import identifier_index
+from app.core.archive import find_archived, load_archived
+from app.core.live_events import live_events, live_hub, CREATED
+from app.core.search import search_match, search_rank
+from app.core.rollups import resolution_for_window, load_buckets, LABEL_FORMATS
+from app.database.migrations import check_schema_version
+from app.core.export import DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, export_stream, parse_range
 import re
-import redis
 import json
-import logging
+import queue
+import base64
 import time
+import logging
 from functools import wraps
 
 # تنظیمات لاگر برای مانیتورینگ وضعیت کش
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
+# ETag/304، Cache-Control و فشرده‌سازی (gzip/br) برای همه پاسخ‌های بلوپرینت
+api_bp.after_request(finalize_response)
 
-# اتصال به کلاینت Redis برای مدیریت لایه کش
-try:
-    redis_client = redis.from_url(Config.REDIS_URL, decode_responses=True)
-    logger.info("✅ Redis Cache Layer Connected successfully.")
-except Exception as e:
-    redis_client = None
-    logger.error(f"❌ Redis Connection Failed: {e}")
+# لایه کش Redis با نسخه‌بندی (Generation) و قفل Single-Flight
+# TTL نرم: پس از آن فقط یک ورکر بازسازی می‌کند و بقیه نسخه قبلی را سرو می‌کنند
+# TTL سخت: عمر نهایی کلید در Redis (بی‌اعتبارسازی فوری از طریق نسخه‌ها انجام می‌شود)
+LIST_CACHE_SOFT_TTL = 300
+LIST_CACHE_HARD_TTL = 3600
+DETAIL_CACHE_SOFT_TTL = 1800
+DETAIL_CACHE_HARD_TTL = 86400
 
 # دسته‌بندی‌های مجاز برای سئو
 VALID_CATEGORIES = ["Siyaset", "Ekonomi", "Gündem", "Spor", "Teknoloji", "Sanat"]
 JUNK_KEYWORDS = ['burç', 'fal ', 'günlük burç', 'astroloji', 'horoskop']
 
-# In-memory cache for trend history (Simple Dictionary)
-trend_history_cache = {}
+# کش صفحات SSR ترند: لایه حافظه هر ورکر + لایه مشترک Redis؛ کلید HTML شامل شناسه و نسخه ترند است
+# (نسخه‌های قدیمی دیگر خوانده نمی‌شوند و پس از HARD_TTL از Redis حذف می‌شوند)
+PAGE_CACHE_SOFT_TTL = 600
+PAGE_CACHE_HARD_TTL = 3600
+page_memory = LocalLRU(maxsize=500, ttl=300)
+
+# جزئیات ترند: فیلدهای قابل انتخاب با fields= (به همین ترتیب سریال می‌شوند) و ستون‌های متناظر در Postgres
+DETAIL_FIELDS = ("title", "category", "tps_score", "summary", "news_list", "related_trends")
+NEWS_FIELDS = ("source", "time", "content", "preview", "link")
+TREND_COLUMNS = {"title": Trend.title, "category": Trend.category, "tps_score": Trend.final_tps, "summary": Trend.summary}
+NEWS_COLUMNS = {
+    "source": (RawNews.source_name,),
+    "time": (RawNews.published_at,),
+    "content": (RawNews.clean_content,),   # ردیف‌های Backfill نشده content را جداگانه بارگذاری می‌کنند
+    "preview": (RawNews.content_preview,),
+    "link": (RawNews.external_id,),
+}
+DETAIL_NEWS_LIMIT = 20
+BATCH_MAX_IDS = 50
+
+HISTORY_CACHE_SOFT_TTL = 60
+HISTORY_CACHE_HARD_TTL = 3600
+HISTORY_DEFAULT_HOURS = 48
+HISTORY_MAX_HOURS = 24 * 90
 
 def get_public_url():
     """محاسبه URL عمومی با در نظر گرفتن پروکسی Nginx برای سئو"""
@@ -56,35 +94,75 @@ def requires_auth(f):
         return f(*args, **kwargs)
     return decorated
 
+def news_display_content(news):
+    """
+    متن نمایشی خبر که هنگام دریافت ذخیره شده است.
+    فقط برای ردیف‌های قدیمی که هنوز Backfill نشده‌اند پاکسازی در لحظه انجام می‌شود.
+    """
+    if news.clean_content is not None:
+        return news.clean_content
+    return display_text(news.content)
+
+def news_display_preview(news, clean_content):
+    return news.content_preview if news.content_preview is not None else make_preview(clean_content)
+
+# --- Keyset Pagination Helpers ---
+def encode_cursor(trend):
+    """کرسر مات (Opaque) برای صفحه بعدی تایم‌لاین: آخرین (first_seen, id) صفحه جاری"""
+    raw = f"{trend.first_seen.isoformat()}|{trend.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """بازگرداندن (first_seen, id) از کرسر؛ برای کرسر نامعتبر ValueError می‌دهد"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        seen_str, trend_id = raw.split('|')
+        return datetime.fromisoformat(seen_str), int(trend_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
 def resolve_trend_smart(db, identifier):
     """
     جستجوی هوشمند ترند با پشتیبانی از فرمت ID-Slug برای جلوگیری از لینک‌های شکسته.
-    اولویت: 1. ID استخراج شده از ابتدای رشته 2. شناسه عددی خالص 3. اسلاگ یا کلاستر ID
+    اولویت: 0. کش شناسه‌ها (Slug فعلی/قدیمی یا کلاستر ID) 1. ID استخراج شده از ابتدای رشته
+    2. شناسه عددی خالص 3. اسلاگ یا کلاستر ID (و ثبت نتیجه در کش)
     """
+    # 0. کش مشترک شناسه‌ها: فقط یک کوئری با کلید اصلی
+    cached_id = identifier_index.lookup(identifier)
+    if cached_id is not None:
+        trend = db.get(Trend, cached_id)
+        if trend: return trend
+        identifier_index.forget(identifier)
+
     # 1. تلاش برای استخراج ID از فرمت "123-slug-name"
     match = re.match(r'^(\d+)-', identifier)
     if match:
         try:
             trend_id = int(match.group(1))
-            trend = db.query(Trend).filter(Trend.id == trend_id).first()
+            trend = db.get(Trend, trend_id)
             if trend: return trend
         except: pass
 
     # 2. جستجوی استاندارد (ID خالص، Slug یا Cluster ID)
     if identifier.isdigit():
-        return db.query(Trend).filter(Trend.id == int(identifier)).first()
+        return db.get(Trend, int(identifier))
     
-    return db.query(Trend).filter((Trend.slug == identifier) | (Trend.cluster_id == identifier)).first()
+    trend = db.query(Trend).filter((Trend.slug == identifier) | (Trend.cluster_id == identifier)).first()
+    if trend:
+        identifier_index.register(trend.id, identifier)
+    return trend
 
 @api_bp.route('/')
 def dashboard():
     """رندر کردن داشبورد اصلی (Home)"""
-    return render_template(
+    body = render_template(
         'index.html', 
         active_category="Hepsi",
+        live_url=Config.LIVE_URL,
         page_title="TrendiaTR | Yapay Zeka Haber Analizi",
         page_description="TrendiaTR ile gerçek zamanlı yapay zeka haber analizi ve Türkiye'deki son gelişmeler."
     )
+    return cached_response(body, None, content_type="text/html; charset=utf-8", profile="page")
 
 @api_bp.route('/category/<name>')
 def category_page(name):
@@ -104,147 +182,204 @@ def category_page(name):
     
     current_meta = seo_meta.get(cat_name, {"title": f"{cat_name} Haberleri", "desc": "TrendiaTR Haber Analizi"})
     
-    return render_template(
+    body = render_template(
         'index.html', 
         active_category=cat_name,
+        live_url=Config.LIVE_URL,
         page_title=current_meta["title"],
         page_description=current_meta["desc"]
     )
+    return cached_response(body, None, content_type="text/html; charset=utf-8", profile="page")
 
 @api_bp.route('/trend/<identifier>')
 def render_trend_page(identifier):
-    """رندر سمت سرور (SSR) برای صفحات جزئیات ترند"""
+    """رندر سمت سرور (SSR) برای صفحات جزئیات ترند (با کش کامل HTML)"""
+    base_url = get_public_url()
+
+    # ۱. شناسه (ID، ID-Slug، اسلاگ فعلی/قدیمی، کلاستر ID) -> شناسه ترند و تصمیم ریدایرکت کانونیکال
+    route = resolve_trend_route(identifier)
+    if route is None:
+        abort(404)
+    if route.get("redirect"):
+        return redirect(route["redirect"], code=301)
+
+    # ۲. یک نسخه HTML برای هر ترند و نسخه آن (همه شکل‌های شناسه همین ورودی را می‌خوانند)
+    trend_id = int(route["tid"])
+    cache_key = f"page_v2_{base_url}_{trend_id}_{trend_cache.trend_version(trend_id)}"
+    entry = page_memory.get(cache_key)
+    if entry is None:
+        entry = trend_cache.get_or_build(
+            cache_key,
+            lambda: build_trend_page(trend_id, base_url),
+            soft_ttl=PAGE_CACHE_SOFT_TTL, hard_ttl=PAGE_CACHE_HARD_TTL
+        )
+        if entry is None:
+            abort(404)
+        page_memory.set(cache_key, entry)
+
+    body, meta = entry
+    return cached_response(body, meta, content_type="text/html; charset=utf-8", profile="page")
+
+def resolve_trend_route(identifier):
+    """
+    مسیر یک شناسه صفحه ترند: {"tid", "ver", "redirect"?} یا None برای 404.
+    برای هر شناسه جداگانه کش می‌شود (بدنه خالی) و با نسخه ترند اعتبارسنجی می‌شود؛ تغییر اسلاگ نسخه را بالا می‌برد.
+    """
+    route_key = f"trend_route_v1_{identifier}"
+
+    def is_current(meta):
+        return trend_cache.trend_version(meta.get("tid")) == int(meta.get("ver", -1))
+
+    entry = page_memory.get(route_key)
+    if entry is None or not is_current(entry[1]):
+        entry = trend_cache.get_or_build(
+            route_key,
+            lambda: build_trend_route(identifier),
+            soft_ttl=PAGE_CACHE_SOFT_TTL, hard_ttl=PAGE_CACHE_HARD_TTL,
+            validate=is_current
+        )
+        if entry is None:
+            page_memory.discard(route_key)
+            return None
+        page_memory.set(route_key, entry)
+    return entry[1]
+
+def build_trend_route(identifier):
+    """خروجی: ("", meta) برای get_or_build یا None وقتی ترند (فعال یا آرشیو شده) پیدا نشود"""
     db = SessionLocal()
-    from app.core.ai_engine import ai_engine 
     try:
         # جستجو بر اساس اسلاگ سئو یا شناسه کلاستر
         trend = resolve_trend_smart(db, identifier)
-        
-        if not trend:
-            abort(404)
-            
+        if trend:
+            # نسخه پیش از خواندن اسلاگ ثبت می‌شود تا تغییر همزمان از دست نرود
+            version = trend_cache.trend_version(trend.id)
+            db.expire(trend)
+            trend_id, slug, cluster_id = trend.id, trend.slug, trend.cluster_id
+        else:
+            # Read-through آرشیو سرد: ترندهای قدیمی غیرفعال از فایل‌های Parquet رندر می‌شوند
+            entry = find_archived(db, identifier)
+            if not entry:
+                return None
+            version = trend_cache.trend_version(entry.trend_id)
+            trend_id, slug, cluster_id = entry.trend_id, entry.slug, entry.cluster_id
+        meta = {"tid": trend_id, "ver": version}
+
         # ریدایرکت کانونیکال برای سئو (اگر اسلاگ تغییر کرده باشد، به آدرس جدید هدایت می‌کند)
-        if trend.slug:
-            canonical_slug = f"{trend.id}-{trend.slug}"
-            # اگر درخواست با ID شروع شده ولی اسلاگش قدیمی است، ریدایرکت کن
-            if (re.match(r'^(\d+)-', identifier) or identifier.isdigit()) and identifier != canonical_slug:
-                return redirect(f"/trend/{canonical_slug}", code=301)
-            
-        news_items = db.query(RawNews).filter(RawNews.trend_id == trend.id).order_by(desc(RawNews.published_at)).limit(20).all()
-        
-        formatted_news = []
-        for n in news_items:
-            # پاک‌سازی تگ‌های HTML با BeautifulSoup
-            clean_content = n.content
-            try:
-                soup = BeautifulSoup(n.content, "html.parser")
-                # حذف تگ‌های مزاحم اگر وجود داشت
-                for script in soup(["script", "style"]):
-                    script.extract()
-                clean_content = soup.get_text()
-                # حذف فضاهای خالی اضافه
-                clean_content = " ".join(clean_content.split())
-            except Exception as e:
-                logger.error(f"Error cleaning HTML: {e}")
-                clean_content = n.content
-
-            link = n.external_id or ""
-            if link and not link.startswith('http'):
-                link = f"https://{link}"
-            
-            formatted_news.append({
-                "source": n.source_name,
-                "time": n.published_at,
-                "content": clean_content,
-                "link": link
-            })
-            
-        # دریافت اخبار مرتبط (ممکن است زمان‌بر باشد، در پایتون هندل می‌شود)
-        related_ids = ai_engine.get_related_trends(trend.cluster_id, limit=4)
-        related_trends = db.query(Trend).filter(
-            Trend.cluster_id.in_(related_ids), 
-            Trend.is_active == True,
-            Trend.id != trend.id
-        ).all()
+        if slug:
+            canonical_slug = f"{trend_id}-{slug}"
+            # اگر درخواست با ID یا یک اسلاگ قدیمی (از کش شناسه‌ها) آمده است، ریدایرکت کن
+            if identifier != canonical_slug and identifier not in (slug, cluster_id):
+                meta["redirect"] = f"/trend/{canonical_slug}"
+        return "", meta
+    finally:
+        db.close()
+
+def build_trend_page(trend_id, base_url):
+    """رندر HTML صفحه ترند؛ خروجی: (html, meta) یا None برای 404"""
+    db = SessionLocal()
+    try:
+        trend = db.get(Trend, trend_id)
+        if not trend:
+            return build_archived_trend_page(db, trend_id, base_url)
+
+        # ستون content (HTML خام) بارگذاری نمی‌شود؛ متن پاک‌شده هنگام دریافت ذخیره شده است
+        news_items = db.query(RawNews).options(defer(RawNews.content)).filter(RawNews.trend_id == trend.id).order_by(desc(RawNews.published_at)).limit(20).all()
             
-        base_url = get_public_url()
-        canonical_url = f"{base_url}/trend/{trend.id}-{trend.slug}" if trend.slug else f"{base_url}/trend/{trend.cluster_id}"
-        
-        date_published = trend.first_seen.isoformat() + "+00:00" if trend.first_seen else None
-        date_modified = trend.last_updated.isoformat() + "+00:00" if trend.last_updated else date_published
-        
-        return render_template(
-            'trend_detail.html', 
-            trend=trend, 
-            news_list=formatted_news,
-            related_trends=related_trends,
-            canonical_url=canonical_url,
-            base_url=base_url,
-            date_published=date_published,
-            date_modified=date_modified
-        )
+        # ترندهای مرتبط از جدول trend_relations (محاسبه شده در ورکرها؛ بازنویسی آن نسخه ترند را بالا می‌برد)
+        related_trends = load_related(db, trend.id)
+
+        return render_trend_html(trend, news_items, related_trends, base_url), {"tid": trend.id}
     finally:
         db.close()
 
+def build_archived_trend_page(db, trend_id, base_url):
+    """صفحه ترند آرشیو شده (بدون ترندهای مرتبط)"""
+    entry = find_archived(db, str(trend_id))
+    if not entry:
+        return None
+    archived = load_archived(entry)
+    if archived is None:
+        return None
+    trend, news_items = archived
+    return render_trend_html(trend, news_items, [], base_url), {"tid": trend_id}
+
+def render_trend_html(trend, news_items, related_trends, base_url):
+    """قالب trend_detail.html برای یک ترند (ردیف ORM یا ردیف آرشیو)"""
+    formatted_news = []
+    for n in news_items:
+        clean_content = news_display_content(n)
+
+        link = n.external_id or ""
+        if link and not link.startswith('http'):
+            link = f"https://{link}"
+        
+        formatted_news.append({
+            "source": n.source_name,
+            "time": n.published_at,
+            "content": clean_content,
+            "link": link
+        })
+
+    canonical_url = f"{base_url}/trend/{trend.id}-{trend.slug}" if trend.slug else f"{base_url}/trend/{trend.cluster_id}"
+    
+    date_published = trend.first_seen.isoformat() + "+00:00" if trend.first_seen else None
+    date_modified = trend.last_updated.isoformat() + "+00:00" if trend.last_updated else date_published
+    
+    return render_template(
+        'trend_detail.html', 
+        trend=trend, 
+        news_list=formatted_news,
+        related_trends=related_trends,
+        canonical_url=canonical_url,
+        base_url=base_url,
+        date_published=date_published,
+        date_modified=date_modified
+    )
+
 @api_bp.route('/api/trends/<int:trend_id>/history')
 @api_bp.route('/api/trends/<identifier>/history')
 def get_trend_history(identifier=None, trend_id=None):
     """API endpoint for trend history chart data (TPS/Signal Growth)"""
-    
-    # Database Indexing Suggestion:
-    # Run this SQL to optimize performance:
-    # CREATE INDEX idx_trend_arrivals_trend_ts ON trend_arrivals (trend_id, timestamp);
-
     target_id = str(trend_id) if trend_id is not None else identifier
+    hours = min(max(request.args.get('hours', HISTORY_DEFAULT_HOURS, type=int), 1), HISTORY_MAX_HOURS)
 
-    # 1. Check In-Memory Cache (60s TTL)
-    current_time = time.time()
-    if target_id in trend_history_cache:
-        cached_data, timestamp = trend_history_cache[target_id]
-        if current_time - timestamp < 60:
-            return jsonify(cached_data)
+    # Shared Redis cache (bounded by TTL), invalidated with the trend generation on each new arrival
+    cached = trend_cache.get_or_build(
+        f"history_v2_{target_id}_{hours}",
+        lambda: build_trend_history(target_id, hours),
+        soft_ttl=HISTORY_CACHE_SOFT_TTL, hard_ttl=HISTORY_CACHE_HARD_TTL,
+        validate=lambda meta: trend_cache.trend_version(meta.get("tid")) == int(meta.get("ver", -1))
+    )
+    if cached is None:
+        abort(404)
+    return cached_response(*cached, profile="detail")
 
+def build_trend_history(target_id, hours):
+    """Cumulative signal series read from trend_arrival_rollups (a short range scan, no GROUP BY)."""
     db = SessionLocal()
     try:
         # Resolve trend by slug, cluster_id, or ID
         trend = resolve_trend_smart(db, target_id)
         if not trend:
-            abort(404)
+            return None
+        version = trend_cache.trend_version(trend.id)
+
+        resolution = resolution_for_window(hours)
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        buckets = load_buckets(db, trend.id, cutoff_time, resolution)
 
-        # 2. Time-Series Aggregation (5-minute buckets)
-        cutoff_time = datetime.utcnow() - timedelta(hours=48)
-        
-        # Bucket by 5 minutes (300 seconds) using epoch math (Postgres compatible)
-        time_bucket = func.to_timestamp(func.floor(func.extract('epoch', TrendArrivals.timestamp) / 300) * 300)
-        
-        results = db.query(
-            time_bucket.label('bucket'),
-            func.count(TrendArrivals.id).label('count')
-        ).filter(
-            TrendArrivals.trend_id == trend.id,
-            TrendArrivals.timestamp >= cutoff_time
-        ).group_by(
-            'bucket'
-        ).order_by(
-            'bucket'
-        ).all()
-        
         labels = []
         data = []
         cumulative_signal = 0
-        
-        for bucket, count in results:
-            if not bucket: continue
+        label_format = LABEL_FORMATS[resolution]
+
+        for bucket, count in buckets:
             cumulative_signal += count
-            labels.append(bucket.strftime('%H:%M'))
+            labels.append(bucket.strftime(label_format))
             data.append(cumulative_signal)
-            
-        response_data = {"labels": labels, "data": data}
-        
-        # 3. Update Cache
-        trend_history_cache[target_id] = (response_data, current_time)
-            
-        return jsonify(response_data)
+
+        response_data = {"labels": labels, "data": data, "resolution": resolution}
+        return json.dumps(response_data), {"tid": trend.id, "ver": version}
     finally:
         db.close()
 
@@ -255,31 +390,55 @@ def get_trends():
     list_type = request.args.get('type', 'timeline')
     offset = int(request.args.get('offset', 0))
     limit = int(request.args.get('limit', 32))
+    # Keyset Pagination: کرسر بر offset اولویت دارد (offset فقط برای سازگاری با کلاینت‌های قدیمی)
+    cursor = request.args.get('cursor', '')
     
     # Search & Filter Params
     q = request.args.get('q', '').strip()
     date_str = request.args.get('date', '')
 
+    after = None
+    if cursor:
+        # نتایج جستجو بر اساس ارتباط مرتب می‌شوند و فقط offset دارند؛ کرسر نادیده گرفته نمی‌شود
+        if q:
+            return jsonify({"error": "cursor cannot be combined with q; use offset for search results"}), 400
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        offset = 0
+
     # --- منطق کشینگ Redis ---
-    cache_key = f"trends_v1_{category}_{list_type}_{offset}_{limit}_{q}_{date_str}"
-    if redis_client:
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            return make_response(cached_data, 200, {"Content-Type": "application/json"})
+    # نسخه سراسری در کلید قرار دارد؛ هر تغییر در ترندها (امتیاز، خلاصه، ادمین) کلیدهای قبلی را بی‌اعتبار می‌کند
+    cache_key = f"trends_v2_{trend_cache.global_version()}_{category}_{list_type}_{cursor or offset}_{limit}_{q}_{date_str}"
+    body, meta = trend_cache.get_or_build(
+        cache_key,
+        lambda: build_trend_list(category, list_type, offset, limit, q, date_str, after),
+        soft_ttl=LIST_CACHE_SOFT_TTL, hard_ttl=LIST_CACHE_HARD_TTL
+    )
+    response = cached_response(body, meta, profile="list")
+    if meta.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = meta["next_cursor"]
+    return response
 
+def build_trend_list(category, list_type, offset, limit, q, date_str, after=None):
+    """
+    ساخت پاسخ JSON لیست ترندها از دیتابیس (فقط توسط یک ورکر در هر بار انقضای کش).
+    after: (first_seen, id) آخرین کارت صفحه قبل برای Keyset Pagination تایم‌لاین.
+    """
     db = SessionLocal()
     try:
-        query = db.query(Trend).filter(Trend.is_active == True)
+        # فقط ستون‌های لازم: کارت JSON از پیش ساخته شده (card_json) + کلید کرسر
+        query = db.query(Trend.id, Trend.first_seen, Trend.card_json).filter(Trend.is_active == True)
         
         if category != 'All':
             query = query.filter(Trend.category == category)
 
         # --- Advanced Search Logic ---
         if q:
-            # PostgreSQL Full Text Search (Turkish)
-            query = query.filter(
-                func.to_tsvector('turkish', Trend.title).op('@@')(func.plainto_tsquery('turkish', q))
-            )
+            # PostgreSQL Full Text Search (Turkish) روی ستون ذخیره‌شده search_vector با ایندکس GIN
+            # (وزن‌ها: تیتر A، خلاصه B، متن اخبار C)
+            query = query.filter(search_match(q))
         
         # --- Date Filter ---
         if date_str:
@@ -296,115 +455,382 @@ def get_trends():
             for word in JUNK_KEYWORDS:
                 query = query.filter(~Trend.title.ilike(f'%{word}%'))
             trends = query.order_by(desc(Trend.final_tps), desc(Trend.last_updated)).limit(8).all()
+        elif q:
+            # نتایج جستجو بر اساس ارتباط (ts_rank) مرتب و با offset صفحه‌بندی می‌شوند
+            query = query.order_by(desc(search_rank(q)), desc(Trend.first_seen), desc(Trend.id))
+            trends = query.offset(offset).limit(limit).all()
         else:
-            trends = query.order_by(desc(Trend.first_seen)).offset(offset).limit(limit).all()
+            # ترتیب (first_seen, id) یکتا است؛ با ایندکس idx_trends_first_seen_id صفحات عمیق هم یک Range Scan هستند
+            if after:
+                query = query.filter(tuple_(Trend.first_seen, Trend.id) < after)
+            query = query.order_by(desc(Trend.first_seen), desc(Trend.id))
+            if offset:
+                query = query.offset(offset)
+            trends = query.limit(limit).all()
             
-        results = []
-        for t in trends:
-            last_news = db.query(RawNews).filter(RawNews.trend_id == t.id).order_by(desc(RawNews.published_at)).first()
-            results.append({
-                "id": t.cluster_id,
-                "trend_id": t.id, # شناسه عددی برای ساخت لینک‌های پایدار
-                "slug": t.slug,
-                "title": t.title or "Analiz Bekleniyor...",
-                "summary": t.summary or "Haber detayları işleniyor...",
-                "score": round(t.final_tps or t.score, 1),
-                "count": t.message_count or 1,
-                "category": t.category,
-                "first_seen": t.first_seen.isoformat() + 'Z' if t.first_seen else None,
-                "last_update": t.last_updated.isoformat() + 'Z' if t.last_updated else None, 
-                "source_sample": last_news.source_name if last_news else "Bilinmiyor"
-            })
+        # کارت‌های سریال‌شده فقط به هم چسبانده می‌شوند (بدون ORM، isoformat یا json.dumps برای هر ردیف)
+        # ترندهای بدون کارت (قبل از اجرای backfill_jobs.py cards) در لحظه ساخته می‌شوند
+        missing = [row.id for row in trends if not row.card_json]
+        fallback = {}
+        if missing:
+            for t in db.query(Trend).filter(Trend.id.in_(missing)).all():
+                fallback[t.id] = serialize_card(build_card(t, latest_source(db, t.id)))
+        body = "[" + ",".join(row.card_json or fallback[row.id] for row in trends) + "]"
         
-        response_json = json.dumps(results)
-        # ذخیره در کش برای ۱۲۰ ثانیه (برای حفظ تازگی اخبار صفحه اصلی)
-        if redis_client:
-            redis_client.setex(cache_key, 120, response_json)
-            
-        return jsonify(results)
+        # کرسر صفحه بعد فقط وقتی صفحه کامل است (هدر X-Next-Cursor)
+        meta = {}
+        if list_type != 'hot' and not q and len(trends) == limit and trends[-1].first_seen:
+            meta["next_cursor"] = encode_cursor(trends[-1])
+        return body, meta
+    finally:
+        db.close()
+
+def parse_projection(args):
+    """
+    پارامترهای fields و news_limit؛ خروجی (فیلدهای ترند، فیلدهای خبر، تعداد خبر).
+    fields فهرست جداشده با کاما از DETAIL_FIELDS است؛ news_list.<field> فقط همان فیلدهای خبر را برمی‌گرداند
+    (مثلاً fields=title,summary,news_list.preview بدون متن کامل اخبار). برای فیلد نامعتبر ValueError می‌دهد.
+    """
+    fields, news_fields = [], []
+    for name in filter(None, (f.strip() for f in args.get('fields', '').split(','))):
+        if name.startswith('news_list.'):
+            sub = name[len('news_list.'):]
+            if sub not in NEWS_FIELDS:
+                raise ValueError(name)
+            news_fields.append(sub)
+            name = 'news_list'
+        elif name not in DETAIL_FIELDS:
+            raise ValueError(name)
+        if name not in fields:
+            fields.append(name)
+
+    # ترتیب ثابت تا کلید کش برای ترتیب‌های مختلف یکسان باشد
+    fields = tuple(f for f in DETAIL_FIELDS if f in fields) or DETAIL_FIELDS
+    news_fields = tuple(f for f in NEWS_FIELDS if f in news_fields) or NEWS_FIELDS
+    news_limit = max(0, min(int(args.get('news_limit', DETAIL_NEWS_LIMIT)), DETAIL_NEWS_LIMIT))
+    return fields, news_fields, news_limit
+
+def projection_key(projection):
+    """بخش کلید کش برای Projection؛ برای حالت پیش‌فرض خالی است (کلیدهای قبلی معتبر می‌مانند)"""
+    fields, news_fields, news_limit = projection
+    if projection == (DETAIL_FIELDS, NEWS_FIELDS, DETAIL_NEWS_LIMIT):
+        return ""
+    return f"_{','.join(fields)}_{','.join(news_fields)}_{news_limit}"
+
+def news_load_options(news_fields):
+    """فقط ستون‌های لازم برای فیلدهای درخواستی خبر از Postgres خوانده می‌شوند"""
+    columns = [col for f in news_fields for col in NEWS_COLUMNS[f]]
+    return load_only(RawNews.trend_id, *columns)
+
+def format_news(n, news_fields):
+    item = {}
+    if 'source' in news_fields:
+        item["source"] = n.source_name
+    if 'time' in news_fields:
+        item["time"] = n.published_at.isoformat() + 'Z'
+    needs_text = 'content' in news_fields or ('preview' in news_fields and n.content_preview is None)
+    clean_content = news_display_content(n) if needs_text else None
+    if 'content' in news_fields:
+        item["content"] = clean_content
+    if 'preview' in news_fields:
+        item["preview"] = news_display_preview(n, clean_content)
+    if 'link' in news_fields:
+        link = n.external_id or ""
+        if link and not link.startswith('http'):
+            link = f"https://{link}"
+        item["link"] = link
+    return item
+
+def serialize_detail(trend, news_items, related, projection):
+    """دیکشنری جزئیات یک ترند (مشترک بین /api/trends/<id> و /api/trends/batch)"""
+    fields, news_fields, _ = projection
+    result = {}
+    if 'title' in fields:
+        result["title"] = trend.title
+    if 'category' in fields:
+        result["category"] = trend.category
+    if 'tps_score' in fields:
+        result["tps_score"] = round(trend.final_tps, 1)
+    if 'summary' in fields:
+        result["summary"] = trend.summary or "Generating summary..."
+    if 'news_list' in fields:
+        result["news_list"] = [format_news(n, news_fields) for n in news_items]
+    if 'related_trends' in fields:
+        result["related_trends"] = [{
+            "title": r.title,
+            "category": r.category,
+            "slug": r.slug or r.cluster_id,
+            "date": r.last_updated.strftime('%d.%m.%Y') if r.last_updated else ""
+        } for r in related]
+    return result
+
+@api_bp.route('/api/trends/batch')
+def get_trends_batch():
+    """
+    جزئیات چند ترند در یک درخواست: ?ids=12,34-slug,cluster_id (حداکثر BATCH_MAX_IDS)
+    همراه با fields و news_limit. پاسخ: {"trends": {identifier: detail}, "missing": [...]}
+    """
+    identifiers = list(dict.fromkeys(filter(None, (i.strip() for i in request.args.get('ids', '').split(',')))))
+    if not identifiers:
+        return jsonify({"error": "ids is required"}), 400
+    if len(identifiers) > BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {BATCH_MAX_IDS} ids per request"}), 400
+    try:
+        projection = parse_projection(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid fields/news_limit: {e}"}), 400
+
+    # نسخه سراسری در کلید (ترند جدید، امتیاز، خلاصه) و نسخه هر ترند در meta (خبر جدید با lists=False)
+    digest = body_etag(','.join(identifiers) + projection_key(projection))
+    cache_key = f"batch_v2_{trend_cache.global_version()}_{digest}"
+    body, meta = trend_cache.get_or_build(
+        cache_key,
+        lambda: build_trends_batch(identifiers, projection),
+        soft_ttl=LIST_CACHE_SOFT_TTL, hard_ttl=LIST_CACHE_HARD_TTL,
+        validate=versions_current
+    )
+    return cached_response(body, meta, profile="detail")
+
+def resolve_trend_ids(db, identifiers):
+    """
+    نسخه مجموعه‌ای resolve_trend_smart با همان ترتیب: کش شناسه‌ها، ID ابتدای رشته (در صورت وجود ترند)
+    و در نهایت slug/cluster_id. اسلاگی که با عدد شروع می‌شود (2026-secim-...) به جستجوی اسلاگ می‌رسد.
+    یک کوئری برای بررسی IDها و یک کوئری برای اسلاگ‌ها.
+    """
+    # identifier -> (ID از کش شناسه‌ها، ID ابتدای رشته)
+    candidates = {}
+    for identifier in identifiers:
+        match = re.match(r'^(\d+)(-|$)', identifier)
+        candidates[identifier] = (identifier_index.lookup(identifier), int(match.group(1)) if match else None)
+
+    wanted = {trend_id for pair in candidates.values() for trend_id in pair if trend_id is not None}
+    existing = {row.id for row in db.query(Trend.id).filter(Trend.id.in_(wanted))} if wanted else set()
+
+    resolved, unknown = {}, []
+    for identifier, (cached_id, prefix_id) in candidates.items():
+        if cached_id is not None and cached_id not in existing:
+            identifier_index.forget(identifier)
+        found = next((t for t in (cached_id, prefix_id) if t is not None and t in existing), None)
+        if found is not None:
+            resolved[identifier] = found
+        elif not identifier.isdigit():
+            unknown.append(identifier)
+
+    if unknown:
+        rows = db.query(Trend.id, Trend.slug, Trend.cluster_id).filter(
+            Trend.slug.in_(unknown) | Trend.cluster_id.in_(unknown)
+        ).all()
+        for row in rows:
+            for identifier in (row.slug, row.cluster_id):
+                if identifier in unknown:
+                    resolved[identifier] = row.id
+                    identifier_index.register(row.id, identifier)
+    return resolved
+
+def encode_versions(versions):
+    return ",".join(f"{trend_id}:{version}" for trend_id, version in sorted(versions.items()))
+
+def versions_current(meta):
+    """ورودی کش دسته‌ای: نسخه همه ترندهای آن هنوز همان نسخه ثبت‌شده است (یک MGET)"""
+    recorded = {int(t): int(v) for t, v in (pair.split(':') for pair in meta.get("vers", "").split(',') if pair)}
+    return trend_cache.trend_versions(recorded) == recorded
+
+def build_trends_batch(identifiers, projection):
+    """سه کوئری برای کل دسته: ترندها، N خبر آخر هر ترند (Window Function) و ترندهای مرتبط"""
+    fields, news_fields, news_limit = projection
+    db = SessionLocal()
+    try:
+        resolved = resolve_trend_ids(db, identifiers)
+        trend_ids = set(resolved.values())
+        # نسخه هر ترند پیش از خواندن داده‌ها ثبت می‌شود (خبر جدید فقط نسخه همان ترند را تغییر می‌دهد)
+        versions = trend_cache.trend_versions(trend_ids)
+
+        trend_columns = [TREND_COLUMNS[f] for f in fields if f in TREND_COLUMNS]
+        trends = {
+            t.id: t for t in db.query(Trend).options(load_only(Trend.slug, Trend.cluster_id, *trend_columns)).filter(
+                Trend.id.in_(trend_ids)
+            ).all()
+        } if trend_ids else {}
+
+        news_by_trend = {}
+        if trends and 'news_list' in fields and news_limit:
+            ranked = db.query(
+                RawNews.id,
+                func.row_number().over(partition_by=RawNews.trend_id, order_by=desc(RawNews.published_at)).label("rn")
+            ).filter(RawNews.trend_id.in_(list(trends))).subquery()
+            news_rows = db.query(RawNews).options(news_load_options(news_fields)).join(
+                ranked, ranked.c.id == RawNews.id
+            ).filter(ranked.c.rn <= news_limit).order_by(RawNews.trend_id, ranked.c.rn).all()
+            for n in news_rows:
+                news_by_trend.setdefault(n.trend_id, []).append(n)
+
+        related_by_trend = load_related_many(db, list(trends)) if trends and 'related_trends' in fields else {}
+
+        items, missing = {}, []
+        for identifier in identifiers:
+            trend = trends.get(resolved.get(identifier))
+            if trend is None:
+                missing.append(identifier)
+                continue
+            items[identifier] = serialize_detail(
+                trend, news_by_trend.get(trend.id, []), related_by_trend.get(trend.id, []), projection
+            )
+        return json.dumps({"trends": items, "missing": missing}), {"vers": encode_versions(versions)}
     finally:
         db.close()
 
 @api_bp.route('/api/trends/<identifier>')
 def get_trend_details(identifier):
-    """API جزئیات ترند برای مودال با کشینگ طولانی‌تر (فاز ۶)"""
-    
-    # کلید اختصاصی برای هر کلاستر
-    cache_key = f"detail_v1_{identifier}"
-    if redis_client:
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            return make_response(cached_data, 200, {"Content-Type": "application/json"})
+    """API جزئیات ترند برای مودال با کشینگ طولانی‌تر (فاز ۶)؛ fields و news_limit حجم پاسخ را محدود می‌کنند"""
+    try:
+        projection = parse_projection(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid fields/news_limit: {e}"}), 400
 
+    # کلید اختصاصی برای هر شناسه؛ ورودی کش نسخه ترند را همراه دارد و با هر تغییر فوراً منقضی می‌شود
+    cache_key = f"detail_v2_{identifier}{projection_key(projection)}"
+    cached = trend_cache.get_or_build(
+        cache_key,
+        lambda: build_trend_detail(identifier, projection),
+        soft_ttl=DETAIL_CACHE_SOFT_TTL, hard_ttl=DETAIL_CACHE_HARD_TTL,
+        validate=lambda meta: trend_cache.trend_version(meta.get("tid")) == int(meta.get("ver", -1))
+    )
+    if cached is None:
+        return jsonify({"error": "Trend not found"}), 404
+    return cached_response(*cached, profile="detail")
+
+def build_trend_detail(identifier, projection):
+    """ساخت پاسخ JSON جزئیات ترند؛ نسخه ترند پیش از خواندن داده‌ها ثبت می‌شود"""
+    fields, news_fields, news_limit = projection
     db = SessionLocal()
-    from app.core.ai_engine import ai_engine
     try:
         trend = resolve_trend_smart(db, identifier)
-        if not trend: return jsonify({"error": "Trend not found"}), 404
+        if not trend: return None
+
+        # ابتدا نسخه خوانده می‌شود، سپس داده‌ها تازه‌سازی می‌شوند تا تغییر همزمان از دست نرود
+        version = trend_cache.trend_version(trend.id)
+        db.expire(trend)
         
-        # واکشی اخبار مربوطه
-        news_items = db.query(RawNews).filter(RawNews.trend_id == trend.id).order_by(desc(RawNews.published_at)).limit(20).all()
+        # واکشی اخبار مربوطه (فقط ستون‌های فیلدهای درخواستی)
+        news_items = []
+        if 'news_list' in fields and news_limit:
+            news_items = db.query(RawNews).options(news_load_options(news_fields)).filter(
+                RawNews.trend_id == trend.id
+            ).order_by(desc(RawNews.published_at)).limit(news_limit).all()
         
-        # جستجوی برداری (بخش سنگین)
-        related_ids = ai_engine.get_related_trends(trend.cluster_id, limit=4)
-        related_data = db.query(Trend).filter(
-            Trend.cluster_id.in_(related_ids), 
-            Trend.is_active == True, 
-            Trend.id != trend.id
-        ).all()
+        # ترندهای مرتبط از پیش محاسبه شده (بدون جستجوی برداری در مسیر درخواست)
+        related_data = load_related(db, trend.id) if 'related_trends' in fields else []
 
-        formatted_news = []
-        for n in news_items:
-            link = n.external_id or ""
-            if link and not link.startswith('http'):
-                link = f"https://{link}"
-            formatted_news.append({
-                "source": n.source_name, 
-                "time": n.published_at.isoformat() + 'Z', 
-                "content": n.content, 
-                "link": link
-            })
-
-        result = {
-            "title": trend.title,
-            "category": trend.category,
-            "tps_score": round(trend.final_tps, 1),
-            "summary": trend.summary or "Generating summary...",
-            "news_list": formatted_news,
-            "related_trends": [{
-                "title": r.title,
-                "category": r.category,
-                "slug": r.slug or r.cluster_id,
-                "date": r.last_updated.strftime('%d.%m.%Y') if r.last_updated else ""
-            } for r in related_data]
-        }
-
-        response_json = json.dumps(result)
-        # ذخیره در کش برای ۶۰۰ ثانیه (۱۰ دقیقه) چون جزئیات خبر کمتر تغییر می‌کند
-        if redis_client:
-            redis_client.setex(cache_key, 600, response_json)
-
-        return jsonify(result)
+        result = serialize_detail(trend, news_items, related_data, projection)
+        return json.dumps(result), {"tid": trend.id, "ver": version}
     finally:
         db.close()
 
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+SITEMAP_MAX_URLS = 50000
+SITEMAP_INDEX_TTL = 600
+SITEMAP_TODAY_TTL = 300           # شارد امروز مرتباً بازسازی می‌شود
+SITEMAP_CLOSED_DAY_TTL = 86400    # روزهای بسته: روزی یک بار (تغییر Slug توسط خلاصه‌ساز یا غیرفعال‌سازی)
+SITEMAP_HARD_TTL = 7 * 86400
+
+def xml_response(body, meta):
+    """پاسخ XML با ETag و Last-Modified؛ درخواست‌های شرطی خزنده‌ها پاسخ 304 می‌گیرند (finalize_response)"""
+    response = cached_response(body, meta, content_type='application/xml; charset=utf-8', profile="sitemap")
+    if meta.get("lastmod"):
+        response.last_modified = datetime.fromisoformat(meta["lastmod"])
+    return response
+
+def finish_sitemap(xml_lines, lastmod):
+    body = '\n'.join(xml_lines)
+    meta = {"etag": body_etag(body)}
+    if lastmod:
+        meta["lastmod"] = lastmod.replace(microsecond=0).isoformat()
+    return body, meta
+
 @api_bp.route('/sitemap.xml')
 def sitemap():
-    """تولید داینامیک نقشه سایت (XML Sitemap)"""
+    """نقشه سایت اصلی (Sitemap Index): یک شارد برای صفحات ثابت و یک شارد برای هر روز"""
+    base_url = get_public_url()
+    body, meta = trend_cache.get_or_build(
+        f"sitemap_index_{base_url}",
+        lambda: build_sitemap_index(base_url),
+        soft_ttl=SITEMAP_INDEX_TTL, hard_ttl=SITEMAP_HARD_TTL
+    )
+    return xml_response(body, meta)
+
+def build_sitemap_index(base_url):
     db = SessionLocal()
     try:
-        base_url = get_public_url()
-        trends = db.query(Trend).filter(Trend.is_active == True).order_by(desc(Trend.last_updated)).limit(3000).all()
-        
+        # یک ردیف برای هر روز (بر اساس first_seen که برای هر ترند ثابت است)
+        day = func.date_trunc('day', Trend.first_seen)
+        days = db.query(day.label('day'), func.max(Trend.last_updated).label('lastmod')).filter(
+            Trend.is_active == True,
+            Trend.first_seen != None
+        ).group_by(day).order_by(desc(day)).all()
+
         xml_lines = [
             '<?xml version="1.0" encoding="UTF-8"?>',
-            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<sitemapindex xmlns="{SITEMAP_NS}">',
+            f'  <sitemap><loc>{base_url}/sitemap-static.xml</loc></sitemap>'
         ]
-        xml_lines.append(f'  <url><loc>{base_url}/</loc><changefreq>always</changefreq><priority>1.0</priority></url>')
-        
-        for cat in VALID_CATEGORIES:
-            xml_lines.append(f'  <url><loc>{base_url}/category/{cat.lower()}</loc><changefreq>daily</changefreq><priority>0.9</priority></url>')
+        for d, lastmod in days:
+            lastmod_tag = f'<lastmod>{lastmod.strftime("%Y-%m-%d")}</lastmod>' if lastmod else ''
+            xml_lines.append(f'  <sitemap><loc>{base_url}/sitemap-{d.strftime("%Y-%m-%d")}.xml</loc>{lastmod_tag}</sitemap>')
+        xml_lines.append('</sitemapindex>')
+        return finish_sitemap(xml_lines, max((l for _, l in days if l), default=None))
+    finally:
+        db.close()
+
+@api_bp.route('/sitemap-static.xml')
+def sitemap_static():
+    """صفحه اصلی و صفحات دسته‌بندی"""
+    base_url = get_public_url()
+    xml_lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<urlset xmlns="{SITEMAP_NS}">',
+        f'  <url><loc>{base_url}/</loc><changefreq>always</changefreq><priority>1.0</priority></url>'
+    ]
+    for cat in VALID_CATEGORIES:
+        xml_lines.append(f'  <url><loc>{base_url}/category/{cat.lower()}</loc><changefreq>daily</changefreq><priority>0.9</priority></url>')
+    xml_lines.append('</urlset>')
+    return xml_response(*finish_sitemap(xml_lines, None))
+
+@api_bp.route('/sitemap-<day>.xml')
+def sitemap_day(day):
+    """شارد روزانه: ترندهای فعالی که در آن روز (UTC) ایجاد شده‌اند"""
+    try:
+        day_start = datetime.strptime(day, '%Y-%m-%d')
+    except ValueError:
+        abort(404)
 
+    base_url = get_public_url()
+    is_closed = day_start.date() < datetime.utcnow().date()
+    cached = trend_cache.get_or_build(
+        f"sitemap_day_{base_url}_{day}",
+        lambda: build_sitemap_day(base_url, day_start),
+        soft_ttl=SITEMAP_CLOSED_DAY_TTL if is_closed else SITEMAP_TODAY_TTL,
+        hard_ttl=SITEMAP_HARD_TTL
+    )
+    if cached is None:
+        abort(404)
+    return xml_response(*cached)
+
+def build_sitemap_day(base_url, day_start):
+    db = SessionLocal()
+    try:
+        # فقط ستون‌های لازم (بدون ساخت آبجکت‌های ORM)
+        trends = db.query(Trend.id, Trend.slug, Trend.cluster_id, Trend.last_updated).filter(
+            Trend.is_active == True,
+            Trend.first_seen >= day_start,
+            Trend.first_seen < day_start + timedelta(days=1)
+        ).order_by(desc(Trend.last_updated)).limit(SITEMAP_MAX_URLS).all()
+        if not trends:
+            return None
+
+        xml_lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<urlset xmlns="{SITEMAP_NS}">'
+        ]
         for trend in trends:
             if not trend.last_updated: continue
             identifier = f"{trend.id}-{trend.slug}" if trend.slug else trend.cluster_id
@@ -415,23 +841,72 @@ def sitemap():
             xml_lines.append(f'  <url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod><changefreq>daily</changefreq><priority>0.8</priority></url>')
         
         xml_lines.append('</urlset>')
-        response = make_response('\n'.join(xml_lines))
-        response.headers['Content-Type'] = 'application/xml; charset=utf-8'
-        return response
+        return finish_sitemap(xml_lines, max((t.last_updated for t in trends if t.last_updated), default=None))
     finally:
         db.close()
 
+@api_bp.route('/api/live')
+def live_feed():
+    """
+    فید زنده ترندها (Server-Sent Events).
+    هر ورکر فقط یک اشتراک Pub/Sub دارد (live_hub) و رویدادها را در صف هر اتصال قرار می‌دهد.
+    تعداد اتصال‌ها در هر ورکر محدود است؛ بیش از سقف 503 + Retry-After و کلاینت به Polling برمی‌گردد.
+    اتصال پس از LIVE_MAX_CONNECTION_SECONDS بسته می‌شود و EventSource خودکار دوباره وصل می‌شود.
+    """
+    if not live_events.redis:
+        abort(503)
+    client = live_hub.connect()
+    if client is None:
+        response = jsonify({"error": "Live feed at capacity"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.LIVE_RETRY_AFTER_SECONDS)
+        return response
+
+    def stream():
+        deadline = time.time() + Config.LIVE_MAX_CONNECTION_SECONDS
+        yield "retry: 5000\n\n"
+        while time.time() < deadline:
+            try:
+                yield client.get(timeout=Config.LIVE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no' # غیرفعال کردن بافر Nginx
+    })
+    if Config.LIVE_URL.startswith("http"):
+        # live_server روی Origin دیگری است: EventSource صفحات سایت به CORS نیاز دارد
+        response.headers['Access-Control-Allow-Origin'] = Config.BASE_SITE_URL
+    # حتی اگر Generator هرگز اجرا نشود (قطع اتصال پیش از شروع) جایگاه اتصال آزاد می‌شود
+    response.call_on_close(lambda: live_hub.disconnect(client))
+    return response
+
+# پس از اولین بررسی موفق، /healthz دیگر به دیتابیس کوئری نمی‌زند (نسخه اسکیما در طول عمر ورکر عقب نمی‌رود)
+schema_verified = False
+
+@api_bp.route('/healthz')
+def health_check():
+    """Health check سرویس وب: 503 تا زمانی که اسکیمای دیتابیس به آخرین نسخه مهاجرت نرسیده باشد"""
+    global schema_verified
+    if not schema_verified:
+        try:
+            version, latest = check_schema_version()
+        except Exception as e:
+            return jsonify({"status": "error", "error": f"schema check failed: {e}"}), 503, {'Cache-Control': 'no-store'}
+        if version < latest:
+            return jsonify({"status": "error", "schema_version": version, "expected": latest}), 503, {'Cache-Control': 'no-store'}
+        schema_verified = True
+    return jsonify({"status": "ok"}), 200, {'Cache-Control': 'no-store'}
+
 @api_bp.route('/api/stats')
 def get_stats():
-    """آمار کلی سیستم برای نمایش در هدر"""
-    db = SessionLocal()
-    try:
-        return jsonify({
-            "total_news": db.query(RawNews).count(),
-            "total_trends": db.query(Trend).filter(Trend.is_active == True).count()
-        })
-    finally:
-        db.close()
+    """آمار کلی سیستم برای نمایش در هدر (شمارنده‌های Redis؛ بدون COUNT روی جداول)"""
+    # هنگام قطعی Redis آخرین مقدار خوانده‌شده با stale=true برمی‌گردد (مقداردهی دوباره در gravity_worker)
+    total_news, total_trends, stale = stats_counters.totals()
+    body = json.dumps({"total_news": total_news, "total_trends": total_trends, "stale": stale})
+    # مقدار قدیمی (stale) در CDN نگه داشته نمی‌شود
+    return cached_response(body, None, profile="default" if stale else "stats")
 
 # --- Admin Panel Routes ---
 
@@ -494,6 +969,31 @@ def admin_get_trends():
     finally:
         db.close()
 
+@api_bp.route('/api/admin/export/<dataset>')
+@requires_auth
+def admin_export(dataset):
+    """
+    خروجی استریم (Chunked) از trends، raw_news یا trend_arrivals در بازه [start, end).
+    ?format=ndjson|csv|parquet&start=2026-01-01&end=2026-02-01 ; حافظه مستقل از حجم خروجی است (Server-side Cursor)
+    """
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({"error": f"Unknown dataset. Valid: {sorted(EXPORT_DATASETS)}"}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format. Valid: {sorted(EXPORT_FORMATS)}"}), 400
+    try:
+        start, end = parse_range(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid range: {e}"}), 400
+
+    _, mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"{dataset}_{start:%Y%m%d%H%M}_{end:%Y%m%d%H%M}.{extension}"
+    return Response(
+        stream_with_context(export_stream(dataset, fmt, start, end)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+    )
+
 @api_bp.route('/api/admin/trends/<int:trend_id>/action', methods=['POST'])
 @requires_auth
 def admin_trend_action(trend_id):
@@ -512,6 +1012,14 @@ def admin_trend_action(trend_id):
             pass # نیاز به ایمپورت alert_service در routes دارد که فعلا انجام نمی‌دهیم تا پیچیده نشود
             
         db.commit()
+        if action == 'toggle_active':
+            if trend.is_active:
+                stats_counters.trends_activated()
+                live_events.publish(CREATED, trend)
+            else:
+                stats_counters.trends_deactivated()
+                live_events.publish_removed([trend.id])
+        trend_cache.invalidate_trend(trend.id)
         return jsonify({"status": "success", "is_active": trend.is_active})
     finally:
         db.close()
\ No newline at end of file
@@ -7,40 +7,16 @@ from datetime import datetime, timezone
 # Add project root to sys path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from app.database.models import SessionLocal, RawNews, Trend, TrendArrivals
-from app.core.ai_engine import ai_engine
-# نکته مهم: ماژول scoring کامل حذف نشد، فقط get_source_tier نگه داشته شد، محاسبه‌گر TPS حذف شد
-from app.core.scoring import get_source_tier
-from app.core.text_utils import slugify_turkish
+from app.database.models import SessionLocal, NewsIngestKey
+# کالکتور فقط آیتم‌های خام را در صف Redis می‌نویسد؛ خوشه‌بندی در cluster_worker انجام می‌شود
+from app.core.ingest_bus import ingest_bus, make_item
+from app.core.source_tiers import get_source_tier
+from app.core.admission import admission_filter
+from app.core.counters import stats_counters
 
 # Path for RSS sources configuration
 RSS_FILE = os.path.join(os.path.dirname(__file__), 'rss_sources.txt')
 
-def generate_initial_slug(db, text, trend_id=None):
-    """
-    SEO Logic: Generates a human-readable URL slug immediately for new trends.
-    This ensures that search engines index meaningful keywords instead of IDs.
-    """
-    if not text:
-        return "haber-detayi"
-        
-    words = text.split()[:7]
-    base_title = " ".join(words)
-    base_slug = slugify_turkish(base_title)
-    
-    unique_slug = base_slug
-    counter = 1
-    while True:
-        existing = db.query(Trend).filter(Trend.slug == unique_slug)
-        if trend_id:
-            existing = existing.filter(Trend.id != trend_id)
-        
-        if not existing.first():
-            return unique_slug
-        
-        unique_slug = f"{base_slug}-{counter}"
-        counter += 1
-
 def load_rss_sources():
     """Loads source name and URL pairs from rss_sources.txt"""
     sources = {}
@@ -63,19 +39,19 @@ def load_rss_sources():
     return sources
 
 def fetch_and_process_rss():
-    """Executes a single cycle of RSS fetching, clustering, and queuing for scoring"""
+    """Executes a single cycle of RSS fetching and publishes new items to the ingestion stream"""
     db = SessionLocal()
     rss_feeds = load_rss_sources()
     current_time_utc = datetime.now(timezone.utc).replace(tzinfo=None)
     
     print(f"🔄 RSS Cycle Started: Checking {len(rss_feeds)} feeds...")
     
-    new_trends_count = 0
-    signal_updates_count = 0
+    queued_count = 0
 
     for source_name, url in rss_feeds.items():
         try:
             feed = feedparser.parse(url)
+            source_tier = get_source_tier(source_name)
             for entry in feed.entries:
                 title = entry.get('title', '')
                 summary = entry.get('summary', '') or entry.get('description', '')
@@ -84,70 +60,39 @@ def fetch_and_process_rss():
                 full_text = f"{title}. {summary}"
                 if len(full_text) < 30:
                     continue
+
+                # Cheap admission stages (length, spam, language) + canonical link
+                admission = admission_filter.check(full_text, link)
+                if not admission.accepted:
+                    continue
+                raw_link, link = link, admission.external_id
                 
-                # Avoid processing the exact same link twice
-                existing_news = db.query(RawNews).filter(RawNews.external_id == link).first()
+                # Avoid processing the exact same link twice (ingest keys outlive archived/dropped news;
+                # rows stored before canonicalization keep the raw link as external_id)
+                existing_news = db.query(NewsIngestKey.external_id).filter(NewsIngestKey.external_id.in_({link, raw_link})).first()
                 if existing_news:
                     continue
 
-                # --- Step 1: AI Brain Clustering ---
-                cluster_id, _ = ai_engine.process_news(full_text, source_name, link)
-                if not cluster_id:
-                    continue
-
-                # --- Step 2: Trend Management ---
-                trend = db.query(Trend).filter(Trend.cluster_id == cluster_id).first()
-                
-                if trend:
-                    trend.message_count += 1
-                    trend.last_updated = current_time_utc
-                    trend.needs_scoring = True # ASYNC TRIGGER: در صف امتیازدهی قرار گرفت
-                    signal_updates_count += 1
-                else:
-                    # New Trend from RSS: Create instant SEO slug
-                    trend = Trend(
-                        cluster_id=cluster_id,
-                        message_count=1,
-                        title=title[:120].strip(),
-                        slug=generate_initial_slug(db, title), # SEO-First
-                        first_seen=current_time_utc,
-                        last_updated=current_time_utc,
-                        needs_scoring=True # ASYNC TRIGGER: در صف امتیازدهی قرار گرفت
-                    )
-                    db.add(trend)
-                    db.flush()
-                    new_trends_count += 1
-                
-                # --- Step 3: Raw Data and Reliability ---
-                source_tier = get_source_tier(source_name)
-                news_item = RawNews(
+                # Hand off to the clustering workers (AI latency no longer blocks fetching)
+                ingest_bus.publish(make_item(
                     source_type="rss",
                     source_name=source_name,
                     source_tier=source_tier,
                     external_id=link,
                     content=full_text,
                     published_at=current_time_utc,
-                    trend_id=trend.id
-                )
-                db.add(news_item)
-                db.flush()
-
-                # --- Step 4: Record Velocity History ---
-                arrival = TrendArrivals(
-                    trend_id=trend.id,
-                    raw_news_id=news_item.id,
-                    timestamp=current_time_utc
-                )
-                db.add(arrival)
-                db.commit()
-
-                # فاز ۶.۲: حذف محاسبه همزمان TPS. ورکر پس‌زمینه این کار را انجام می‌دهد.
+                    title=title
+                ))
+                stats_counters.record_ingest("rss", source_name, current_time_utc)
+                queued_count += 1
                 
         except Exception as e:
             db.rollback()
             print(f"   ❌ Error processing feed {source_name}: {e}")
 
-    print(f"✅ RSS Cycle Finished: {new_trends_count} New Trends, {signal_updates_count} Signal Updates.")
+    admission_filter.flush_stats()
+    print(f"✅ RSS Cycle Finished: {queued_count} items queued for clustering (backlog: {ingest_bus.backlog()}).")
+    print(f"   🧹 Admission: {admission_filter.summary()}")
     db.close()
 
 def main():
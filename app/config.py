@@ -51,4 +51,71 @@ class Config:
 
     # --- آستانه‌های امتیازدهی (TPS Thresholds) ---
     THRESHOLD_ADMIN_ALERT = 20.0    # ارسال هشدار به ادمین برای بررسی
-    THRESHOLD_AUTO_PUBLISH = 35.0   # انتشار خودکار در صورت عدم واکنش ادمین یا امتیاز بسیار بالا
\ No newline at end of file
+    THRESHOLD_AUTO_PUBLISH = 35.0   # انتشار خودکار در صورت عدم واکنش ادمین یا امتیاز بسیار بالا
+
+    # --- صف ورودی اخبار (Redis Streams Ingestion Bus) ---
+    # کالکتورها فقط آیتم‌های نرمال‌شده را در استریم می‌نویسند و ورکرهای خوشه‌بندی آن‌ها را مصرف می‌کنند
+    INGEST_STREAM = os.getenv("INGEST_STREAM", "ttw:ingest:raw")
+    INGEST_DEAD_LETTER_STREAM = os.getenv("INGEST_DEAD_LETTER_STREAM", "ttw:ingest:dead")
+    INGEST_GROUP = os.getenv("INGEST_GROUP", "clusterers")
+    INGEST_STREAM_MAXLEN = int(os.getenv("INGEST_STREAM_MAXLEN", "100000"))
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "20"))
+    INGEST_BLOCK_MS = 5000            # حداکثر زمان انتظار برای پیام جدید
+    INGEST_CLAIM_IDLE_MS = 120000     # پیام‌های بدون Ack پس از ۲ دقیقه دوباره پردازش می‌شوند
+    INGEST_MAX_DELIVERIES = 5         # پس از ۵ تلاش ناموفق به صف Dead-Letter منتقل می‌شود
+
+    # --- فیلتر پذیرش پیش از Embedding (Admission Filter) ---
+    ADMISSION_MIN_LENGTH = 25         # حداقل طول متن پاک‌شده (هم‌راستا با ai_engine.process_news)
+    ADMISSION_SPAM_MIN_HITS = 2       # تعداد کلمات کلیدی اسپم متمایز برای رد پیام
+
+    # --- Rollup تاریخچه ترندها (trend_arrival_rollups) ---
+    ROLLUP_5M_RETENTION_HOURS = 72    # بازه‌های ۵ دقیقه‌ای (نمودار ۴۸ ساعته)
+    ROLLUP_1H_RETENTION_DAYS = 35     # بازه‌های ساعتی؛ بازه‌های روزانه دائمی هستند
+
+    # --- ترندهای مرتبط از پیش محاسبه شده (trend_relations) ---
+    RELATIONS_REFRESH_HOURS = 12      # فاصله بازمحاسبه برای ترندهای فعال
+    RELATIONS_REFRESH_BATCH = 50      # حداکثر ترند در هر چرخه بازمحاسبه دوره‌ای
+
+    # --- پارتیشن‌بندی زمانی raw_news و trend_arrivals (app/core/partitions.py) ---
+    PARTITION_INTERVAL = os.getenv("PARTITION_INTERVAL", "month")   # month / week (فقط برای پارتیشن‌های جدید)
+    PARTITION_PREMAKE = 3             # تعداد پارتیشن‌های آینده که از قبل ساخته می‌شوند
+    # مدت نگهداری بر حسب روز (۰ = دائمی)؛ پارتیشن‌هایی که کاملاً قدیمی‌تر باشند جدا (Detach) می‌شوند
+    RAW_NEWS_RETENTION_DAYS = int(os.getenv("RAW_NEWS_RETENTION_DAYS", "0"))
+    TREND_ARRIVALS_RETENTION_DAYS = int(os.getenv("TREND_ARRIVALS_RETENTION_DAYS", "0"))
+    PARTITION_RETENTION_ACTION = os.getenv("PARTITION_RETENTION_ACTION", "drop")  # drop / detach
+    # در صورت تنظیم، پارتیشن پیش از جدا شدن در این مسیر خروجی گرفته می‌شود (Parquet یا NDJSON)
+    PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "")
+
+    # --- آرشیو سرد ترندهای غیرفعال (Parquet، app/core/archive.py) ---
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))   # ۰ = غیرفعال
+    ARCHIVE_BATCH = 200               # حداکثر ترند در هر چرخه آرشیو
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "/app/archive")
+
+    # --- خلاصه‌سازی همزمان با Gemini (app/workers/summarizer.py) ---
+    SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))   # درخواست‌های همزمان Gemini
+    GEMINI_RPM = float(os.getenv("GEMINI_RPM", "30"))                 # سهمیه درخواست در دقیقه (Token Bucket)
+    GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))                # حداکثر درخواست پشت سر هم
+    GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))             # سهمیه توکن ورودی در دقیقه (Token Bucket دوم)
+    GEMINI_TOKEN_BURST = int(os.getenv("GEMINI_TOKEN_BURST", "250000"))  # حداکثر توکن ورودی پشت سر هم
+    SUMMARY_SIDE_EFFECT_WORKERS = 2   # انتشار تلگرام و Google Indexing خارج از مسیر اصلی
+    # تلاش مجدد برای خلاصه‌های ناموفق/خالی: فاصله نمایی، پس از آخرین تلاش ترند غیرفعال می‌شود
+    SUMMARY_RETRY_BASE_SECONDS = 30
+    SUMMARY_RETRY_MAX_SECONDS = 3600
+    SUMMARY_MAX_ATTEMPTS = 5
+    # متن ورودی پرامپت: منابع معتبرتر و جدیدتر اول، بدون تکراری‌ها، محدود به بودجه توکن
+    SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "2500"))
+    SUMMARY_CONTEXT_CANDIDATES = 40   # تعداد اخبار بررسی‌شده برای هر ترند
+    SUMMARY_ITEM_MAX_CHARS = 1000     # حداکثر طول هر خبر در پرامپت
+    SUMMARY_DEDUP_THRESHOLD = 0.6     # شباهت Jaccard شینگل‌ها؛ بالاتر از آن خبر تکراری است
+
+    # --- فید زنده (Redis Pub/Sub -> Server-Sent Events) ---
+    LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "ttw:live:trends")
+    # آدرس عمومی فید زنده برای EventSource صفحات؛ در استقرار Docker آدرس سرویس live_server
+    # (مثلاً https://live.trendiatr.com/api/live). پیش‌فرض: همان Origin (با سقف کم اتصال در api_server)
+    LIVE_URL = os.getenv("LIVE_URL", "/api/live")
+    LIVE_KEEPALIVE_SECONDS = 15       # کامنت keepalive برای پروکسی‌ها
+    LIVE_MAX_CONNECTION_SECONDS = 300 # پس از آن مرورگر خودکار دوباره وصل می‌شود (آزاد شدن Thread)
+    # سقف اتصال‌های همزمان SSE در هر ورکر Gunicorn؛ بیش از آن 503 + Retry-After (کلاینت به Polling برمی‌گردد)
+    LIVE_MAX_STREAMS_PER_WORKER = int(os.getenv("LIVE_MAX_STREAMS_PER_WORKER", "8"))
+    LIVE_RETRY_AFTER_SECONDS = 120
+    LIVE_CLIENT_QUEUE_SIZE = 100      # رویدادهای در انتظار هر اتصال؛ اتصال کند رویدادهای اضافه را از دست می‌دهد
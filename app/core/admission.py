@@ -0,0 +1,163 @@
+import re
+import time
+import logging
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import redis
+from app.config import Config
+from app.core.preprocessing import clean_text
+from app.core.text_utils import normalize_turkish, find_spam_keywords, STRONG_SPAM_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+AdmissionResult = namedtuple("AdmissionResult", ["accepted", "stage", "external_id"])
+
+# Ordered cheapest first; every stage has passed/rejected counters
+STAGES = ("length", "spam", "language", "canonical_url")
+
+# --- Language-ID (no model: stopwords + Turkish-specific letters + script check) ---
+TURKISH_STOPWORDS = {
+    "ve", "bir", "bu", "da", "de", "ile", "için", "olarak", "olan", "gibi", "daha",
+    "çok", "en", "ne", "ki", "mi", "ama", "sonra", "kadar", "göre", "yeni", "son",
+    "dakika", "şu", "her", "oldu", "etti", "dedi", "açıklama", "yaptı", "ise", "ancak",
+}
+TURKISH_LETTERS_RE = re.compile(r'[çğıöşüÇĞİÖŞÜ]')
+WORD_RE = re.compile(r'\w+')
+LATIN_LETTER_RE = re.compile(r'[A-Za-zÀ-ɏ]')
+LETTER_RE = re.compile(r'[^\W\d_]')
+MIN_TOKENS_FOR_LANGUAGE_ID = 6
+
+# --- URL canonicalization: known tracking parameters only ---
+# Generic names (sid, ref, id, ...) are left alone: some sites use them as content ids
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "yclid", "msclkid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi",
+}
+PATH_SESSION_RE = re.compile(r';(?:jsessionid|phpsessid)=[^/?#]*', re.IGNORECASE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of an external_id URL: lowercase scheme/host, no fragment,
+    no tracking parameters or path session ids, remaining parameters sorted.
+    Non-URL identifiers are returned unchanged.
+    """
+    if not url or "://" not in url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    path = PATH_SESSION_RE.sub('', parts.path) or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+
+def looks_turkish(text: str) -> bool:
+    """
+    Lightweight language check. Short texts are not judged; otherwise the text must be
+    mostly Latin script and contain Turkish letters or a minimum share of Turkish stopwords.
+    """
+    tokens = WORD_RE.findall(normalize_turkish(text))
+    if len(tokens) < MIN_TOKENS_FOR_LANGUAGE_ID:
+        return True
+
+    letters = LETTER_RE.findall(text)
+    if letters and len(LATIN_LETTER_RE.findall(text)) / len(letters) < 0.5:
+        return False # Cyrillic, Arabic, ...
+
+    if TURKISH_LETTERS_RE.search(text):
+        return True
+    stopword_hits = sum(1 for t in tokens if t in TURKISH_STOPWORDS)
+    return stopword_hits / len(tokens) >= 0.04
+
+
+class AdmissionFilter:
+    """
+    Staged admission filter in front of the ingestion bus.
+    Rejects junk before it costs an embedding and a vector search, and canonicalizes
+    external_id so tracking-parameter variants of one link dedupe to a single row.
+    Per-stage counters are kept locally and flushed to a Redis hash periodically.
+    """
+    STATS_KEY = "ttw:admission:stats"
+    FLUSH_EVERY = 50          # decisions
+    FLUSH_INTERVAL = 60       # seconds
+
+    def __init__(self):
+        self.stats = Counter()      # lifetime counters of this process
+        self._pending = Counter()   # not yet flushed to Redis
+        self._last_flush = time.time()
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            self.redis = None
+            logger.error(f"❌ Admission stats disabled (Redis): {e}")
+
+    def _count(self, stage, outcome):
+        key = f"{stage}:{outcome}"
+        self.stats[key] += 1
+        self._pending[key] += 1
+
+    def check(self, text, external_id):
+        """Runs all stages in order and stops at the first rejection."""
+        cleaned = clean_text(text or "")
+
+        if len(cleaned) < Config.ADMISSION_MIN_LENGTH:
+            return self._decide(False, "length", external_id)
+        self._count("length", "passed")
+
+        hits = find_spam_keywords(cleaned)
+        if len(hits) >= Config.ADMISSION_SPAM_MIN_HITS or any(k in hits for k in STRONG_SPAM_KEYWORDS):
+            return self._decide(False, "spam", external_id)
+        self._count("spam", "passed")
+
+        if not looks_turkish(cleaned):
+            return self._decide(False, "language", external_id)
+        self._count("language", "passed")
+
+        canonical_id = canonicalize_url(external_id)
+        self._count("canonical_url", "rewritten" if canonical_id != external_id else "passed")
+        return self._decide(True, None, canonical_id)
+
+    def _decide(self, accepted, stage, external_id):
+        if accepted:
+            self._count("admission", "accepted")
+        else:
+            self._count(stage, "rejected")
+        self._maybe_flush()
+        return AdmissionResult(accepted, stage, external_id)
+
+    def _maybe_flush(self):
+        if sum(self._pending.values()) >= self.FLUSH_EVERY or time.time() - self._last_flush > self.FLUSH_INTERVAL:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Adds the locally accumulated counter deltas to the shared Redis hash."""
+        self._last_flush = time.time()
+        if not self.redis or not self._pending:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for key, value in self._pending.items():
+                pipe.hincrby(self.STATS_KEY, key, value)
+            pipe.execute()
+            self._pending.clear()
+        except Exception as e:
+            logger.error(f"⚠️ Admission stats flush failed: {e}")
+
+    def summary(self):
+        """One-line summary of this process' counters for cycle logs."""
+        rejected = {s: self.stats.get(f"{s}:rejected", 0) for s in STAGES[:3]}
+        return (f"accepted={self.stats.get('admission:accepted', 0)} "
+                f"rejected(length={rejected['length']}, spam={rejected['spam']}, language={rejected['language']}) "
+                f"canonicalized={self.stats.get('canonical_url:rewritten', 0)}")
+
+
+# Singleton instance
+admission_filter = AdmissionFilter()
@@ -118,6 +118,11 @@ class AIEngine:
             logger.error(f"Reference Doc Fetch Error: {e}")
         return None
 
+    @staticmethod
+    def news_vector_id(external_id: str):
+        """Deterministic Chroma id of a news item (one vector per external_id)"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, external_id))
+
     def process_news(self, raw_text: str, source: str, external_id: str):
         """
         Main processing pipeline: Vectorization -> Rolling Search -> LLM Verification -> Clustering.
@@ -129,6 +134,15 @@ class AIEngine:
         if not cleaned_text or len(cleaned_text) < 25: 
             return None, False
 
+        # Idempotent per news item: a redelivered item whose DB commit failed reuses its stored vector
+        doc_id = self.news_vector_id(external_id)
+        try:
+            existing = self.collection.get(ids=[doc_id], include=["metadatas"])
+            if existing['ids']:
+                return existing['metadatas'][0]['cluster_id'], not existing['metadatas'][0].get('is_reference', False)
+        except Exception as e:
+            logger.error(f"Vector Lookup Error: {e}")
+
         vector = self.get_embedding(cleaned_text)
         
         # --- FIXED Phase 3: Rolling Cache (Numeric Unix Timestamp) ---
@@ -187,7 +201,7 @@ class AIEngine:
             logger.info(f"🔗 Appended to Trend: {cluster_id[:8]}")
 
         # Store in ChromaDB with numeric timestamp for future filtering
-        self.collection.add(
+        self.collection.upsert(
             documents=[cleaned_text],
             embeddings=[vector],
             metadatas=[{
@@ -197,7 +211,7 @@ class AIEngine:
                 "timestamp": now_ts, # Stored as float for $gte support
                 "is_reference": is_new_reference
             }],
-            ids=[str(uuid.uuid4())]
+            ids=[doc_id]
         )
         
         return cluster_id, is_duplicate
@@ -0,0 +1,146 @@
+import os
+import re
+import logging
+from datetime import timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from app.config import Config
+from app.core.cache import trend_cache
+from app.core.counters import stats_counters
+from app.core.identifiers import identifier_index
+from app.core.export import export_columns, parquet_schema, pa
+from app.database.models import Trend, RawNews, TrendArrivals, TrendRelation, ArchivedTrend, utc_now
+
+if pa is not None:
+    import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# dataset -> (model, column holding the trend id)
+ARCHIVED_DATASETS = {
+    "trends": (Trend, Trend.id),
+    "raw_news": (RawNews, RawNews.trend_id),
+    "trend_arrivals": (TrendArrivals, TrendArrivals.trend_id),
+}
+
+
+def part_path(dataset, month, part):
+    return os.path.join(Config.ARCHIVE_DIR, dataset, f"month={month}", f"part-{part}.parquet")
+
+
+def _write_part(dataset, month, part, rows):
+    path = part_path(dataset, month, part)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.Table.from_pylist(rows, schema=parquet_schema(dataset)), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def archive_inactive_trends(db, older_than_days=None, limit=None):
+    """
+    Moves inactive trends untouched for older_than_days, with their news and arrivals,
+    to Parquet files partitioned by month, records them in archived_trends and deletes
+    the hot rows (rollups and relations go with the trend through ON DELETE CASCADE).
+    news_ingest_keys rows are kept, so links still listed in feeds are not ingested again.
+    Files are written before the delete transaction commits, so a failed run only
+    leaves an unreferenced part file behind. Returns the archived trend ids.
+    """
+    if pa is None:
+        logger.warning("⚠️ Trend archive needs pyarrow; skipping.")
+        return []
+    older_than_days = older_than_days or Config.ARCHIVE_AFTER_DAYS
+    cutoff = utc_now() - timedelta(days=older_than_days)
+
+    trends = db.execute(select(*export_columns("trends")).where(
+        Trend.is_active == False,
+        Trend.last_updated < cutoff
+    ).order_by(Trend.id).limit(limit or Config.ARCHIVE_BATCH)).mappings().all()
+    if not trends:
+        return []
+
+    trend_ids = [t["id"] for t in trends]
+    month_of = {t["id"]: (t["last_updated"] or t["first_seen"] or cutoff).strftime("%Y-%m") for t in trends}
+    part = utc_now().strftime("%Y%m%dT%H%M%S")
+
+    for dataset, (_, trend_column) in ARCHIVED_DATASETS.items():
+        rows = [dict(t) for t in trends] if dataset == "trends" else [
+            dict(r) for r in db.execute(select(*export_columns(dataset)).where(trend_column.in_(trend_ids))).mappings()
+        ]
+        key = "id" if dataset == "trends" else "trend_id"
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_of[row[key]], []).append(row)
+        for month, month_rows in by_month.items():
+            _write_part(dataset, month, part, month_rows)
+
+    db.add_all([
+        ArchivedTrend(
+            trend_id=t["id"], cluster_id=t["cluster_id"], slug=t["slug"], title=t["title"],
+            month=month_of[t["id"]], part=part
+        ) for t in trends
+    ])
+    db.query(TrendArrivals).filter(TrendArrivals.trend_id.in_(trend_ids)).delete(synchronize_session=False)
+    news_deleted = db.query(RawNews).filter(RawNews.trend_id.in_(trend_ids)).delete(synchronize_session=False)
+    db.query(TrendRelation).filter(
+        TrendRelation.trend_id.in_(trend_ids) | TrendRelation.related_trend_id.in_(trend_ids)
+    ).delete(synchronize_session=False)
+    db.query(Trend).filter(Trend.id.in_(trend_ids)).delete(synchronize_session=False)
+    db.commit()
+
+    # Hot identifiers now point nowhere: drop them so lookups fall through to the archive,
+    # expire cached pages/details and keep the news total in step (archived trends are inactive).
+    trend_cache.invalidate_trends(trend_ids, lists=False)
+    identifier_index.forget_trends(trend_ids)
+    stats_counters.news_removed(news_deleted)
+    return trend_ids
+
+
+def archived_external_ids():
+    """external_id of every archived news item, one Parquet part at a time (column read only)."""
+    if pa is None:
+        return
+    root = os.path.join(Config.ARCHIVE_DIR, "raw_news")
+    if not os.path.isdir(root):
+        return
+    for month_dir in sorted(os.listdir(root)):
+        month_path = os.path.join(root, month_dir)
+        for name in sorted(os.listdir(month_path)):
+            if name.endswith(".parquet"):
+                yield [i for i in pq.read_table(os.path.join(month_path, name), columns=["external_id"]).column(0).to_pylist() if i]
+
+
+def find_archived(db, identifier):
+    """archived_trends row for an ID, ID-slug, slug or cluster_id (same forms as resolve_trend_smart)."""
+    match = re.match(r'^(\d+)(-|$)', identifier)
+    if match:
+        entry = db.get(ArchivedTrend, int(match.group(1)))
+        if entry:
+            return entry
+    return db.query(ArchivedTrend).filter(
+        (ArchivedTrend.slug == identifier) | (ArchivedTrend.cluster_id == identifier)
+    ).first()
+
+
+def load_archived(entry, news_limit=20):
+    """
+    Read-through for one archived trend: (trend, news) as attribute objects shaped like
+    the ORM rows the trend page uses, news newest first. None when the files are gone.
+    """
+    if pa is None:
+        return None
+    trend_path = part_path("trends", entry.month, entry.part)
+    if not os.path.exists(trend_path):
+        logger.error(f"❌ Archive file missing for trend {entry.trend_id}: {trend_path}")
+        return None
+    rows = pq.read_table(trend_path, filters=[("id", "=", entry.trend_id)]).to_pylist()
+    if not rows:
+        return None
+
+    news = []
+    news_path = part_path("raw_news", entry.month, entry.part)
+    if os.path.exists(news_path):
+        news = pq.read_table(news_path, filters=[("trend_id", "=", entry.trend_id)]).to_pylist()
+        news.sort(key=lambda n: n["published_at"], reverse=True)
+    return SimpleNamespace(**rows[0]), [SimpleNamespace(**n) for n in news[:news_limit]]
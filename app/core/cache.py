@@ -0,0 +1,265 @@
+import time
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import redis
+from app.config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Content-Encoding -> compressor (brotli only when the optional package is installed)
+COMPRESSORS = {"gzip": lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=5)
+
+
+def body_etag(body):
+    """Strong validator for a response body (str or bytes)."""
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.md5(body).hexdigest()
+
+
+class TrendCache:
+    """
+    Redis response cache with generation-based invalidation and single-flight rebuilds.
+
+    - A global generation (list pages) and a per-trend generation (detail pages) are
+      bumped by the writers (cluster worker, scorer, gravity worker, summarizer, admin).
+      List keys embed the global generation; detail entries record the trend generation
+      they were built from. Entries can therefore live long and still go stale at once.
+    - Each entry has a soft expiry inside a longer hard TTL. When an entry is stale only
+      the worker holding the rebuild lock recomputes it; the others keep serving the
+      stale body instead of stampeding Postgres.
+    """
+    GLOBAL_KEY = "ttw:gen:global"
+    TREND_KEY = "ttw:gen:trend:{}"
+    LOCK_TIMEOUT = 30          # seconds; upper bound for one rebuild
+    WAIT_TIMEOUT = 3.0         # cold key: how long followers wait for the leader
+    WAIT_STEP = 0.05
+    COMPRESSED_KEY = "ttw:z:{}:{}"   # encoding, etag -> compressed bytes
+    COMPRESSED_TTL = 3600
+
+    def __init__(self):
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+            # Binary client for precompressed bodies (gzip/br bytes are not valid UTF-8)
+            self.raw = redis.from_url(Config.REDIS_URL)
+            logger.info("✅ Redis Cache Layer Connected successfully.")
+        except Exception as e:
+            self.redis = None
+            self.raw = None
+            logger.error(f"❌ Redis Connection Failed: {e}")
+
+    # --- Generations ---
+
+    def global_version(self):
+        try:
+            return int(self.redis.get(self.GLOBAL_KEY) or 0)
+        except Exception:
+            return 0
+
+    def trend_version(self, trend_id):
+        try:
+            return int(self.redis.get(self.TREND_KEY.format(trend_id)) or 0)
+        except Exception:
+            return 0
+
+    def trend_versions(self, trend_ids):
+        """{trend_id: generation} with a single MGET."""
+        trend_ids = list(trend_ids)
+        if not trend_ids:
+            return {}
+        try:
+            values = self.redis.mget([self.TREND_KEY.format(t) for t in trend_ids])
+        except Exception:
+            return {t: 0 for t in trend_ids}
+        return {t: int(v or 0) for t, v in zip(trend_ids, values)}
+
+    def invalidate_trend(self, trend_id, lists=True):
+        """Bumps the trend generation (detail pages) and, by default, the list generation."""
+        self.invalidate_trends([trend_id], lists=lists)
+
+    def invalidate_trends(self, trend_ids, lists=True):
+        if not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for trend_id in trend_ids:
+                pipe.incr(self.TREND_KEY.format(trend_id))
+            if lists:
+                pipe.incr(self.GLOBAL_KEY)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"⚠️ Cache invalidation failed: {e}")
+
+    def invalidate_lists(self):
+        self.invalidate_trends([], lists=True)
+
+    # --- Precompressed bodies ---
+
+    def compressed(self, encoding, etag, data):
+        """
+        Compressed form of a response body, shared by all workers. Keys are content-addressed
+        by ETag, so a body is compressed once per change however many clients fetch it.
+        """
+        key = self.COMPRESSED_KEY.format(encoding, etag)
+        if self.raw is not None:
+            try:
+                cached = self.raw.get(key)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                logger.error(f"⚠️ Compressed body read failed: {e}")
+        result = COMPRESSORS[encoding](data)
+        if self.raw is not None:
+            try:
+                self.raw.setex(key, self.COMPRESSED_TTL, result)
+            except Exception as e:
+                logger.error(f"⚠️ Compressed body write failed: {e}")
+        return result
+
+    # --- Single-flight get/build ---
+
+    def get_or_build(self, key, builder, soft_ttl, hard_ttl, validate=None):
+        """
+        Returns (body, meta) for key, rebuilding through builder() when needed.
+        builder returns (body: str, meta: dict) or None (nothing to cache, e.g. 404);
+        a stale entry whose rebuild returns None is deleted and None is returned.
+        validate(meta) -> bool marks an entry outdated even before its soft expiry.
+        """
+        if not self.redis:
+            return builder()
+
+        entry = self._read(key)
+        if entry is not None:
+            body, meta, fresh_until = entry
+            if time.time() < fresh_until and (validate is None or validate(meta)):
+                return body, meta
+            # Stale: one worker rebuilds, the rest serve what they have
+            lock = self._try_lock(key)
+            if lock is None:
+                return body, meta
+            try:
+                result = self._build(key, builder, soft_ttl, hard_ttl)
+                if result is None:
+                    # The source is gone (deleted or archived trend): drop the entry instead of serving it
+                    self._delete(key)
+                return result
+            finally:
+                self._release(lock)
+
+        # Cold key: followers wait briefly for the leader's result
+        lock = self._try_lock(key)
+        if lock is None:
+            deadline = time.time() + self.WAIT_TIMEOUT
+            while time.time() < deadline:
+                time.sleep(self.WAIT_STEP)
+                entry = self._read(key)
+                if entry is not None:
+                    return entry[0], entry[1]
+            return self._build(key, builder, soft_ttl, hard_ttl)
+        try:
+            return self._build(key, builder, soft_ttl, hard_ttl)
+        finally:
+            self._release(lock)
+
+    def _read(self, key):
+        try:
+            entry = self.redis.hgetall(key)
+        except Exception as e:
+            logger.error(f"⚠️ Cache read failed for {key}: {e}")
+            return None
+        if not entry or "body" not in entry:
+            return None
+        meta = {k[5:]: v for k, v in entry.items() if k.startswith("meta:")}
+        return entry["body"], meta, float(entry.get("fresh_until", 0))
+
+    def _delete(self, key):
+        try:
+            self.redis.delete(key)
+        except Exception as e:
+            logger.error(f"⚠️ Cache delete failed for {key}: {e}")
+
+    def _build(self, key, builder, soft_ttl, hard_ttl):
+        result = builder()
+        if result is None:
+            return None
+        body, meta = result
+        meta = dict(meta or {}, etag=body_etag(body))
+        try:
+            mapping = {"body": body, "fresh_until": time.time() + soft_ttl}
+            mapping.update({f"meta:{k}": v for k, v in meta.items() if v is not None})
+            pipe = self.redis.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, hard_ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"⚠️ Cache write failed for {key}: {e}")
+        return body, {k: str(v) for k, v in meta.items() if v is not None}
+
+    def _try_lock(self, key):
+        try:
+            lock = self.redis.lock(f"lock:{key}", timeout=self.LOCK_TIMEOUT, blocking=False)
+            return lock if lock.acquire() else None
+        except Exception:
+            # Redis trouble: behave as leader rather than block the request
+            return False
+
+    @staticmethod
+    def _release(lock):
+        if not lock:
+            return
+        try:
+            lock.release()
+        except Exception:
+            pass
+
+
+class LocalLRU:
+    """
+    Small bounded in-process cache (per Gunicorn worker) in front of Redis for the hottest
+    entries. Size and age are capped, so memory stays flat however many pages are viewed.
+    Callers still check the trend generation on every hit.
+    """
+    def __init__(self, maxsize=500, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if time.time() - stored_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.time())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+# Singleton instance
+trend_cache = TrendCache()
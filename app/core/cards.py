@@ -0,0 +1,50 @@
+import json
+
+from sqlalchemy import desc
+
+from app.database.models import RawNews
+
+DEFAULT_SOURCE = "Bilinmiyor"
+
+
+def build_card(trend, source_sample=None):
+    """One timeline/hot card, with the same fields /api/trends has always returned."""
+    return {
+        "id": trend.cluster_id,
+        "trend_id": trend.id, # شناسه عددی برای ساخت لینک‌های پایدار
+        "slug": trend.slug,
+        "title": trend.title or "Analiz Bekleniyor...",
+        "summary": trend.summary or "Haber detayları işleniyor...",
+        "score": round(trend.final_tps or trend.score or 0.0, 1),
+        "count": trend.message_count or 1,
+        "category": trend.category,
+        "first_seen": trend.first_seen.isoformat() + 'Z' if trend.first_seen else None,
+        "last_update": trend.last_updated.isoformat() + 'Z' if trend.last_updated else None,
+        "source_sample": source_sample or DEFAULT_SOURCE
+    }
+
+
+def serialize_card(card):
+    return json.dumps(card, separators=(',', ':'))
+
+
+def latest_source(db, trend_id):
+    row = db.query(RawNews.source_name).filter(
+        RawNews.trend_id == trend_id
+    ).order_by(desc(RawNews.published_at)).first()
+    return row.source_name if row else None
+
+
+def refresh_card(db, trend, source_sample=None):
+    """
+    Regenerates trends.card_json inside the caller's transaction. Every writer that
+    changes a card field calls this before committing (cluster worker, scorer,
+    summarizer, gravity worker); list endpoints only concatenate the stored JSON.
+    source_sample: name of the newest source, when the caller already knows it.
+    """
+    if source_sample is None and trend.card_json:
+        source_sample = json.loads(trend.card_json).get("source_sample")
+    if source_sample is None or source_sample == DEFAULT_SOURCE:
+        source_sample = latest_source(db, trend.id)
+    trend.card_json = serialize_card(build_card(trend, source_sample))
+    return trend.card_json
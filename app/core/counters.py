@@ -0,0 +1,162 @@
+import logging
+from datetime import timedelta
+
+import redis
+from sqlalchemy import func
+
+from app.config import Config
+from app.database.models import RawNews, Trend, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class StatsCounters:
+    """
+    O(1) system counters kept in Redis instead of COUNT(*) scans on raw_news/trends.
+
+    - total_news / active_trends: incremented by the writers (cluster worker, summarizer,
+      gravity worker, admin actions) and periodically reconciled against Postgres.
+    - Ingest counters: bumped by the collectors for every item put on the ingestion bus,
+      per hour (rolling 24h window) and per day and source (breakdowns for the admin bot).
+    """
+    TOTAL_NEWS_KEY = "ttw:stats:total_news"
+    ACTIVE_TRENDS_KEY = "ttw:stats:active_trends"
+    HOURLY_KEY = "ttw:stats:ingest:hour:{}"      # YYYYmmddHH -> count
+    DAILY_KEY = "ttw:stats:ingest:day:{}"        # YYYY-mm-dd -> hash "type:source" -> count
+    SUMMARY_KEY = "ttw:stats:summary:hour:{}"   # YYYYmmddHH -> hash count / total_sec / max_sec
+    HOURLY_TTL = 2 * 86400
+    DAILY_TTL = 8 * 86400
+
+    def __init__(self):
+        # Last totals read from Redis, served (flagged stale) while Redis is unavailable
+        self._last_totals = (0, 0)
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            self.redis = None
+            logger.error(f"❌ Stats counters disabled (Redis): {e}")
+
+    # --- Writers ---
+
+    def record_ingest(self, source_type, source_name, ts=None):
+        if not self.redis:
+            return
+        ts = ts or utc_now()
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            hour_key = self.HOURLY_KEY.format(ts.strftime('%Y%m%d%H'))
+            day_key = self.DAILY_KEY.format(ts.strftime('%Y-%m-%d'))
+            pipe.incr(hour_key)
+            pipe.expire(hour_key, self.HOURLY_TTL)
+            pipe.hincrby(day_key, f"{source_type}:{source_name}", 1)
+            pipe.expire(day_key, self.DAILY_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"⚠️ Ingest counter update failed: {e}")
+
+    def _incr(self, key, amount):
+        if not self.redis or not amount:
+            return
+        try:
+            self.redis.incrby(key, amount)
+        except Exception as e:
+            logger.error(f"⚠️ Counter update failed for {key}: {e}")
+
+    def news_stored(self, n=1):
+        self._incr(self.TOTAL_NEWS_KEY, n)
+
+    def news_removed(self, n=1):
+        self._incr(self.TOTAL_NEWS_KEY, -n)
+
+    def trends_activated(self, n=1):
+        self._incr(self.ACTIVE_TRENDS_KEY, n)
+
+    def trends_deactivated(self, n=1):
+        self._incr(self.ACTIVE_TRENDS_KEY, -n)
+
+    def record_time_to_summary(self, seconds, ts=None):
+        """Time from a trend's first_seen to its published summary (summarizer)."""
+        if not self.redis:
+            return
+        key = self.SUMMARY_KEY.format((ts or utc_now()).strftime('%Y%m%d%H'))
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hincrby(key, "count", 1)
+            pipe.hincrbyfloat(key, "total_sec", seconds)
+            pipe.expire(key, self.HOURLY_TTL)
+            pipe.execute()
+            # max is read-modify-write; a lost race only understates the hourly max
+            current = self.redis.hget(key, "max_sec")
+            if current is None or seconds > float(current):
+                self.redis.hset(key, "max_sec", seconds)
+        except Exception as e:
+            logger.error(f"⚠️ Time-to-summary metric update failed: {e}")
+
+    # --- Readers ---
+
+    def totals(self):
+        """
+        (total_news, active_trends, stale). Never falls back to Postgres: on a Redis error or
+        a counter not seeded yet (reconcile runs in the gravity worker), the last values this
+        process read (0 at first) are returned with stale=True.
+        """
+        try:
+            values = self.redis.mget(self.TOTAL_NEWS_KEY, self.ACTIVE_TRENDS_KEY)
+        except Exception as e:
+            logger.error(f"⚠️ Counter read failed: {e}")
+            values = (None, None)
+        if None in values:
+            return self._last_totals + (True,)
+        self._last_totals = tuple(int(v) for v in values)
+        return self._last_totals + (False,)
+
+    def ingested_last_24h(self):
+        now = utc_now()
+        keys = [self.HOURLY_KEY.format((now - timedelta(hours=h)).strftime('%Y%m%d%H')) for h in range(24)]
+        try:
+            return sum(int(v) for v in self.redis.mget(keys) if v)
+        except Exception:
+            return 0
+
+    def time_to_summary_last_24h(self):
+        """(summaries, average seconds, max seconds) over the last 24 hours."""
+        now = utc_now()
+        count, total, longest = 0, 0.0, 0.0
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for h in range(24):
+                pipe.hgetall(self.SUMMARY_KEY.format((now - timedelta(hours=h)).strftime('%Y%m%d%H')))
+            for bucket in pipe.execute():
+                count += int(bucket.get("count", 0))
+                total += float(bucket.get("total_sec", 0))
+                longest = max(longest, float(bucket.get("max_sec", 0)))
+        except Exception:
+            return 0, 0.0, 0.0
+        return count, (total / count if count else 0.0), longest
+
+    def ingested_by_source(self, day=None):
+        """{"type:source": count} for one UTC day (default: today)."""
+        day = day or utc_now().strftime('%Y-%m-%d')
+        try:
+            return {k: int(v) for k, v in self.redis.hgetall(self.DAILY_KEY.format(day)).items()}
+        except Exception:
+            return {}
+
+    # --- Reconciliation ---
+
+    def reconcile(self, db):
+        """
+        Overwrites the maintained totals with exact values from Postgres.
+        Run from a background worker, never on the request path.
+        """
+        total_news = db.query(func.count(RawNews.id)).scalar() or 0
+        active_trends = db.query(func.count(Trend.id)).filter(Trend.is_active == True).scalar() or 0
+        try:
+            self.redis.mset({self.TOTAL_NEWS_KEY: total_news, self.ACTIVE_TRENDS_KEY: active_trends})
+        except Exception as e:
+            logger.error(f"⚠️ Counter reconciliation failed: {e}")
+        return total_news, active_trends
+
+
+# Singleton instance
+stats_counters = StatsCounters()
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.database.models import SessionLocal, Trend, RawNews, TrendArrivals, utc_now
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# dataset -> (model, time column used for the range filter, columns left out of the export)
+DATASETS = {
+    "trends": (Trend, Trend.first_seen, {"search_vector", "card_json"}),
+    "raw_news": (RawNews, RawNews.published_at, set()),
+    "trend_arrivals": (TrendArrivals, TrendArrivals.timestamp, set()),
+}
+
+# Parquet column types from the Python type of each SQLAlchemy column
+ARROW_TYPES = {int: "int64", float: "float64", bool: "bool", str: "string", datetime: "timestamp[us]"}
+
+
+def export_columns(dataset):
+    model, _, excluded = DATASETS[dataset]
+    return [column for column in model.__table__.columns if column.name not in excluded]
+
+
+def iter_partitions(dataset, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rows of a dataset in [start, end), as lists of dicts of at most chunk_size rows.
+    Uses a server-side cursor (stream_results + yield_per), so memory stays bounded
+    by one chunk whatever the size of the export. Rows come in primary key order;
+    the session lives as long as the generator.
+    """
+    model, time_column, _ = DATASETS[dataset]
+    columns = export_columns(dataset)
+    stmt = select(*columns).where(
+        time_column >= start, time_column < end
+    ).order_by(model.__table__.c.id).execution_options(stream_results=True, yield_per=chunk_size)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt)
+        for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+    finally:
+        db.close()
+
+
+def _json_value(value):
+    return value.isoformat() + 'Z' if isinstance(value, datetime) else value
+
+
+def ndjson_chunks(dataset, partitions):
+    for rows in partitions:
+        yield "".join(
+            json.dumps({k: _json_value(v) for k, v in row.items()}, ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+
+def csv_chunks(dataset, partitions):
+    names = [column.name for column in export_columns(dataset)]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names)
+    writer.writeheader()
+    for rows in partitions:
+        writer.writerows({k: _json_value(v) for k, v in row.items()} for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter; the bytes written so far are drained after each row group."""
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def parquet_schema(dataset):
+    return pa.schema([
+        (column.name, pa.type_for_alias(ARROW_TYPES.get(column.type.python_type, "string")))
+        for column in export_columns(dataset)
+    ])
+
+
+def parquet_chunks(dataset, partitions):
+    """One Parquet row group per chunk, streamed as soon as it is written (footer at the end)."""
+    schema = parquet_schema(dataset)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in partitions:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# format -> (chunk encoder, Content-Type, file extension)
+FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson", "ndjson"),
+    "csv": (csv_chunks, "text/csv; charset=utf-8", "csv"),
+}
+if pa is not None:
+    FORMATS["parquet"] = (parquet_chunks, "application/vnd.apache.parquet", "parquet")
+
+
+def export_stream(dataset, fmt, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Byte chunks of a dataset export in the given format (for chunked HTTP responses and the CLI)."""
+    encoder = FORMATS[fmt][0]
+    return encoder(dataset, iter_partitions(dataset, start, end, chunk_size))
+
+
+def parse_range(start=None, end=None, default_days=1):
+    """[start, end) from ISO dates/datetimes (naive UTC, like every timestamp in the schema); default: the last day."""
+    end_dt = datetime.fromisoformat(end) if end else utc_now()
+    start_dt = datetime.fromisoformat(start) if start else end_dt - timedelta(days=default_days)
+    if start_dt >= end_dt:
+        raise ValueError("start must be before end")
+    return start_dt, end_dt
@@ -0,0 +1,98 @@
+import logging
+
+import redis
+from app.config import Config
+from app.core.cache import LocalLRU, trend_cache
+
+logger = logging.getLogger(__name__)
+
+
+class IdentifierIndex:
+    """
+    Shared identifier -> trend id map (Redis hash) with a small per-process LRU in front.
+
+    Holds the current slug, every previous slug (for canonical redirects after the
+    summarizer upgrades a slug) and the cluster_id of each trend. Writers register
+    identifiers on trend creation and slug upgrade; readers fall back to Postgres on a
+    miss and register what they found. Local entries carry the target trend generation
+    and are checked on every hit; moving an identifier to another trend bumps the
+    generation of the previous owner, so its cached pages and redirects expire at once.
+    """
+    KEY = "ttw:ids"
+
+    def __init__(self):
+        self.local = LocalLRU(maxsize=5000, ttl=600)
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            self.redis = None
+            logger.error(f"❌ Identifier cache disabled (Redis): {e}")
+
+    def register(self, trend_id, *identifiers):
+        identifiers = [i for i in identifiers if i]
+        if not identifiers:
+            return
+        if self.redis:
+            try:
+                previous = self.redis.hmget(self.KEY, identifiers)
+                self.redis.hset(self.KEY, mapping={identifier: trend_id for identifier in identifiers})
+                moved = {int(p) for p in previous if p is not None and int(p) != trend_id}
+                if moved:
+                    trend_cache.invalidate_trends(moved, lists=False)
+            except Exception as e:
+                logger.error(f"⚠️ Identifier cache write failed: {e}")
+        version = trend_cache.trend_version(trend_id)
+        for identifier in identifiers:
+            self.local.set(identifier, (trend_id, version))
+
+    def lookup(self, identifier):
+        """Trend id for a slug / old slug / cluster_id, or None when unknown."""
+        cached = self.local.get(identifier)
+        if cached is not None:
+            trend_id, version = cached
+            if trend_cache.trend_version(trend_id) == version:
+                return trend_id
+            self.local.discard(identifier)
+        if not self.redis:
+            return None
+        try:
+            value = self.redis.hget(self.KEY, identifier)
+        except Exception:
+            return None
+        if value is None:
+            return None
+        trend_id = int(value)
+        self.local.set(identifier, (trend_id, trend_cache.trend_version(trend_id)))
+        return trend_id
+
+    def forget_trends(self, trend_ids):
+        """
+        Drops every identifier (current and old slugs, cluster_id) of removed or archived
+        trends with one HSCAN of the map; other processes drop their local entries through
+        the generation check once the caller bumps the trend generations.
+        """
+        wanted = {str(t) for t in trend_ids}
+        if not self.redis or not wanted:
+            return 0
+        try:
+            stale = [identifier for identifier, value in self.redis.hscan_iter(self.KEY, count=1000) if value in wanted]
+            if stale:
+                self.redis.hdel(self.KEY, *stale)
+        except Exception as e:
+            logger.error(f"⚠️ Identifier cache cleanup failed: {e}")
+            return 0
+        for identifier in stale:
+            self.local.discard(identifier)
+        return len(stale)
+
+    def forget(self, identifier):
+        self.local.discard(identifier)
+        if self.redis:
+            try:
+                self.redis.hdel(self.KEY, identifier)
+            except Exception as e:
+                logger.error(f"⚠️ Identifier cache delete failed: {e}")
+
+
+# Singleton instance
+identifier_index = IdentifierIndex()
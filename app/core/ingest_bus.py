@@ -0,0 +1,150 @@
+import os
+import socket
+import logging
+from datetime import datetime
+
+import redis
+from app.config import Config
+from app.core.preprocessing import display_text, make_preview
+
+logger = logging.getLogger(__name__)
+
+
+def make_item(source_type, source_name, source_tier, external_id, content, published_at, title=None):
+    """
+    Normalizes a collected news item into the flat string mapping stored in the stream.
+    Every collector publishes the same shape so the clustering worker stays source-agnostic.
+    Display text and preview are computed here, once, so no reader ever parses HTML again.
+    """
+    clean_content = display_text(content)
+    return {
+        "source_type": source_type,
+        "source_name": source_name,
+        "source_tier": str(source_tier),
+        "external_id": external_id,
+        "content": content,
+        "clean_content": clean_content,
+        "content_preview": make_preview(clean_content),
+        "title": title or "",
+        "published_at": published_at.isoformat(),
+    }
+
+
+def parse_item(fields):
+    """Converts a stream entry back into typed values for the clustering worker."""
+    item = dict(fields)
+    item["source_tier"] = int(item.get("source_tier") or 3)
+    item["published_at"] = datetime.fromisoformat(item["published_at"])
+    item["title"] = item.get("title") or None
+    # Entries queued before clean_content existed
+    if "clean_content" not in item:
+        item["clean_content"] = display_text(item["content"])
+        item["content_preview"] = make_preview(item["clean_content"])
+    return item
+
+
+class IngestBus:
+    """
+    Redis Streams ingestion bus.
+    Collectors append raw items with XADD; clustering workers share a consumer group,
+    read in batches, acknowledge processed entries and replay entries left pending
+    by crashed or stuck consumers.
+    """
+    def __init__(self):
+        self.stream = Config.INGEST_STREAM
+        self.group = Config.INGEST_GROUP
+        self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        # Cursor for XAUTOCLAIM so each pass continues scanning the pending list
+        self._claim_cursor = "0-0"
+
+    @staticmethod
+    def consumer_name():
+        """Unique consumer name per process (several workers may share one host)."""
+        return f"{socket.gethostname()}-{os.getpid()}"
+
+    def publish(self, item):
+        """Appends a normalized item to the stream (approximate MAXLEN trimming)."""
+        return self.redis.xadd(
+            self.stream, item,
+            maxlen=Config.INGEST_STREAM_MAXLEN, approximate=True
+        )
+
+    def ensure_group(self):
+        """Creates the consumer group (and the stream) if it does not exist yet."""
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"🧵 Consumer group '{self.group}' created on '{self.stream}'.")
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read_batch(self, consumer, count=None, block_ms=None):
+        """Reads new (never delivered) entries for this consumer."""
+        response = self.redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"},
+            count=count or Config.INGEST_BATCH_SIZE,
+            block=block_ms if block_ms is not None else Config.INGEST_BLOCK_MS
+        )
+        if not response:
+            return []
+        return [(msg_id, fields) for msg_id, fields in response[0][1] if fields]
+
+    def claim_stale(self, consumer, count=None):
+        """
+        Takes over entries that stayed pending longer than INGEST_CLAIM_IDLE_MS.
+        Entries delivered too many times are moved to the dead-letter stream instead
+        of being retried forever.
+        """
+        next_cursor, claimed, _deleted = self.redis.xautoclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=Config.INGEST_CLAIM_IDLE_MS,
+            start_id=self._claim_cursor,
+            count=count or Config.INGEST_BATCH_SIZE
+        )
+        self._claim_cursor = next_cursor
+        claimed = [(msg_id, fields) for msg_id, fields in claimed if fields]
+        if not claimed:
+            return []
+
+        # Delivery count of each claimed entry on its own (min=max=id): the PEL may hold older entries
+        pipe = self.redis.pipeline(transaction=False)
+        for msg_id, _ in claimed:
+            pipe.xpending_range(self.stream, self.group, min=msg_id, max=msg_id, count=1)
+        deliveries = {
+            p["message_id"]: p["times_delivered"] for pending in pipe.execute() for p in pending
+        }
+
+        replay = []
+        for msg_id, fields in claimed:
+            if deliveries.get(msg_id, 0) > Config.INGEST_MAX_DELIVERIES:
+                self.dead_letter(msg_id, fields, "max deliveries exceeded")
+            else:
+                replay.append((msg_id, fields))
+        return replay
+
+    def ack(self, *msg_ids):
+        if msg_ids:
+            self.redis.xack(self.stream, self.group, *msg_ids)
+
+    def dead_letter(self, msg_id, fields, reason):
+        """Parks a poisonous entry for manual inspection and acknowledges it."""
+        payload = dict(fields)
+        payload["dead_reason"] = reason
+        payload["origin_id"] = msg_id
+        self.redis.xadd(Config.INGEST_DEAD_LETTER_STREAM, payload, maxlen=10000, approximate=True)
+        self.ack(msg_id)
+        logger.warning(f"☠️ Entry {msg_id} moved to dead-letter stream: {reason}")
+
+    def backlog(self):
+        """Entries waiting for the group: never delivered (lag) plus delivered but unacknowledged."""
+        try:
+            for info in self.redis.xinfo_groups(self.stream):
+                if info["name"] == self.group:
+                    return (info.get("lag") or 0) + (info.get("pending") or 0)
+        except redis.exceptions.ResponseError:
+            pass
+        return 0
+
+
+# Singleton instance
+ingest_bus = IngestBus()
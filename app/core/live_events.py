@@ -0,0 +1,128 @@
+import json
+import time
+import queue
+import logging
+import threading
+
+import redis
+from app.config import Config
+from app.core.cards import build_card
+
+logger = logging.getLogger(__name__)
+
+# Event kinds pushed to the homepage live feed
+CREATED = "created"         # new trend (cluster worker)
+RESCORED = "rescored"       # new TPS after scoring
+SUMMARIZED = "summarized"   # headline/summary/category written by the summarizer
+REMOVED = "removed"         # deactivated (gravity, summarizer, admin)
+
+
+def card_payload(trend, source_sample=None):
+    """Same card as one item of /api/trends (the stored card_json when the writer refreshed it)."""
+    if trend.card_json:
+        return json.loads(trend.card_json)
+    return build_card(trend, source_sample)
+
+
+class LiveEvents:
+    """
+    Redis pub/sub fan-out of trend changes. Workers publish after their commits;
+    every web worker relays the channel to its open SSE connections (LiveHub).
+    Publishing is fire-and-forget: a missed event only delays a card update.
+    """
+    def __init__(self):
+        self.channel = Config.LIVE_CHANNEL
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            self.redis = None
+            logger.error(f"❌ Live events disabled (Redis): {e}")
+
+    def publish(self, kind, trend, source_sample=None):
+        if not self.redis:
+            return
+        try:
+            event = {"type": kind, "trend": card_payload(trend, source_sample)}
+            self.redis.publish(self.channel, json.dumps(event))
+        except Exception as e:
+            logger.error(f"⚠️ Live event publish failed: {e}")
+
+    def publish_removed(self, trend_ids):
+        if not self.redis or not trend_ids:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for trend_id in trend_ids:
+                pipe.publish(self.channel, json.dumps({"type": REMOVED, "trend": {"trend_id": trend_id}}))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"⚠️ Live event publish failed: {e}")
+
+    def subscribe(self):
+        """New pub/sub handle on the live channel (one per process, see LiveHub)."""
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+
+def sse_frame(data):
+    event = json.loads(data)
+    return f"event: {event['type']}\ndata: {json.dumps(event['trend'])}\n\n"
+
+
+class LiveHub:
+    """
+    Per-process fan-out of the live channel: a single Redis subscriber thread formats each
+    event once and puts it on the queue of every open SSE connection of this process.
+    Connections are capped; connect() returns None over the cap.
+    """
+    def __init__(self, events, max_clients):
+        self.events = events
+        self.max_clients = max_clients
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def connect(self):
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            client = queue.Queue(maxsize=Config.LIVE_CLIENT_QUEUE_SIZE)
+            self._clients.add(client)
+            # Started lazily, so it runs in the Gunicorn worker and not in a pre-fork master
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="live-hub", daemon=True)
+                self._listener.start()
+            return client
+
+    def disconnect(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.events.subscribe()
+                try:
+                    for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._broadcast(sse_frame(message["data"]))
+                finally:
+                    pubsub.close()
+            except Exception as e:
+                logger.error(f"⚠️ Live subscriber error, reconnecting: {e}")
+                time.sleep(5)
+
+    def _broadcast(self, frame):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(frame)
+            except queue.Full:
+                pass # slow client: the event is dropped, like a missed publish
+
+
+# Singleton instances
+live_events = LiveEvents()
+live_hub = LiveHub(live_events, Config.LIVE_MAX_STREAMS_PER_WORKER)
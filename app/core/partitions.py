@@ -0,0 +1,145 @@
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.config import Config
+from app.database.models import engine, utc_now
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned tables: table -> (partition key, retention in days; 0 keeps everything)
+PARTITIONED_TABLES = {
+    "raw_news": ("published_at", lambda: Config.RAW_NEWS_RETENTION_DAYS),
+    "trend_arrivals": ("timestamp", lambda: Config.TREND_ARRIVALS_RETENTION_DAYS),
+}
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def period_start(dt, interval=None):
+    interval = interval or Config.PARTITION_INTERVAL
+    day = datetime(dt.year, dt.month, dt.day)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_period(start, interval=None):
+    interval = interval or Config.PARTITION_INTERVAL
+    if interval == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table, start, interval=None):
+    interval = interval or Config.PARTITION_INTERVAL
+    return f"{table}_p{start:%Y_%m_%d}" if interval == "week" else f"{table}_p{start:%Y_%m}"
+
+
+def is_partitioned(conn, table):
+    kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :t"), {"t": table}).scalar()
+    return kind == "p"
+
+
+def list_partitions(conn, table):
+    """[(name, lower, upper)] of the range partitions of a table (the DEFAULT partition is left out)."""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :t"
+    ), {"t": table}).all()
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_PATTERN.search(bound or "")
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(conn, table, start, end, interval=None):
+    """
+    Creates the missing partitions covering [start, end), one per interval.
+    Periods overlapping an existing partition (e.g. made with another interval) are skipped.
+    Returns the names of the partitions created.
+    """
+    existing = list_partitions(conn, table)
+    created = []
+    lower = period_start(start, interval)
+    while lower < end:
+        upper = next_period(lower, interval)
+        if not any(lo < upper and lower < hi for _, lo, hi in existing):
+            name = partition_name(table, lower, interval)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            existing.append((name, lower, upper))
+            created.append(name)
+        lower = upper
+    return created
+
+
+def archive_partition(table, name, lower, upper):
+    """Exports one partition to PARTITION_ARCHIVE_DIR (Parquet when pyarrow is installed) before it is detached."""
+    from app.core.export import FORMATS, export_stream
+
+    fmt = "parquet" if "parquet" in FORMATS else "ndjson"
+    os.makedirs(Config.PARTITION_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(Config.PARTITION_ARCHIVE_DIR, f"{name}.{FORMATS[fmt][2]}")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        for chunk in export_stream(table, fmt, lower, upper):
+            out.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+
+def apply_retention(bind, table, retention_days, now=None):
+    """
+    Detaches (and by default drops) the partitions that end before now - retention_days,
+    exporting them first when PARTITION_ARCHIVE_DIR is set. Returns the names handled.
+    """
+    if retention_days <= 0:
+        return []
+    cutoff = (now or utc_now()) - timedelta(days=retention_days)
+    with bind.connect() as conn:
+        expired = [p for p in list_partitions(conn, table) if p[2] <= cutoff]
+
+    handled = []
+    for name, lower, upper in expired:
+        if Config.PARTITION_ARCHIVE_DIR:
+            path = archive_partition(table, name, lower, upper)
+            logger.info(f"📦 [Partitions] Archived {name} -> {path}")
+        with bind.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if Config.PARTITION_RETENTION_ACTION == "drop":
+                conn.execute(text(f"DROP TABLE {name}"))
+        handled.append(name)
+    return handled
+
+
+def maintain_partitions(bind=engine, now=None):
+    """
+    Periodic job (gravity worker): keeps PARTITION_PREMAKE future partitions ready, so
+    inserts never fall into the DEFAULT partition, and applies the retention policies.
+    Returns {table: (created, removed)}.
+    """
+    now = now or utc_now()
+    horizon = now
+    for _ in range(Config.PARTITION_PREMAKE + 1):
+        horizon = next_period(period_start(horizon))
+
+    report = {}
+    for table, (_, retention) in PARTITIONED_TABLES.items():
+        with bind.begin() as conn:
+            if not is_partitioned(conn, table):
+                continue
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            created = ensure_partitions(conn, table, now, horizon)
+        removed = apply_retention(bind, table, retention(), now)
+        report[table] = (created, removed)
+    return report
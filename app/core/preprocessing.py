@@ -0,0 +1,124 @@
+import re
+import html
+
+# Fast C-backed HTML parser: selectolax (Lexbor) first, lxml second, BeautifulSoup last.
+# Plain text (most Telegram messages) never reaches a parser at all.
+try:
+    from selectolax.lexbor import LexborHTMLParser as _FastParser
+    HTML_BACKEND = "selectolax"
+except ImportError:
+    _FastParser = None
+    try:
+        import lxml.html as _lxml_html
+        HTML_BACKEND = "lxml"
+    except ImportError:
+        _lxml_html = None
+        HTML_BACKEND = "bs4"
+
+# --- Module-level compiled patterns ---
+# A real tag (<p>, </div>, <br/>, <!-- ...); a bare '<' in plain text does not count
+HTML_TAG_RE = re.compile(r'<(?:[a-zA-Z][a-zA-Z0-9-]*|/[a-zA-Z]|!)[^>]*>')
+# Named or numeric HTML entity (&amp; &#39;)
+HTML_ENTITY_RE = re.compile(r'&(?:[a-zA-Z]{2,8}|#\d{1,6}|#x[0-9a-fA-F]{1,6});')
+FALLBACK_TAG_RE = re.compile(r'<[^>]+>')
+
+# URLs, mentions and hashtags are removed in a single pass
+NOISE_RE = re.compile(r'http\S+|www\.\S+|[@#]\w+')
+# Only Turkish letters, digits and basic punctuation survive
+DISALLOWED_CHARS_RE = re.compile(r'[^\w\sçğıöşüÇĞİÖŞÜ,.?!-]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Blocks that never carry article text
+NON_CONTENT_TAGS = ("script", "style", "noscript")
+# Embedded "İlginizi Çekebilir" boxes (e.g. Milliyet)
+NON_EDITABLE_SELECTOR = "section.mceNonEditable"
+NON_EDITABLE_XPATH = './/section[contains(concat(" ", normalize-space(@class), " "), " mceNonEditable ")]'
+
+PREVIEW_LENGTH = 280
+
+
+def has_markup(text: str) -> bool:
+    """Cheap check: only inputs with tags or entities need an HTML parser."""
+    return '<' in text and HTML_TAG_RE.search(text) is not None
+
+
+def strip_html(text: str) -> str:
+    """
+    Returns the visible text of an HTML fragment.
+    Plain text is returned untouched (entities decoded), so the parser cost is only
+    paid by inputs that actually contain markup.
+    """
+    if not text:
+        return ""
+    if not has_markup(text):
+        return html.unescape(text) if '&' in text and HTML_ENTITY_RE.search(text) else text
+
+    try:
+        if _FastParser is not None:
+            tree = _FastParser(text)
+            for node in tree.css(NON_EDITABLE_SELECTOR):
+                node.decompose()
+            tree.strip_tags(list(NON_CONTENT_TAGS))
+            root = tree.body or tree.root
+            return root.text(separator=" ") if root else ""
+
+        if _lxml_html is not None:
+            root = _lxml_html.fragment_fromstring(text, create_parent="div")
+            junk = root.xpath(NON_EDITABLE_XPATH) + list(root.iter(*NON_CONTENT_TAGS))
+            for node in junk:
+                node.drop_tree()
+            return " ".join(root.itertext())
+
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(text, "html.parser")
+        for section in soup.find_all("section", class_="mceNonEditable"):
+            section.decompose()
+        for node in soup(list(NON_CONTENT_TAGS)):
+            node.extract()
+        return soup.get_text(separator=" ")
+    except Exception:
+        # Broken markup: fall back to a plain regex strip
+        return FALLBACK_TAG_RE.sub(' ', text)
+
+
+def collapse_whitespace(text: str) -> str:
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalizes text for embedding and clustering:
+    HTML -> visible text, drop URLs/mentions/hashtags, keep Turkish letters and
+    basic punctuation, collapse whitespace.
+    """
+    if not text:
+        return ""
+    text = strip_html(text)
+    text = NOISE_RE.sub('', text)
+    text = DISALLOWED_CHARS_RE.sub(' ', text)
+    return collapse_whitespace(text)
+
+
+def display_text(text: str) -> str:
+    """Readable text for pages and API responses (markup removed, punctuation kept)."""
+    if not text:
+        return ""
+    return collapse_whitespace(strip_html(text))
+
+
+def make_preview(text: str, length: int = PREVIEW_LENGTH) -> str:
+    """Short preview of already-cleaned text, cut at a word boundary."""
+    if not text or len(text) <= length:
+        return text or ""
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:-') + "…"
+
+
+def clean_batch(texts):
+    """Batch variant of clean_text (one call per fetch cycle / stream batch)."""
+    return [clean_text(t) for t in texts]
+
+
+def display_batch(texts):
+    """Batch variant of display_text."""
+    return [display_text(t) for t in texts]
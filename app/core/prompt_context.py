@@ -0,0 +1,90 @@
+import zlib
+from collections import namedtuple
+
+from app.config import Config
+from app.core.preprocessing import display_text
+from app.core.text_utils import normalize_turkish
+
+# Rough Gemini token count for Turkish news text (no API round trip per item)
+CHARS_PER_TOKEN = 3.5
+SHINGLE_SIZE = 3
+# A truncated item shorter than this is not worth adding
+MIN_ITEM_TOKENS = 40
+
+ContextStats = namedtuple("ContextStats", ["candidates", "used", "duplicates", "tokens"])
+
+
+def estimate_tokens(text):
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed word n-grams of the normalized text (near-duplicate detection)."""
+    words = normalize_turkish(text).split()
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def truncate_words(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return cut[:space] if space > max_chars // 2 else cut
+
+
+def build_cluster_context(news_items, token_budget=None, max_item_chars=None, threshold=None):
+    """
+    Prompt context for one trend: items ordered by source tier (official first) and
+    recency, near-duplicate reposts dropped (shingle Jaccard >= threshold against an
+    item already kept), and cut to fit the token budget.
+    Shingles rather than stored embeddings keep the summary worker free of the embedding
+    model and the Chroma client (its related trends are computed by the gravity worker).
+    news_items: RawNews rows (source_tier, published_at, clean_content, content).
+    Returns (text, ContextStats).
+    """
+    token_budget = token_budget or Config.SUMMARY_CONTEXT_TOKENS
+    max_item_chars = max_item_chars or Config.SUMMARY_ITEM_MAX_CHARS
+    threshold = threshold or Config.SUMMARY_DEDUP_THRESHOLD
+
+    ordered = sorted(
+        news_items,
+        key=lambda n: (n.source_tier or 3, -(n.published_at.timestamp() if n.published_at else 0))
+    )
+
+    lines, kept_shingles = [], []
+    duplicates, used_tokens = 0, 0
+    for n in ordered:
+        text = n.clean_content if n.clean_content is not None else display_text(n.content)
+        text = truncate_words((text or "").strip(), max_item_chars)
+        if not text:
+            continue
+
+        item_shingles = shingles(text)
+        if any(jaccard(item_shingles, kept) >= threshold for kept in kept_shingles):
+            duplicates += 1
+            continue
+
+        line = f"- {text}"
+        tokens = estimate_tokens(line)
+        remaining = token_budget - used_tokens
+        if tokens > remaining:
+            # The highest-ranked leftover is shortened to fill the budget, then we stop
+            if remaining >= MIN_ITEM_TOKENS:
+                line = truncate_words(line, int(remaining * CHARS_PER_TOKEN))
+                lines.append(line)
+                used_tokens += estimate_tokens(line)
+            break
+
+        lines.append(line)
+        kept_shingles.append(item_shingles)
+        used_tokens += tokens
+
+    return "\n".join(lines), ContextStats(len(news_items), len(lines), duplicates, used_tokens)
@@ -0,0 +1,38 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second refill a bucket of `capacity`.
+    acquire() blocks until a token is available, so callers sharing one bucket stay
+    within the quota whatever their concurrency.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Waits for `tokens` and takes them; returns the seconds spent waiting.
+        A request larger than the bucket takes a full bucket instead of waiting forever.
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
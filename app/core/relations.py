@@ -0,0 +1,74 @@
+import logging
+from datetime import timedelta
+
+from app.config import Config
+from app.database.models import Trend, TrendRelation, utc_now
+
+logger = logging.getLogger(__name__)
+
+RELATED_LIMIT = 4
+
+
+def relations_stale(trend, now=None):
+    """True when a trend has never had its relations computed or they are older than the refresh interval."""
+    if not trend.relations_updated_at:
+        return True
+    now = now or utc_now()
+    return now - trend.relations_updated_at > timedelta(hours=Config.RELATIONS_REFRESH_HOURS)
+
+
+def refresh_relations(db, trend, limit=RELATED_LIMIT):
+    """
+    Recomputes the related trends of one trend with a vector search and replaces its
+    trend_relations rows. Runs in single-threaded background workers only (scorer, gravity, backfill);
+    the caller commits and then bumps the trend generation, since cached trend pages embed the
+    related titles and links.
+    """
+    # Imported here so that web processes reading relations never load the embedding model
+    from app.core.ai_engine import ai_engine
+
+    related_cluster_ids = ai_engine.get_related_trends(trend.cluster_id, limit=limit)
+    related = []
+    if related_cluster_ids:
+        rows = db.query(Trend.id, Trend.cluster_id).filter(
+            Trend.cluster_id.in_(related_cluster_ids),
+            Trend.id != trend.id
+        ).all()
+        id_by_cluster = {row.cluster_id: row.id for row in rows}
+        related = [id_by_cluster[cid] for cid in related_cluster_ids if cid in id_by_cluster]
+
+    now = utc_now()
+    db.query(TrendRelation).filter(TrendRelation.trend_id == trend.id).delete(synchronize_session=False)
+    db.add_all([
+        TrendRelation(trend_id=trend.id, related_trend_id=related_id, rank=rank, computed_at=now)
+        for rank, related_id in enumerate(related)
+    ])
+    trend.relations_updated_at = now
+    return related
+
+
+def load_related(db, trend_id, limit=RELATED_LIMIT):
+    """Precomputed related trends (active only), in similarity order. A single indexed join."""
+    return db.query(Trend).join(
+        TrendRelation, TrendRelation.related_trend_id == Trend.id
+    ).filter(
+        TrendRelation.trend_id == trend_id,
+        Trend.is_active == True
+    ).order_by(TrendRelation.rank).limit(limit).all()
+
+
+def load_related_many(db, trend_ids, limit=RELATED_LIMIT):
+    """load_related for many trends in one query: {trend_id: [Trend, ...]}."""
+    rows = db.query(TrendRelation.trend_id, Trend).join(
+        Trend, TrendRelation.related_trend_id == Trend.id
+    ).filter(
+        TrendRelation.trend_id.in_(trend_ids),
+        Trend.is_active == True
+    ).order_by(TrendRelation.trend_id, TrendRelation.rank).all()
+
+    related = {}
+    for trend_id, trend in rows:
+        items = related.setdefault(trend_id, [])
+        if len(items) < limit:
+            items.append(trend)
+    return related
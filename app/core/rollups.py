@@ -0,0 +1,118 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import Config
+from app.database.models import TrendArrivalRollup, utc_now
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Rollup levels: name -> bucket width in seconds (finest first)
+RESOLUTIONS = {
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+# Label format per level for the history chart
+LABEL_FORMATS = {
+    "5m": "%H:%M",
+    "1h": "%d.%m %H:%M",
+    "1d": "%d.%m",
+}
+
+
+def bucket_start(ts, seconds):
+    """Floors a naive UTC datetime to the start of its bucket (aligned to the epoch)."""
+    offset = int((ts - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
+
+
+def resolution_for_window(hours):
+    """Finest level whose retention still covers the requested window."""
+    if hours <= Config.ROLLUP_5M_RETENTION_HOURS:
+        return "5m"
+    if hours <= Config.ROLLUP_1H_RETENTION_DAYS * 24:
+        return "1h"
+    return "1d"
+
+
+def record_arrival(db, trend_id, timestamp=None):
+    """
+    Adds one arrival to every rollup level in a single upsert.
+    Runs inside the caller's transaction, next to the TrendArrivals insert.
+    """
+    timestamp = timestamp or utc_now()
+    rows = [
+        {"trend_id": trend_id, "resolution": name, "bucket_start": bucket_start(timestamp, seconds), "count": 1}
+        for name, seconds in RESOLUTIONS.items()
+    ]
+    stmt = pg_insert(TrendArrivalRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["trend_id", "resolution", "bucket_start"],
+        set_={"count": TrendArrivalRollup.count + stmt.excluded.count}
+    )
+    db.execute(stmt)
+
+
+def load_buckets(db, trend_id, since, resolution):
+    """Range scan over one rollup level: [(bucket_start, count), ...] in time order."""
+    return db.query(TrendArrivalRollup.bucket_start, TrendArrivalRollup.count).filter(
+        TrendArrivalRollup.trend_id == trend_id,
+        TrendArrivalRollup.resolution == resolution,
+        TrendArrivalRollup.bucket_start >= bucket_start(since, RESOLUTIONS[resolution])
+    ).order_by(TrendArrivalRollup.bucket_start).all()
+
+
+def compact_rollups(db):
+    """
+    Drops fine-grained buckets that are past their retention. The coarser levels
+    already hold the same counts, so older charts are served from them.
+    """
+    now = utc_now()
+    cutoffs = {
+        "5m": now - timedelta(hours=Config.ROLLUP_5M_RETENTION_HOURS),
+        "1h": now - timedelta(days=Config.ROLLUP_1H_RETENTION_DAYS),
+    }
+    removed = 0
+    for resolution, cutoff in cutoffs.items():
+        removed += db.query(TrendArrivalRollup).filter(
+            TrendArrivalRollup.resolution == resolution,
+            TrendArrivalRollup.bucket_start < cutoff
+        ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+# Rebuild of all levels for a set of trends from trend_arrivals (used by the backfill job).
+# Counts are set, not added, so re-running it is safe.
+REBUILD_SQL = text("""
+    INSERT INTO trend_arrival_rollups (trend_id, resolution, bucket_start, count)
+    SELECT trend_id, '5m',
+           date_trunc('hour', timestamp) + floor(extract(minute FROM timestamp) / 5) * interval '5 minutes',
+           count(*)
+      FROM trend_arrivals WHERE trend_id = ANY(:ids) AND timestamp >= :fine_since
+     GROUP BY 1, 3
+    UNION ALL
+    SELECT trend_id, '1h', date_trunc('hour', timestamp), count(*)
+      FROM trend_arrivals WHERE trend_id = ANY(:ids) AND timestamp >= :hourly_since
+     GROUP BY 1, 3
+    UNION ALL
+    SELECT trend_id, '1d', date_trunc('day', timestamp), count(*)
+      FROM trend_arrivals WHERE trend_id = ANY(:ids)
+     GROUP BY 1, 3
+    ON CONFLICT (trend_id, resolution, bucket_start) DO UPDATE SET count = EXCLUDED.count
+""")
+
+
+def rebuild_rollups(db, trend_ids):
+    now = utc_now()
+    db.execute(REBUILD_SQL, {
+        "ids": list(trend_ids),
+        "fine_since": now - timedelta(hours=Config.ROLLUP_5M_RETENTION_HOURS),
+        "hourly_since": now - timedelta(days=Config.ROLLUP_1H_RETENTION_DAYS),
+    })
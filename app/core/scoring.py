@@ -9,6 +9,12 @@ from app.database.models import Trend, RawNews, TrendArrivals
 from app.core.ai_engine import ai_engine
 from app.core.text_utils import normalize_turkish, JUNK_KEYWORDS
 from app.core.alert_service import alert_service
+# get_source_tier در ماژول سبک source_tiers قرار گرفت تا کالکتورها بدون بارگذاری مدل از آن استفاده کنند
+from app.core.source_tiers import get_source_tier
+from app.core.cache import trend_cache
+from app.core.relations import relations_stale, refresh_relations
+from app.core.live_events import live_events, RESCORED
+from app.core.cards import refresh_card
 from app.config import Config
 
 # تنظیمات لاگر برای ردیابی دقیق فرآیند امتیازدهی
@@ -19,23 +25,6 @@ logger = logging.getLogger(__name__)
 OLLAMA_API_URL = Config.OLLAMA_API_URL
 LOCAL_MODEL_NAME = Config.LOCAL_MODEL_NAME
 
-def get_source_tier(source_name: str) -> int:
-    """
-    تعیین سطح اعتبار منبع بر اساس نام آن (بروزرسانی شده برای فاز ۶).
-    اکنون لیست منابع از فایل Config خوانده می‌شود تا مدیریت آن داینامیک باشد.
-    """
-    if not source_name: return 3
-    name = source_name.strip()
-    
-    # چک کردن منابع لایه ۱
-    if any(s.lower() in name.lower() for s in Config.SOURCE_CONFIG["TIER_1_OFFICIAL"]): 
-        return 1
-    # چک کردن منابع لایه ۲
-    if any(s.lower() in name.lower() for s in Config.SOURCE_CONFIG["TIER_2_REPUTABLE"]): 
-        return 2
-        
-    return 3
-
 # --- لیست کلمات کلیدی بحرانی برای تقویت آنی امتیاز (Strategic Boost) ---
 CRITICAL_KEYWORDS = {
     "high": ["deprem", "patlama", "istifa", "suikast", "darbe", "saldırı", "acil durum", "infaz", "terör", "faci", "şehit"],
@@ -275,9 +264,22 @@ class TPSCalculator:
         trend.final_tps = final_tps
         trend.score = final_tps # همگام‌سازی برای کدهای قدیمی
         trend.last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        # کارت لیست با امتیاز جدید
+        refresh_card(self.db, trend)
+
+        # ۷. بازمحاسبه ترندهای مرتبط در صورت قدیمی بودن (جستجوی برداری فقط در ورکر)
+        if relations_stale(trend):
+            try:
+                refresh_relations(self.db, trend)
+            except Exception as ex:
+                logger.error(f"⚠️ Related trends refresh failed for {trend_id}: {ex}")
         
         try:
             self.db.commit()
+            # امتیاز و مسیر ترند تغییر کرده است: کش جزئیات و لیست‌ها منقضی می‌شود
+            trend_cache.invalidate_trend(trend_id)
+            live_events.publish(RESCORED, trend)
             logger.info(f"✅ [Async TPS] Trend {trend_id} Scored: {final_tps:.2f} | Accel: {trend.trajectory}")
             return final_tps
         except Exception as ex:
@@ -0,0 +1,51 @@
+from sqlalchemy import func, text
+
+from app.database.models import Trend
+
+SEARCH_CONFIG = "turkish"
+
+# How much of the trend's news is indexed with weight C
+SEARCH_NEWS_ITEMS = 5
+SEARCH_NEWS_CHARS = 1000
+
+# Weighted document: title (A), AI summary (B), latest news bodies (C)
+REFRESH_SQL = text(f"""
+    UPDATE trends t SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.summary, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(left(coalesce(n.clean_content, n.content), {SEARCH_NEWS_CHARS}), ' ')
+              FROM (SELECT clean_content, content FROM raw_news
+                     WHERE trend_id = t.id
+                     ORDER BY published_at DESC
+                     LIMIT {SEARCH_NEWS_ITEMS}) n
+        ), '')), 'C')
+    WHERE t.id = ANY(:ids)
+""")
+
+
+def refresh_search_vectors(db, trend_ids):
+    """
+    Recomputes the stored search_vector of the given trends inside the caller's
+    transaction. Called when a trend is created and when it is summarized.
+    """
+    trend_ids = list(trend_ids)
+    if trend_ids:
+        db.execute(REFRESH_SQL, {"ids": trend_ids})
+
+
+def refresh_search_vector(db, trend_id):
+    refresh_search_vectors(db, [trend_id])
+
+
+def search_query(q):
+    return func.plainto_tsquery(SEARCH_CONFIG, q)
+
+
+def search_match(q):
+    """WHERE clause served by the GIN index on trends.search_vector."""
+    return Trend.search_vector.op('@@')(search_query(q))
+
+
+def search_rank(q):
+    return func.ts_rank(Trend.search_vector, search_query(q))
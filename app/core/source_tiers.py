@@ -0,0 +1,18 @@
+from app.config import Config
+
+def get_source_tier(source_name: str) -> int:
+    """
+    تعیین سطح اعتبار منبع بر اساس نام آن (بروزرسانی شده برای فاز ۶).
+    اکنون لیست منابع از فایل Config خوانده می‌شود تا مدیریت آن داینامیک باشد.
+    """
+    if not source_name: return 3
+    name = source_name.strip()
+    
+    # چک کردن منابع لایه ۱
+    if any(s.lower() in name.lower() for s in Config.SOURCE_CONFIG["TIER_1_OFFICIAL"]): 
+        return 1
+    # چک کردن منابع لایه ۲
+    if any(s.lower() in name.lower() for s in Config.SOURCE_CONFIG["TIER_2_REPUTABLE"]): 
+        return 2
+        
+    return 3
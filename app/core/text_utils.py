@@ -1,5 +1,5 @@
 import re
-from bs4 import BeautifulSoup
+from app.core import preprocessing
 
 # Spam keywords for filtering out advertisements and fraud
 SPAM_KEYWORDS = [
@@ -8,6 +8,12 @@ SPAM_KEYWORDS = [
     'reklam', 'tıkla', 'linkte', 'kazan'
 ]
 
+# Unambiguous gambling/ad phrases: a single hit is enough to reject a message
+STRONG_SPAM_KEYWORDS = ['casino', 'çevrimsiz', 'yatırımsız', 'deneme bonusu', 'yasal bahis']
+
+# Keywords matched at word start, so 'bet' hits "bet365" but not "rekabet"
+SPAM_PATTERN = re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(k) for k in SPAM_KEYWORDS) + r')')
+
 # Junk keywords for mandatory low-scoring (Astrology/Horoscopes/Spam)
 JUNK_KEYWORDS = [
     'burç', 'fal ', 'günlük burç', 'astroloji', 'horoskop', 'astrolog'
@@ -45,40 +51,24 @@ def is_spam(text: str) -> bool:
             
     return False
 
+def find_spam_keywords(text: str) -> set:
+    """
+    Returns the distinct spam keywords found at word boundaries.
+    Common news words such as 'kazan' (kazandı) or 'tıkla' can appear in legitimate
+    text, so callers should weigh the number of hits rather than reject on one.
+    """
+    if not text:
+        return set()
+    return set(SPAM_PATTERN.findall(normalize_turkish(text)))
+
 def clean_text(text: str) -> str:
     """
     پاکسازی پیشرفته متن (بروزرسانی شده برای حذف کدهای HTML)
     این تابع تمام تگ‌های HTML، آدرس‌ها، منشن‌ها و فضاهای خالی اضافی را حذف می‌کند.
+    پیاده‌سازی در ماژول preprocessing است: متن ساده بدون پارسر HTML پردازش می‌شود
+    و رگکس‌ها یک بار در سطح ماژول کامپایل شده‌اند.
     """
-    if not text:
-        return ""
-        
-    # ۱. حذف تگ‌های HTML با استفاده از BeautifulSoup
-    # این بخش مشکل نمایش کدهای سایت‌هایی مثل Milliyet را حل می‌کند
-    try:
-        soup = BeautifulSoup(text, "html.parser")
-        # حذف بخش‌هایی که معمولاً حاوی کدهای مزاحم هستند مثل 'İlginizi Çekebilir'
-        for section in soup.find_all("section", class_="mceNonEditable"):
-            section.decompose()
-        text = soup.get_text(separator=" ")
-    except Exception:
-        # اگر BeautifulSoup خطا داد، از رگکس ساده استفاده کن
-        text = re.sub(r'<[^>]+>', '', text)
-
-    # ۲. حذف URLها
-    text = re.sub(r'http\S+|www\.\S+', '', text)
-    
-    # ۳. حذف منشن‌ها و هشتگ‌ها
-    text = re.sub(r'@\w+', '', text)
-    text = re.sub(r'#\w+', '', text)
-    
-    # ۴. حذف کاراکترهای غیرمجاز (فقط حروف ترکی، اعداد و علائم نگارشی پایه)
-    text = re.sub(r'[^\w\sçğıöşüÇĞİÖŞÜ,.?!-]', ' ', text)
-    
-    # ۵. پاکسازی فضاهای خالی اضافی
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    return preprocessing.clean_text(text)
 
 def slugify_turkish(text: str) -> str:
     """
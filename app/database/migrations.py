@@ -0,0 +1,464 @@
+import sys
+import os
+import argparse
+import logging
+from datetime import timedelta
+
+from sqlalchemy import inspect, text
+
+# اضافه کردن مسیر ریشه پروژه به sys.path (اجرای مستقیم فایل)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from app.database.models import engine, SessionLocal, SchemaMigration, SystemSettings, utc_now
+
+logger = logging.getLogger("Migrations")
+
+# کلید قفل Advisory پستگرس: اجرای همزمان دو migrate (مثلاً دو db_init) پشت سر هم انجام می‌شود
+MIGRATION_LOCK_KEY = 7417001
+# دستورات ALTER در صف قفل‌های طولانی نمی‌مانند (در غیر این صورت تمام کوئری‌های بعدی پشت آن‌ها قفل می‌شوند)
+LOCK_TIMEOUT = "5s"
+
+# --- Building blocks ---
+
+def run_sql(*statements):
+    """مرحله تراکنشی: همه دستورات با هم اعمال می‌شوند یا هیچ‌کدام"""
+    def step(bind):
+        with bind.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            for statement in statements:
+                conn.execute(text(statement))
+    return step
+
+def create_index_concurrently(bind, name, definition, unique=False):
+    """
+    CREATE INDEX CONCURRENTLY خارج از تراکنش (بدون قفل نوشتن روی جدول).
+    ایندکس نامعتبر باقی‌مانده از اجرای ناموفق قبلی ابتدا حذف می‌شود.
+    """
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            logger.warning(f"♻️ Dropping invalid index '{name}' left by an interrupted build...")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+
+def concurrent_index(name, definition, unique=False):
+    return lambda bind: create_index_concurrently(bind, name, definition, unique)
+
+# --- Migrations ---
+
+# اسکیمای پایه ثابت (معادل create_all مدل‌ها در زمان معرفی نسخه‌بندی، بدون ایندکس‌های نسخه‌های ۲ تا ۵).
+# هرگز با مدل‌های فعلی همگام نمی‌شود؛ هر تغییر بعدی یک مهاجرت جدید است.
+# (جدول، دستورات ساخت جدول و ایندکس‌های آن) به ترتیب وابستگی کلیدهای خارجی
+BASELINE_TABLES = [
+    ("trends", [
+        """CREATE TABLE trends (
+            id SERIAL PRIMARY KEY,
+            cluster_id VARCHAR(100),
+            slug VARCHAR(255),
+            title VARCHAR(255),
+            summary TEXT,
+            category VARCHAR(50),
+            message_count INTEGER,
+            score FLOAT,
+            tps_signal FLOAT,
+            tps_confidence FLOAT,
+            final_tps FLOAT,
+            previous_tps FLOAT,
+            trajectory VARCHAR(20),
+            needs_scoring BOOLEAN,
+            search_vector TSVECTOR,
+            card_json TEXT,
+            relations_updated_at TIMESTAMP WITHOUT TIME ZONE,
+            first_seen TIMESTAMP WITHOUT TIME ZONE,
+            last_updated TIMESTAMP WITHOUT TIME ZONE,
+            is_active BOOLEAN
+        )""",
+        "CREATE INDEX ix_trends_id ON trends (id)",
+        "CREATE UNIQUE INDEX ix_trends_cluster_id ON trends (cluster_id)",
+        "CREATE UNIQUE INDEX ix_trends_slug ON trends (slug)",
+        "CREATE INDEX ix_trends_needs_scoring ON trends (needs_scoring)",
+    ]),
+    ("raw_news", [
+        """CREATE TABLE raw_news (
+            id SERIAL PRIMARY KEY,
+            source_type VARCHAR(50),
+            source_name VARCHAR(100),
+            source_tier INTEGER,
+            external_id VARCHAR(255) UNIQUE,
+            content TEXT,
+            clean_content TEXT,
+            content_preview VARCHAR(320),
+            published_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            trend_id INTEGER REFERENCES trends (id)
+        )""",
+        "CREATE INDEX ix_raw_news_id ON raw_news (id)",
+        "CREATE INDEX idx_source_time ON raw_news (source_type, published_at)",
+    ]),
+    ("trend_arrivals", [
+        """CREATE TABLE trend_arrivals (
+            id SERIAL PRIMARY KEY,
+            trend_id INTEGER NOT NULL REFERENCES trends (id),
+            raw_news_id INTEGER REFERENCES raw_news (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE
+        )""",
+        "CREATE INDEX ix_trend_arrivals_id ON trend_arrivals (id)",
+    ]),
+    ("trend_arrival_rollups", [
+        """CREATE TABLE trend_arrival_rollups (
+            trend_id INTEGER NOT NULL REFERENCES trends (id) ON DELETE CASCADE,
+            resolution VARCHAR(8) NOT NULL,
+            bucket_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (trend_id, resolution, bucket_start)
+        )""",
+    ]),
+    ("trend_relations", [
+        """CREATE TABLE trend_relations (
+            trend_id INTEGER NOT NULL REFERENCES trends (id) ON DELETE CASCADE,
+            related_trend_id INTEGER NOT NULL REFERENCES trends (id) ON DELETE CASCADE,
+            rank INTEGER NOT NULL,
+            computed_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (trend_id, related_trend_id)
+        )""",
+    ]),
+    ("system_settings", [
+        """CREATE TABLE system_settings (
+            id SERIAL PRIMARY KEY,
+            key VARCHAR(50),
+            value VARCHAR(255),
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )""",
+        "CREATE INDEX ix_system_settings_id ON system_settings (id)",
+        "CREATE UNIQUE INDEX ix_system_settings_key ON system_settings (key)",
+    ]),
+]
+
+# جدول دفترچه مهاجرت‌ها (پیش از هر نسخه توسط Runner ساخته می‌شود)
+SCHEMA_MIGRATIONS_DDL = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP WITHOUT TIME ZONE
+)"""
+
+def baseline(bind):
+    """
+    اسکیمای پایه: جداول ناموجود با DDL ثابت BASELINE_TABLES (مانند create_all فقط جداول ناموجود)
+    و ستون‌هایی که init_db قدیمی به مرور اضافه می‌کرد (برای دیتابیس‌هایی که پیش از سیستم نسخه‌بندی ساخته شده‌اند).
+    """
+    existing = set(inspect(bind).get_table_names())
+    legacy_trends = "trends" in existing
+    trend_columns = {c['name'] for c in inspect(bind).get_columns('trends')} if legacy_trends else set()
+
+    statements = [ddl for table, table_ddl in BASELINE_TABLES if table not in existing for ddl in table_ddl]
+    statements += [
+        # فیلدهای منسوخ شده (فارسی)
+        "ALTER TABLE trends DROP COLUMN IF EXISTS title_fa",
+        "ALTER TABLE trends DROP COLUMN IF EXISTS summary_fa",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS tps_signal FLOAT DEFAULT 0.0",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS tps_confidence FLOAT DEFAULT 0.0",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS final_tps FLOAT DEFAULT 0.0",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS previous_tps FLOAT DEFAULT 0.0",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS trajectory VARCHAR(20) DEFAULT 'steady'",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS relations_updated_at TIMESTAMP",
+        "ALTER TABLE trends ADD COLUMN IF NOT EXISTS card_json TEXT",
+        "ALTER TABLE raw_news ADD COLUMN IF NOT EXISTS source_tier INTEGER DEFAULT 3",
+        "ALTER TABLE raw_news ADD COLUMN IF NOT EXISTS clean_content TEXT",
+        "ALTER TABLE raw_news ADD COLUMN IF NOT EXISTS content_preview VARCHAR(320)",
+    ]
+    # ستون‌های slug و needs_scoring جدول trends قدیمی همراه ایندکس idx_ خود اضافه می‌شوند
+    indexes = []
+    if legacy_trends and 'slug' not in trend_columns:
+        statements.append("ALTER TABLE trends ADD COLUMN slug VARCHAR(255)")
+        indexes.append(("idx_trends_slug", "ON trends (slug)"))
+    if legacy_trends and 'needs_scoring' not in trend_columns:
+        statements.append("ALTER TABLE trends ADD COLUMN needs_scoring BOOLEAN DEFAULT TRUE")
+        indexes.append(("idx_needs_scoring", "ON trends (needs_scoring)"))
+
+    run_sql(*statements)(bind)
+    for name, definition in indexes:
+        create_index_concurrently(bind, name, definition)
+
+def seed_system_settings(bind):
+    with SessionLocal(bind=bind) as session:
+        if not session.query(SystemSettings).filter_by(key="auto_publish_threshold").first():
+            session.add(SystemSettings(key="auto_publish_threshold", value="35.0"))
+            session.commit()
+
+# جداول سری زمانی: (جدول، کلید پارتیشن، مقدار جایگزین برای NULL، ایندکس‌های جدول والد، کلیدهای خارجی جدول والد)
+TIME_SERIES_TABLES = [
+    ("raw_news", "published_at", "COALESCE(created_at, now() AT TIME ZONE 'utc')", [
+        ("idx_source_time", "(source_type, published_at)"),
+        ("idx_raw_news_trend_published", "(trend_id, published_at DESC)"),
+        ("ix_raw_news_external_id", "(external_id)"),
+    ], [
+        "CONSTRAINT raw_news_trend_id_fkey FOREIGN KEY (trend_id) REFERENCES trends (id)",
+    ]),
+    ("trend_arrivals", "timestamp", "now() AT TIME ZONE 'utc'", [
+        ("idx_trend_arrivals_trend_ts", "(trend_id, timestamp)"),
+    ], [
+        "CONSTRAINT trend_arrivals_trend_id_fkey FOREIGN KEY (trend_id) REFERENCES trends (id)",
+    ]),
+]
+# اندازه دسته‌های UPDATE برای پر کردن کلید پارتیشن خالی (هر دسته تراکنش جداگانه)
+PARTITION_BACKFILL_BATCH = 5000
+
+def fill_partition_key(bind, table, key, fallback):
+    """پر کردن مقادیر NULL کلید پارتیشن در دسته‌های کوچک (قفل سطری کوتاه، بدون قفل جدول)"""
+    while True:
+        with bind.begin() as conn:
+            updated = conn.execute(text(
+                f"UPDATE {table} SET {key} = {fallback} WHERE id IN "
+                f"(SELECT id FROM {table} WHERE {key} IS NULL LIMIT {PARTITION_BACKFILL_BATCH})"
+            )).rowcount
+        if not updated:
+            return
+
+def partition_online(bind, table, key, fallback, indexes, foreign_keys):
+    """
+    تبدیل یک جدول به جدول والد پارتیشن‌بندی‌شده بدون کپی داده: جدول فعلی با همه داده‌هایش
+    پارتیشن تاریخی ({table}_legacy) والد جدید می‌شود.
+    کارهای سنگین (پر کردن NULL ها، VALIDATE قید CHECK، ساخت ایندکس‌ها) بدون قفل نوشتن انجام می‌شوند؛
+    ATTACH به لطف CHECK معتبر و ایندکس‌ها/کلیدهای خارجی هم‌ارز، جدول را اسکن یا بازسازی نمی‌کند.
+    قفل انحصاری فقط برای تغییر نام‌ها و تغییرات کاتالوگ گرفته می‌شود. در صورت قطع، اجرای مجدد از همان‌جا ادامه می‌دهد.
+    """
+    from app.core.partitions import ensure_partitions, next_period, period_start
+
+    staging = f"{table}_new"
+    bound_check = f"{table}_partition_bound"
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        # جدول والد نیمه‌کاره اجرای قبلی خالی است
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        # نام ایندکس‌ها برای جدول والد آزاد می‌شود؛ ایندکس‌های فعلی به پارتیشن تاریخی تعلق می‌گیرند
+        for name, _ in indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy"))
+
+    # ۱. کلید پارتیشن بدون NULL و محدوده پارتیشن تاریخی (تا پایان دوره فعلی؛ ورودهای تا آن زمان همان‌جا می‌مانند)
+    fill_partition_key(bind, table, key, fallback)
+    with bind.connect() as conn:
+        first, last = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).first()
+    now = utc_now()
+    lower = period_start(first or now)
+    upper = next_period(period_start(max(last or now, now)))
+
+    # ۲. قید CHECK معادل محدوده پارتیشن: NOT VALID فوراً برای ردیف‌های جدید اعمال می‌شود، VALIDATE نوشتن را قفل نمی‌کند
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {bound_check}"))
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {bound_check} CHECK ({key} IS NOT NULL "
+            f"AND {key} >= '{lower.isoformat()}' AND {key} < '{upper.isoformat()}') NOT VALID"
+        ))
+    fill_partition_key(bind, table, key, fallback)
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {bound_check}"))
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        # قید CHECK معتبر اسکن SET NOT NULL را حذف می‌کند
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL"))
+
+    # ۳. ایندکس‌های هم‌ارز جدول والد روی پارتیشن تاریخی (ATTACH آن‌ها را به جای ساخت دوباره می‌پذیرد)
+    for name, columns in indexes:
+        create_index_concurrently(bind, f"{name}_legacy", f"ON {table} {columns}")
+    legacy_pkey = f"{table}_legacy_pkey"
+    create_index_concurrently(bind, legacy_pkey, f"ON {table} (id, {key})", unique=True)
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        pkey = conn.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype = 'p'"
+        ), {"t": table}).scalar()
+        if pkey != legacy_pkey:
+            conn.execute(text(
+                f"ALTER TABLE {table} DROP CONSTRAINT {pkey}, "
+                f"ADD CONSTRAINT {legacy_pkey} PRIMARY KEY USING INDEX {legacy_pkey}"
+            ))
+
+    # ۴. جدول والد خالی با کلید اصلی، ایندکس‌ها و کلیدهای خارجی نهایی
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text(f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})"))
+        conn.execute(text(f"ALTER TABLE {staging} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})"))
+        for foreign_key in foreign_keys:
+            conn.execute(text(f"ALTER TABLE {staging} ADD {foreign_key}"))
+        for name, columns in indexes:
+            conn.execute(text(f"CREATE INDEX {name} ON {staging} {columns}"))
+
+    # ۵. جابجایی کوتاه: تغییر نام‌ها، ATTACH بدون اسکن، پارتیشن‌های بعدی و DEFAULT
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_legacy"))
+        conn.execute(text(f"ALTER TABLE {staging} RENAME TO {table}"))
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        conn.execute(text(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {bound_check}"))
+        ensure_partitions(conn, table, upper, next_period(upper))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+        # Sequence شناسه به والد تعلق می‌گیرد تا با حذف پارتیشن تاریخی (Retention) حذف نشود
+        sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{table}_legacy', 'id')")).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+def partition_time_series(bind):
+    """
+    تبدیل raw_news و trend_arrivals به جداول پارتیشن‌بندی‌شده بر اساس زمان (RANGE)، به صورت آنلاین (partition_online).
+    کلید اصلی شامل کلید پارتیشن است، پس یکتایی external_id در news_ingest_keys تضمین می‌شود
+    و کلید خارجی trend_arrivals.raw_news_id حذف می‌شود (مدل هم آن را تعریف نمی‌کند؛ آرشیو ورودها را پیش از اخبار حذف می‌کند).
+    """
+    from app.core.partitions import is_partitioned
+
+    with bind.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        # کلید اصلی raw_news (id) در partition_online عوض می‌شود و این ارجاع مانع آن است
+        conn.execute(text("ALTER TABLE trend_arrivals DROP CONSTRAINT IF EXISTS trend_arrivals_raw_news_id_fkey"))
+
+    for table, key, fallback, indexes, foreign_keys in TIME_SERIES_TABLES:
+        with bind.connect() as conn:
+            done = is_partitioned(conn, table)
+        if not done:
+            partition_online(bind, table, key, fallback, indexes, foreign_keys)
+
+# پنجره بازنویسی external_id های RSS قدیمی (لینک‌های قدیمی‌تر دیگر در فیدها نیستند؛ rss_fetcher هر دو شکل را بررسی می‌کند)
+CANONICAL_ID_BACKFILL_DAYS = 14
+
+def canonicalize_recent_external_ids(bind):
+    """
+    external_id اخبار RSS اخیر به شکل Canonical (admission.canonicalize_url) بازنویسی می‌شود
+    تا لینک‌های هنوز موجود در فیدها پس از استقرار دوباره وارد و خوشه‌بندی نشوند.
+    ردیفی که شکل Canonical آن از قبل ذخیره شده دست نمی‌خورد.
+    """
+    from app.core.admission import canonicalize_url
+
+    since = utc_now() - timedelta(days=CANONICAL_ID_BACKFILL_DAYS)
+    with bind.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, published_at, external_id FROM raw_news "
+            "WHERE source_type = 'rss' AND published_at >= :since"
+        ), {"since": since}).all()
+        stored = {external_id for _, _, external_id in rows}
+        rewritten = 0
+        for news_id, published_at, external_id in rows:
+            canonical = canonicalize_url(external_id)
+            if canonical == external_id or canonical in stored:
+                continue
+            conn.execute(text(
+                "UPDATE raw_news SET external_id = :canonical WHERE id = :id AND published_at = :published_at"
+            ), {"canonical": canonical, "id": news_id, "published_at": published_at})
+            stored.add(canonical)
+            rewritten += 1
+    logger.info(f"🔗 {rewritten} RSS external_id(s) rewritten to canonical form.")
+
+def ingest_keys_from_archive(bind):
+    """کلیدهای ورود اخباری که پیش از news_ingest_keys به آرشیو Parquet منتقل شده‌اند"""
+    from app.core.archive import archived_external_ids
+
+    for external_ids in archived_external_ids():
+        if not external_ids:
+            continue
+        with bind.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO news_ingest_keys (external_id, created_at) VALUES (:external_id, :now) "
+                "ON CONFLICT DO NOTHING"
+            ), [{"external_id": i, "now": utc_now()} for i in external_ids])
+
+# (version, name, step) - فقط به انتها اضافه شود؛ نسخه‌های اعمال‌شده هرگز ویرایش نمی‌شوند
+MIGRATIONS = [
+    (1, "baseline", baseline),
+    (2, "index_trends_search_vector", concurrent_index("idx_trends_search_vector", "ON trends USING GIN (search_vector)")),
+    (3, "index_raw_news_trend_published", concurrent_index("idx_raw_news_trend_published", "ON raw_news (trend_id, published_at DESC)")),
+    (4, "index_trends_first_seen_id", concurrent_index("idx_trends_first_seen_id", "ON trends (first_seen DESC, id DESC)")),
+    (5, "index_trend_arrivals_trend_ts", concurrent_index("idx_trend_arrivals_trend_ts", "ON trend_arrivals (trend_id, timestamp)")),
+    (6, "seed_system_settings", seed_system_settings),
+    (7, "partition_raw_news_and_trend_arrivals", partition_time_series),
+    (8, "archived_trends_index", run_sql(
+        """CREATE TABLE IF NOT EXISTS archived_trends (
+            trend_id INTEGER PRIMARY KEY,
+            cluster_id VARCHAR(100),
+            slug VARCHAR(255),
+            title VARCHAR(255),
+            month VARCHAR(7) NOT NULL,
+            part VARCHAR(32) NOT NULL,
+            archived_at TIMESTAMP WITHOUT TIME ZONE
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_archived_trends_cluster_id ON archived_trends (cluster_id)",
+        "CREATE INDEX IF NOT EXISTS ix_archived_trends_slug ON archived_trends (slug)",
+    )),
+    (9, "canonicalize_recent_rss_external_ids", canonicalize_recent_external_ids),
+    (10, "news_ingest_keys", run_sql(
+        """CREATE TABLE IF NOT EXISTS news_ingest_keys (
+            external_id VARCHAR(255) PRIMARY KEY,
+            created_at TIMESTAMP WITHOUT TIME ZONE
+        )""",
+        "INSERT INTO news_ingest_keys (external_id, created_at) "
+        "SELECT external_id, MIN(created_at) FROM raw_news WHERE external_id IS NOT NULL "
+        "GROUP BY external_id ON CONFLICT DO NOTHING",
+    )),
+    (11, "ingest_keys_from_archive", ingest_keys_from_archive),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# --- Runner ---
+
+def current_version(bind=engine):
+    """آخرین نسخه اعمال‌شده (۰ برای دیتابیس خالی). فقط یک SELECT؛ مناسب بررسی هنگام راه‌اندازی وب."""
+    if not inspect(bind).has_table(SchemaMigration.__tablename__):
+        return 0
+    with bind.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def migrate(bind=engine, target=None):
+    """اعمال مهاجرت‌های معوق به ترتیب نسخه؛ هر نسخه پس از موفقیت ثبت می‌شود. خروجی: تعداد نسخه‌های اعمال‌شده."""
+    target = target or LATEST_VERSION
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+            version = current_version(bind)
+            applied = 0
+            for number, name, step in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                logger.info(f"⏳ Applying migration {number:04d}_{name}...")
+                step(bind)
+                with bind.begin() as conn:
+                    conn.execute(SchemaMigration.__table__.insert().values(version=number, name=name, applied_at=utc_now()))
+                applied += 1
+            logger.info(f"✅ Schema at version {max(version, min(target, LATEST_VERSION))} ({applied} migration(s) applied).")
+            return applied
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def check_schema_version(bind=engine):
+    """بررسی هنگام راه‌اندازی وب: (نسخه فعلی، آخرین نسخه). هیچ DDL اجرا نمی‌شود."""
+    version = current_version(bind)
+    if version < LATEST_VERSION:
+        logger.error(f"❌ Database schema is at version {version}, code expects {LATEST_VERSION}. "
+                     f"Run: python3 -m app.database.migrations migrate")
+    return version, LATEST_VERSION
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Versioned schema migrations for TrendiaTR")
+    parser.add_argument("command", nargs="?", choices=["migrate", "status"], default="migrate")
+    parser.add_argument("--target", type=int, help="stop at this version (default: latest)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        version = current_version()
+        pending = [f"{number:04d}_{name}" for number, name, _ in MIGRATIONS if number > version]
+        print(f"Schema version: {version} / {LATEST_VERSION}")
+        for name in pending:
+            print(f"  pending: {name}")
+        return
+    migrate(target=args.target)
+
+if __name__ == "__main__":
+    main()
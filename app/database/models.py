@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Index, Float, ForeignKey, inspect, text
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Index, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from datetime import datetime, timezone
 from app.config import Config
@@ -22,23 +23,36 @@ def utc_now():
     return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class RawNews(Base):
-    """ذخیره اخبار خام دریافتی از منابع مختلف (تلگرام و RSS)"""
+    """
+    ذخیره اخبار خام دریافتی از منابع مختلف (تلگرام و RSS).
+    در دیتابیس بر اساس published_at پارتیشن‌بندی شده است (مهاجرت ۷، app/core/partitions.py).
+    """
     __tablename__ = "raw_news"
     id = Column(Integer, primary_key=True, index=True)
     source_type = Column(String(50)) # rss یا telegram
     source_name = Column(String(100))
     source_tier = Column(Integer, default=3) # لایه اعتبار منبع (1: رسمی، 2: معتبر، 3: ناشناس)
-    external_id = Column(String(255), unique=True)
+    # جدول پارتیشن‌بندی‌شده قید یکتای سراسری روی این ستون ندارد؛ یکتایی با news_ingest_keys تضمین می‌شود
+    external_id = Column(String(255), index=True)
     content = Column(Text)
+    # متن پاک‌شده برای نمایش (بدون HTML) و پیش‌نمایش کوتاه؛ یک بار هنگام دریافت پر می‌شود
+    clean_content = Column(Text, nullable=True)
+    content_preview = Column(String(320), nullable=True)
     published_at = Column(DateTime)
     created_at = Column(DateTime, default=utc_now)
     trend_id = Column(Integer, ForeignKey('trends.id'), nullable=True)
     
-    # رابطه با جدول ورود سیگنال‌ها (برای محاسبات Velocity)
-    arrivals = relationship("TrendArrivals", backref="news_item", cascade="all, delete-orphan")
+    # رابطه با جدول ورود سیگنال‌ها (برای محاسبات Velocity)؛ raw_news_id در دیتابیس کلید خارجی ندارد
+    arrivals = relationship(
+        "TrendArrivals", primaryjoin="RawNews.id == foreign(TrendArrivals.raw_news_id)",
+        backref="news_item", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (Index('idx_source_time', 'source_type', 'published_at'),)
 
+# ایندکس برای واکشی آخرین اخبار هر ترند (source_sample لیست‌ها و صفحات جزئیات)
+Index('idx_raw_news_trend_published', RawNews.trend_id, RawNews.published_at.desc())
+
 class Trend(Base):
     """خوشه‌های خبری پردازش شده و ترندهای شناسایی شده"""
     __tablename__ = "trends"
@@ -68,6 +82,15 @@ class Trend(Base):
     # اگر True باشد، یعنی خبر جدیدی آمده و باید امتیاز دوباره محاسبه شود
     needs_scoring = Column(Boolean, default=True, index=True)
 
+    # بردار جستجوی متنی وزن‌دار (تیتر A، خلاصه B، متن اخبار C) - توسط app/core/search.py بروزرسانی می‌شود
+    search_vector = Column(TSVECTOR, nullable=True)
+
+    # کارت JSON فشرده لیست‌ها؛ توسط نویسندگان (ورکرها) بازسازی می‌شود - app/core/cards.py
+    card_json = Column(Text, nullable=True)
+
+    # زمان آخرین محاسبه ترندهای مرتبط (جدول trend_relations)
+    relations_updated_at = Column(DateTime, nullable=True)
+
     first_seen = Column(DateTime, default=utc_now)
     last_updated = Column(DateTime, default=utc_now)
     is_active = Column(Boolean, default=True)
@@ -76,15 +99,32 @@ class Trend(Base):
     news_items = relationship("RawNews", backref="trend")
     arrival_history = relationship("TrendArrivals", backref="trend", cascade="all, delete-orphan")
 
+# ایندکس ترکیبی برای Keyset Pagination تایم‌لاین (first_seen DESC, id DESC)
+Index('idx_trends_first_seen_id', Trend.first_seen.desc(), Trend.id.desc())
+# ایندکس GIN برای جستجوی متنی
+Index('idx_trends_search_vector', Trend.search_vector, postgresql_using='gin')
+
+class NewsIngestKey(Base):
+    """
+    کلید یکتای ورود هر خبر (external_id) در جدولی بدون پارتیشن؛ تضمین یکتایی در سطح دیتابیس.
+    cluster_worker کلید را در همان تراکنش ذخیره RawNews ثبت می‌کند (ON CONFLICT = تکراری).
+    با حذف پارتیشن‌ها یا آرشیو ترندها حذف نمی‌شود تا لینک‌های قدیمی فیدها دوباره وارد نشوند.
+    """
+    __tablename__ = "news_ingest_keys"
+    external_id = Column(String(255), primary_key=True)
+    created_at = Column(DateTime, default=utc_now)
+
 class TrendArrivals(Base):
     """
     ثبت دقیق لحظه ورود هر خبر به یک ترند.
     این جدول برای محاسبه دقیق پارامتر Velocity (سرعت انتشار) در موتور Scoring حیاتی است.
+    در دیتابیس بر اساس timestamp پارتیشن‌بندی شده است؛ raw_news_id کلید خارجی ندارد
+    (کلید اصلی raw_news شامل published_at است)؛ رابطه فقط در ORM تعریف شده و آرشیو ورودها را پیش از اخبار حذف می‌کند.
     """
     __tablename__ = "trend_arrivals"
     id = Column(Integer, primary_key=True, index=True)
     trend_id = Column(Integer, ForeignKey('trends.id'), nullable=False)
-    raw_news_id = Column(Integer, ForeignKey('raw_news.id'), nullable=True)
+    raw_news_id = Column(Integer, nullable=True)
     timestamp = Column(DateTime, default=utc_now)
 
     # ایندکس ترکیبی برای بهینه‌سازی کوئری‌های نمودار تاریخچه (Time-Series Aggregation)
@@ -92,6 +132,28 @@ class TrendArrivals(Base):
         Index('idx_trend_arrivals_trend_ts', 'trend_id', 'timestamp'),
     )
 
+class TrendArrivalRollup(Base):
+    """
+    شمارش ورود سیگنال‌ها در بازه‌های زمانی (۵ دقیقه، ساعتی، روزانه) برای نمودار تاریخچه.
+    هنگام دریافت هر خبر به صورت تجمعی (Upsert) بروزرسانی می‌شود؛ سطوح ریز پس از مدت نگهداری حذف می‌شوند.
+    """
+    __tablename__ = "trend_arrival_rollups"
+    trend_id = Column(Integer, ForeignKey('trends.id', ondelete='CASCADE'), primary_key=True)
+    resolution = Column(String(8), primary_key=True) # 5m / 1h / 1d
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class TrendRelation(Base):
+    """
+    ترندهای مرتبط از پیش محاسبه شده (جستجوی برداری در ورکرها، نه در مسیر درخواست وب).
+    rank: ترتیب شباهت (۰ = نزدیک‌ترین)
+    """
+    __tablename__ = "trend_relations"
+    trend_id = Column(Integer, ForeignKey('trends.id', ondelete='CASCADE'), primary_key=True)
+    related_trend_id = Column(Integer, ForeignKey('trends.id', ondelete='CASCADE'), primary_key=True)
+    rank = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, default=utc_now)
+
 class SystemSettings(Base):
     """تنظیمات داینامیک سیستم برای مدیریت از پنل ادمین"""
     __tablename__ = "system_settings"
@@ -100,84 +162,35 @@ class SystemSettings(Base):
     value = Column(String(255))
     updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
 
+class ArchivedTrend(Base):
+    """
+    فهرست ترندهای منتقل‌شده به آرشیو سرد Parquet (app/core/archive.py).
+    فایل‌ها: {ARCHIVE_DIR}/{trends|raw_news|trend_arrivals}/month={month}/part-{part}.parquet
+    """
+    __tablename__ = "archived_trends"
+    trend_id = Column(Integer, primary_key=True)
+    cluster_id = Column(String(100), index=True)
+    slug = Column(String(255), index=True, nullable=True)
+    title = Column(String(255), nullable=True)
+    month = Column(String(7), nullable=False)   # YYYY-MM (آخرین بروزرسانی ترند)
+    part = Column(String(32), nullable=False)
+    archived_at = Column(DateTime, default=utc_now)
+
+class SchemaMigration(Base):
+    """نسخه‌های اعمال‌شده اسکیما (app/database/migrations.py)"""
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, default=utc_now)
+
 def init_db():
     """
-    آماده‌سازی، هماهنگ‌سازی و مهاجرت خودکار دیتابیس.
-    این تابع جداول را ساخته و ستون‌های جدید را بدون حذف داده‌ها به جداول موجود اضافه می‌کند.
+    سازگاری با اسکریپت‌های قدیمی: اجرای مهاجرت‌های نسخه‌دار.
+    در Docker فقط سرویس db_init این کار را انجام می‌دهد (python3 -m app.database.migrations).
     """
-    print("⏳ Synchronizing Database (Strategic Mode - TPS 2.1)...")
+    from app.database.migrations import migrate
     try:
-        # ۱. ساخت جداول پایه در صورت عدم وجود
-        Base.metadata.create_all(bind=engine)
-        
-        inspector = inspect(engine)
-        
-        # ۲. بررسی و بروزرسانی جدول trends (مدیریت ستون‌ها و سئو)
-        trend_columns = [c['name'] for c in inspector.get_columns('trends')]
-        with engine.connect() as conn:
-            # الف) حذف فیلدهای منسوخ شده (فارسی) جهت بهینه‌سازی حجم
-            if 'title_fa' in trend_columns:
-                print("🗑️ Removing legacy 'title_fa' column...")
-                conn.execute(text("ALTER TABLE trends DROP COLUMN title_fa"))
-            if 'summary_fa' in trend_columns:
-                print("🗑️ Removing legacy 'summary_fa' column...")
-                conn.execute(text("ALTER TABLE trends DROP COLUMN summary_fa"))
-
-            # ب) مدیریت ستون Slug برای سئو
-            if 'slug' not in trend_columns:
-                print("⚠️ Adding 'slug' column to 'trends'...")
-                conn.execute(text("ALTER TABLE trends ADD COLUMN slug VARCHAR(255)"))
-                conn.execute(text("CREATE INDEX idx_trends_slug ON trends (slug)"))
-            
-            # ج) اضافه کردن فیلدهای پایه TPS
-            if 'tps_signal' not in trend_columns:
-                print("🚀 Adding TPS scoring columns to 'trends'...")
-                conn.execute(text("ALTER TABLE trends ADD COLUMN tps_signal FLOAT DEFAULT 0.0"))
-                conn.execute(text("ALTER TABLE trends ADD COLUMN tps_confidence FLOAT DEFAULT 0.0"))
-                conn.execute(text("ALTER TABLE trends ADD COLUMN final_tps FLOAT DEFAULT 0.0"))
-
-            # د) اضافه کردن فیلدهای ردیابی شتاب و روند حرکت
-            if 'previous_tps' not in trend_columns:
-                print("📈 Adding 'previous_tps' for velocity tracking...")
-                conn.execute(text("ALTER TABLE trends ADD COLUMN previous_tps FLOAT DEFAULT 0.0"))
-            
-            if 'trajectory' not in trend_columns:
-                print("🏹 Adding 'trajectory' status column...")
-                conn.execute(text("ALTER TABLE trends ADD COLUMN trajectory VARCHAR(20) DEFAULT 'steady'"))
-            
-            # ه) اضافه کردن فیلد پردازش آسنکرون (فاز ۶.۲)
-            if 'needs_scoring' not in trend_columns:
-                print("⚡ Adding 'needs_scoring' for Async Processing...")
-                conn.execute(text("ALTER TABLE trends ADD COLUMN needs_scoring BOOLEAN DEFAULT TRUE"))
-                conn.execute(text("CREATE INDEX idx_needs_scoring ON trends (needs_scoring)"))
-            
-            conn.commit()
-
-        # ۳. بررسی و بروزرسانی جدول raw_news
-        news_columns = [c['name'] for c in inspector.get_columns('raw_news')]
-        if 'source_tier' not in news_columns:
-            print("🛡️ Adding 'source_tier' to 'raw_news' table...")
-            with engine.connect() as conn:
-                conn.execute(text("ALTER TABLE raw_news ADD COLUMN source_tier INTEGER DEFAULT 3"))
-                conn.commit()
-        
-        # 4. بررسی و ایجاد ایندکس‌های حیاتی (Performance Tuning)
-        # ایندکس ترکیبی برای نمودار تاریخچه که در فاز ۶.۳ اضافه شد
-        ta_indexes = [i['name'] for i in inspector.get_indexes('trend_arrivals')]
-        if 'idx_trend_arrivals_trend_ts' not in ta_indexes:
-            print("⚡ Creating composite index 'idx_trend_arrivals_trend_ts'...")
-            with engine.connect() as conn:
-                conn.execute(text("CREATE INDEX idx_trend_arrivals_trend_ts ON trend_arrivals (trend_id, timestamp)"))
-                conn.commit()
-        
-        # 5. تنظیمات اولیه سیستم (System Settings Seed)
-        with SessionLocal() as session:
-            if not session.query(SystemSettings).filter_by(key="auto_publish_threshold").first():
-                print("⚙️ Seeding default system settings...")
-                session.add(SystemSettings(key="auto_publish_threshold", value="35.0"))
-                session.commit()
-            
-        print("✅ Database synchronization successful. All strategic fields are ready.")
+        migrate()
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
 
@@ -0,0 +1,230 @@
+import sys
+import os
+import argparse
+import logging
+
+# اضافه کردن مسیر ریشه پروژه به sys.path برای دسترسی به ماژول‌های داخلی
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from app.database.models import SessionLocal, RawNews, Trend
+from app.core.preprocessing import display_text, make_preview
+from app.core.rollups import rebuild_rollups
+from app.core.search import refresh_search_vectors
+from app.core.relations import refresh_relations
+from app.core.cards import refresh_card
+from app.core.identifiers import identifier_index
+from app.core.cache import trend_cache
+
+# تنظیمات لاگینگ
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("BackfillJobs")
+
+DEFAULT_CHUNK_SIZE = 500
+
+def backfill_clean_content(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    پر کردن ستون‌های clean_content و content_preview برای اخبار قدیمی.
+    پیمایش بر اساس id (Keyset) و Commit در هر Chunk انجام می‌شود تا قفل‌ها کوتاه بمانند
+    و اجرای مجدد پس از قطعی از همان نقطه ادامه پیدا کند.
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            rows = db.query(RawNews.id, RawNews.content).filter(
+                RawNews.id > last_id,
+                RawNews.clean_content == None
+            ).order_by(RawNews.id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            updates = []
+            for row in rows:
+                clean = display_text(row.content or "")
+                updates.append({"id": row.id, "clean_content": clean, "content_preview": make_preview(clean)})
+
+            db.bulk_update_mappings(RawNews, updates)
+            db.commit()
+
+            last_id = rows[-1].id
+            total += len(rows)
+            logger.info(f"🧽 [clean_content] {total} rows backfilled (last id: {last_id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [clean_content] Backfill stopped at id {last_id}: {e}")
+    finally:
+        db.close()
+    return total
+
+def backfill_arrival_rollups(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    ساخت trend_arrival_rollups از روی trend_arrivals برای ترندهای موجود.
+    هر Chunk شامل chunk_size ترند است؛ شمارش‌ها جایگزین می‌شوند پس اجرای مجدد بی‌خطر است.
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            ids = [row.id for row in db.query(Trend.id).filter(
+                Trend.id > last_id
+            ).order_by(Trend.id).limit(chunk_size).all()]
+            if not ids:
+                break
+
+            rebuild_rollups(db, ids)
+            db.commit()
+
+            last_id = ids[-1]
+            total += len(ids)
+            logger.info(f"📊 [arrival_rollups] {total} trends rolled up (last id: {last_id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [arrival_rollups] Backfill stopped at trend id {last_id}: {e}")
+    finally:
+        db.close()
+    return total
+
+def backfill_search_vectors(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    محاسبه search_vector برای ترندهایی که هنوز بردار جستجو ندارند (داده‌های قبل از این نسخه).
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            ids = [row.id for row in db.query(Trend.id).filter(
+                Trend.id > last_id,
+                Trend.search_vector == None
+            ).order_by(Trend.id).limit(chunk_size).all()]
+            if not ids:
+                break
+
+            refresh_search_vectors(db, ids)
+            db.commit()
+
+            last_id = ids[-1]
+            total += len(ids)
+            logger.info(f"🔎 [search_vectors] {total} trends indexed (last id: {last_id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [search_vectors] Backfill stopped at trend id {last_id}: {e}")
+    finally:
+        db.close()
+    return total
+
+def backfill_relations(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    محاسبه trend_relations برای ترندهای فعالی که هنوز محاسبه نشده‌اند.
+    هر ترند یک جستجوی برداری دارد؛ بنابراین Chunkها کوچک‌تر هستند.
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    chunk_size = min(chunk_size, 50)
+    try:
+        while True:
+            trends = db.query(Trend).filter(
+                Trend.id > last_id,
+                Trend.is_active == True,
+                Trend.relations_updated_at == None
+            ).order_by(Trend.id).limit(chunk_size).all()
+            if not trends:
+                break
+
+            for trend in trends:
+                refresh_relations(db, trend)
+            db.commit()
+            # صفحات کش‌شده ترند عناوین ترندهای مرتبط را دارند
+            trend_cache.invalidate_trends([t.id for t in trends], lists=False)
+
+            last_id = trends[-1].id
+            total += len(trends)
+            logger.info(f"🔗 [relations] {total} trends processed (last id: {last_id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [relations] Backfill stopped at trend id {last_id}: {e}")
+    finally:
+        db.close()
+    return total
+
+def backfill_cards(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    ساخت card_json برای ترندهای فعالی که هنوز کارت ندارند.
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            trends = db.query(Trend).filter(
+                Trend.id > last_id,
+                Trend.is_active == True,
+                Trend.card_json == None
+            ).order_by(Trend.id).limit(chunk_size).all()
+            if not trends:
+                break
+
+            for trend in trends:
+                refresh_card(db, trend)
+            db.commit()
+
+            last_id = trends[-1].id
+            total += len(trends)
+            logger.info(f"🃏 [cards] {total} cards built (last id: {last_id})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [cards] Backfill stopped at trend id {last_id}: {e}")
+    finally:
+        db.close()
+    return total
+
+def backfill_identifiers(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    بارگذاری slug و cluster_id همه ترندها در کش شناسه‌ها (مثلاً پس از پاک شدن Redis).
+    اسلاگ‌های قدیمی فقط هنگام ارتقای اسلاگ در خلاصه‌ساز ثبت می‌شوند.
+    """
+    db = SessionLocal()
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            rows = db.query(Trend.id, Trend.slug, Trend.cluster_id).filter(
+                Trend.id > last_id
+            ).order_by(Trend.id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                identifier_index.register(row.id, row.slug, row.cluster_id)
+
+            last_id = rows[-1].id
+            total += len(rows)
+            logger.info(f"🪪 [identifiers] {total} trends registered (last id: {last_id})")
+    finally:
+        db.close()
+    return total
+
+JOBS = {
+    "clean_content": backfill_clean_content,
+    "arrival_rollups": backfill_arrival_rollups,
+    "search_vectors": backfill_search_vectors,
+    "relations": backfill_relations,
+    "cards": backfill_cards,
+    "identifiers": backfill_identifiers,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="One-shot chunked backfill jobs for TrendiaTR")
+    parser.add_argument("job", choices=sorted(JOBS), help="backfill job to run")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Running backfill job '{args.job}' (chunk size: {args.chunk_size})...")
+    total = JOBS[args.job](chunk_size=args.chunk_size)
+    logger.info(f"✅ Backfill '{args.job}' finished: {total} rows.")
+
+if __name__ == "__main__":
+    main()
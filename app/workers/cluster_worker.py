@@ -0,0 +1,213 @@
+import sys
+import os
+import time
+import logging
+
+# اضافه کردن مسیر ریشه پروژه به sys.path برای دسترسی به ماژول‌های داخلی
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.database.models import SessionLocal, RawNews, Trend, TrendArrivals, NewsIngestKey, utc_now
+from app.core.ai_engine import ai_engine
+from app.core.ingest_bus import ingest_bus, parse_item
+from app.core.cache import trend_cache
+from app.core.rollups import record_arrival
+from app.core.search import refresh_search_vector
+from app.core.counters import stats_counters
+from app.core.live_events import live_events, CREATED
+from app.core.cards import refresh_card
+from app.core.identifiers import identifier_index
+from app.core.text_utils import slugify_turkish
+
+# تنظیمات لاگینگ
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("ClusterWorker")
+
+def generate_initial_slug(db, text, trend_id=None):
+    """
+    SEO Logic: Generates a unique, readable slug immediately upon trend creation.
+    This prevents UUIDs from appearing in the URLs.
+    """
+    if not text:
+        return "haber-detayi"
+
+    # Use the first 7 words for a meaningful URL
+    words = text.split()[:7]
+    base_title = " ".join(words)
+    base_slug = slugify_turkish(base_title)
+
+    unique_slug = base_slug
+    counter = 1
+    while True:
+        # Check if the slug is already taken by another trend
+        existing = db.query(Trend).filter(Trend.slug == unique_slug)
+        if trend_id:
+            existing = existing.filter(Trend.id != trend_id)
+
+        if not existing.first():
+            return unique_slug
+
+        # If taken, append a counter
+        unique_slug = f"{base_slug}-{counter}"
+        counter += 1
+
+def process_item(db, item):
+    """
+    خوشه‌بندی و ذخیره یک آیتم خام دریافت شده از استریم.
+    همان منطقی که قبلاً داخل کالکتورها اجرا می‌شد: Clustering -> Trend -> RawNews -> Arrival.
+    خروجی: وضعیت پردازش برای لاگ (created / appended / duplicate / dropped)
+    """
+    # پیش‌بررسی ارزان لینک‌های شناخته‌شده (Replay پیام‌های Pending)؛ تراکنش خواندن پیش از مرحله کند AI بسته می‌شود
+    # تا اتصال دیتابیس در طول Embedding / جستجوی برداری / Ollama باز (idle in transaction) نماند
+    known = db.query(NewsIngestKey.external_id).filter(NewsIngestKey.external_id == item["external_id"]).first()
+    db.rollback()
+    if known:
+        return "duplicate"
+
+    # --- Step 1: AI Clustering (خارج از تراکنش؛ شناسه برداری قطعی آن را برای Replay ها Idempotent می‌کند) ---
+    cluster_id, _ = ai_engine.process_news(item["content"], item["source_name"], item["external_id"])
+    if not cluster_id:
+        return "dropped"
+
+    # تراکنش کوتاه: کلید یکتا ثبت می‌شود؛ مصرف‌کننده همزمان دوم تا Commit اولی منتظر می‌ماند و سپس Conflict می‌گیرد
+    claimed = db.execute(
+        pg_insert(NewsIngestKey).values(external_id=item["external_id"], created_at=utc_now())
+        .on_conflict_do_nothing(index_elements=[NewsIngestKey.external_id])
+        .returning(NewsIngestKey.external_id)
+    ).first()
+    if claimed is None:
+        db.rollback()
+        return "duplicate"
+
+    arrival_time = item["published_at"]
+
+    # --- Step 2: Trend Management & SEO Slugging ---
+    trend = db.query(Trend).filter(Trend.cluster_id == cluster_id).first()
+
+    if trend:
+        trend.message_count += 1
+        trend.last_updated = arrival_time
+        trend.needs_scoring = True # ASYNC TRIGGER: پرچم‌گذاری برای محاسبه در ورکر پس‌زمینه
+        status = "appended"
+    else:
+        # RSS تیتر مستقل دارد؛ برای تلگرام تیتر اولیه از ابتدای متن ساخته می‌شود
+        if item["title"]:
+            initial_title = item["title"][:120].strip()
+        else:
+            initial_title = item["content"][:70].strip() + "..."
+        trend = Trend(
+            cluster_id=cluster_id,
+            message_count=1,
+            title=initial_title,
+            slug=generate_initial_slug(db, item["title"] or item["content"]), # SEO-First logic
+            first_seen=arrival_time,
+            last_updated=arrival_time,
+            needs_scoring=True # ASYNC TRIGGER: پرچم‌گذاری برای محاسبه اولیه
+        )
+        db.add(trend)
+        db.flush() # Secure the trend.id
+        status = "created"
+
+    # --- Step 3: Raw News Persistence ---
+    news_item = RawNews(
+        source_type=item["source_type"],
+        source_name=item["source_name"],
+        source_tier=item["source_tier"],
+        external_id=item["external_id"],
+        content=item["content"],
+        clean_content=item["clean_content"],
+        content_preview=item["content_preview"],
+        published_at=arrival_time,
+        trend_id=trend.id
+    )
+    db.add(news_item)
+    db.flush()
+
+    # --- Step 4: Record Arrival for Velocity Calculation ---
+    arrival = TrendArrivals(
+        trend_id=trend.id,
+        raw_news_id=news_item.id,
+        timestamp=arrival_time
+    )
+    db.add(arrival)
+    # Rollup نمودار تاریخچه و کارت لیست (تعداد، زمان و منبع آخرین خبر) در همان تراکنش
+    record_arrival(db, trend.id, arrival_time)
+    refresh_card(db, trend, source_sample=item["source_name"])
+    if status == "created":
+        # ترند جدید از همان ابتدا قابل جستجو است (تیتر اولیه + متن اولین خبر)
+        refresh_search_vector(db, trend.id)
+    db.commit()
+
+    # ترند جدید در لیست‌ها ظاهر می‌شود؛ خبر جدید فقط جزئیات ترند موجود را تغییر می‌دهد
+    # (جایگاه آن در لیست پس از امتیازدهی مجدد در TPSCalculator بی‌اعتبار می‌شود)
+    stats_counters.news_stored()
+    if status == "created":
+        stats_counters.trends_activated()
+        trend_cache.invalidate_lists()
+        identifier_index.register(trend.id, trend.slug, trend.cluster_id)
+        live_events.publish(CREATED, trend)
+    else:
+        trend_cache.invalidate_trend(trend.id, lists=False)
+    return status
+
+def process_batch(entries):
+    """
+    پردازش یک دسته از پیام‌های استریم با یک Session مشترک.
+    فقط پیام‌های موفق Ack می‌شوند؛ پیام‌های خطادار Pending می‌مانند تا بعداً Replay شوند.
+    """
+    db = SessionLocal()
+    acked = []
+    try:
+        for msg_id, fields in entries:
+            try:
+                item = parse_item(fields)
+            except Exception as e:
+                # پیام خراب هرگز قابل پردازش نیست؛ مستقیم به Dead-Letter می‌رود
+                ingest_bus.dead_letter(msg_id, fields, f"malformed: {e}")
+                continue
+
+            try:
+                status = process_item(db, item)
+                acked.append(msg_id)
+                if status in ("created", "appended"):
+                    logger.info(f"{'✨' if status == 'created' else '📈'} [{item['source_name']}] {status} | Queued for Scoring.")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ Clustering failed for {msg_id} ({item['external_id']}): {e}")
+    finally:
+        ingest_bus.ack(*acked)
+        db.close()
+    return len(acked)
+
+def main():
+    """
+    حلقه اصلی ورکر خوشه‌بندی.
+    چند نمونه از این ورکر می‌توانند همزمان در یک Consumer Group اجرا شوند.
+    """
+    ingest_bus.ensure_group()
+    consumer = ingest_bus.consumer_name()
+    logger.info(f"🧩 TrendiaTR Cluster Worker '{consumer}' Started (group: {ingest_bus.group}).")
+
+    while True:
+        try:
+            # ۱. اولویت با پیام‌هایی است که مصرف‌کننده‌های قبلی Ack نکرده‌اند
+            entries = ingest_bus.claim_stale(consumer)
+            if entries:
+                logger.info(f"♻️ Replaying {len(entries)} pending entries...")
+            else:
+                # ۲. خواندن پیام‌های جدید (Blocking تا INGEST_BLOCK_MS)
+                entries = ingest_bus.read_batch(consumer)
+
+            if entries:
+                process_batch(entries)
+
+        except KeyboardInterrupt:
+            logger.info("🛑 Service stopped manually.")
+            break
+        except Exception as e:
+            logger.error(f"❌ Critical Worker Loop Error: {e}")
+            time.sleep(10)
+
+if __name__ == "__main__":
+    main()
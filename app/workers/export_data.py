@@ -0,0 +1,46 @@
+import sys
+import os
+import argparse
+import logging
+
+# اضافه کردن مسیر ریشه پروژه به sys.path برای دسترسی به ماژول‌های داخلی
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from app.core.export import DATASETS, FORMATS, DEFAULT_CHUNK_SIZE, export_stream, parse_range
+
+# تنظیمات لاگینگ (روی stderr تا خروجی stdout فقط داده باشد)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', stream=sys.stderr)
+logger = logging.getLogger("ExportData")
+
+def main():
+    """
+    خروجی حجیم برای تحلیل (همان مسیر /api/admin/export):
+    python app/workers/export_data.py raw_news --format parquet --start 2026-01-01 --end 2026-02-01 -o jan.parquet
+    """
+    parser = argparse.ArgumentParser(description="Streaming export of TrendiaTR tables (NDJSON/CSV/Parquet)")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--start", help="ISO date/datetime (UTC), inclusive; default: end - 1 day")
+    parser.add_argument("--end", help="ISO date/datetime (UTC), exclusive; default: now")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start, end = parse_range(args.start, args.end)
+    logger.info(f"📤 Exporting {args.dataset} [{start} .. {end}) as {args.format}...")
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in export_stream(args.dataset, args.format, start, end, args.chunk_size):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    logger.info(f"✅ Export finished: {written} bytes.")
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,22 @@ import os
 import time
 import math
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 # اضافه کردن مسیر ریشه پروژه به sys.path برای دسترسی به ماژول‌های داخلی
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from app.database.models import SessionLocal, Trend
 from app.core.scoring import TPSCalculator
+from app.core.cache import trend_cache
+from app.core.rollups import compact_rollups
+from app.core.counters import stats_counters
+from app.core.relations import refresh_relations
+from app.core.live_events import live_events
+from app.core.cards import refresh_card
+from app.core.partitions import maintain_partitions
+from app.core.archive import archive_inactive_trends
+from app.config import Config
 
 # تنظیمات لاگینگ
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -72,9 +81,36 @@ def process_pending_scores():
     finally:
         db.close()
 
+def refresh_published_relations():
+    """
+    وظیفه ۲: ترندهای مرتبط ترندهایی که تازه خلاصه شده‌اند (Summarizer فقط relations_updated_at را خالی می‌کند
+    تا جستجوی برداری در همین ورکر تک‌نخی انجام شود). در هر چرخه امتیازدهی اجرا می‌شود.
+    """
+    db = SessionLocal()
+    try:
+        published = db.query(Trend).filter(
+            Trend.is_active == True,
+            Trend.relations_updated_at == None,
+            Trend.summary != None,
+            Trend.summary != ""
+        ).limit(Config.RELATIONS_REFRESH_BATCH).all()
+
+        for trend in published:
+            refresh_relations(db, trend)
+        db.commit()
+        if published:
+            trend_cache.invalidate_trends([t.id for t in published], lists=False)
+        return bool(published)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [Relations] Error: {e}")
+        return False
+    finally:
+        db.close()
+
 def apply_gravity_decay():
     """
-    وظیفه ۲: اعمال نرخ میرایی هوشمند (Gravity 2.0).
+    وظیفه ۳: اعمال نرخ میرایی هوشمند (Gravity 2.0).
     """
     db = SessionLocal()
     try:
@@ -91,6 +127,8 @@ def apply_gravity_decay():
         now = datetime.now(timezone.utc).replace(tzinfo=None)
         decay_count = 0
         deactivated_count = 0
+        decayed_ids = []
+        deactivated_ids = []
 
         for trend in active_trends:
             time_diff = now - trend.last_updated
@@ -109,10 +147,17 @@ def apply_gravity_decay():
                 if new_score < 2.0:
                     trend.is_active = False
                     deactivated_count += 1
+                    deactivated_ids.append(trend.id)
                 
+                refresh_card(db, trend)
                 decay_count += 1
+                decayed_ids.append(trend.id)
 
         db.commit()
+        stats_counters.trends_deactivated(deactivated_count)
+        if decayed_ids:
+            trend_cache.invalidate_trends(decayed_ids)
+        live_events.publish_removed(deactivated_ids)
         logger.info(f"✅ [Gravity] Cycle done. Decayed: {decay_count} | Archived: {deactivated_count}")
 
     except Exception as e:
@@ -121,6 +166,88 @@ def apply_gravity_decay():
     finally:
         db.close()
 
+def compact_history_rollups():
+    """
+    وظیفه ۴: حذف بازه‌های ریز Rollup تاریخچه که از مدت نگهداری گذشته‌اند.
+    """
+    db = SessionLocal()
+    try:
+        removed = compact_rollups(db)
+        if removed:
+            logger.info(f"🧹 [Rollups] Compacted {removed} expired fine-grained buckets.")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [Rollups] Error: {e}")
+    finally:
+        db.close()
+
+def refresh_stale_relations():
+    """
+    وظیفه ۵: بازمحاسبه دوره‌ای ترندهای مرتبط برای ترندهای فعالی که خبر جدید ندارند
+    (ترندهای در حال امتیازدهی در TPSCalculator بروزرسانی می‌شوند).
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=Config.RELATIONS_REFRESH_HOURS)
+        stale = db.query(Trend).filter(
+            Trend.is_active == True,
+            (Trend.relations_updated_at == None) | (Trend.relations_updated_at < cutoff)
+        ).order_by(Trend.final_tps.desc()).limit(Config.RELATIONS_REFRESH_BATCH).all()
+
+        for trend in stale:
+            refresh_relations(db, trend)
+        db.commit()
+        if stale:
+            trend_cache.invalidate_trends([t.id for t in stale], lists=False)
+            logger.info(f"🔗 [Relations] Refreshed related trends for {len(stale)} trends.")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [Relations] Error: {e}")
+    finally:
+        db.close()
+
+def reconcile_counters():
+    """
+    وظیفه ۶: همگام‌سازی شمارنده‌های Redis (آمار هدر و بات) با مقادیر دقیق دیتابیس.
+    """
+    db = SessionLocal()
+    try:
+        total_news, active_trends = stats_counters.reconcile(db)
+        logger.info(f"🧮 [Counters] Reconciled: news={total_news} | active trends={active_trends}")
+    except Exception as e:
+        logger.error(f"❌ [Counters] Reconciliation error: {e}")
+    finally:
+        db.close()
+
+def maintain_time_partitions():
+    """
+    وظیفه ۷: ساخت پارتیشن‌های آینده raw_news / trend_arrivals و اعمال سیاست نگهداری (Retention).
+    """
+    try:
+        for table, (created, removed) in maintain_partitions().items():
+            if created or removed:
+                logger.info(f"🗂️ [Partitions] {table}: created={created} | detached={removed}")
+    except Exception as e:
+        logger.error(f"❌ [Partitions] Error: {e}")
+
+def archive_cold_trends():
+    """
+    وظیفه ۸: انتقال ترندهای غیرفعال قدیمی (و اخبار/ورودهایشان) به آرشیو Parquet.
+    صفحات آن‌ها از طریق Read-through در /trend/<slug> همچنان در دسترس است.
+    """
+    if Config.ARCHIVE_AFTER_DAYS <= 0:
+        return
+    db = SessionLocal()
+    try:
+        archived = archive_inactive_trends(db)
+        if archived:
+            logger.info(f"🧊 [Archive] Moved {len(archived)} inactive trends to cold storage.")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ [Archive] Error: {e}")
+    finally:
+        db.close()
+
 def main():
     """
     حلقه اصلی "Worker محاسباتی".
@@ -129,16 +256,25 @@ def main():
     logger.info("🪐 TrendiaTR Calculation Worker (Async Scoring + Gravity 2.0) Started.")
     
     last_decay_time = time.time()
+    # مقداردهی اولیه شمارنده‌ها در شروع ورکر
+    reconcile_counters()
+    maintain_time_partitions()
     
     while True:
         try:
-            # ۱. اولویت بالا: امتیازدهی به اخبار جدید
+            # ۱. اولویت بالا: امتیازدهی به اخبار جدید و ترندهای مرتبط ترندهای تازه خلاصه‌شده (وظایف ۱ و ۲)
             did_work = process_pending_scores()
+            did_work = refresh_published_relations() or did_work
             
-            # ۲. اولویت پایین: بررسی زمان اجرای Gravity
+            # ۲. اولویت پایین: وظایف دوره‌ای Gravity (وظایف ۳ تا ۸)
             current_time = time.time()
             if current_time - last_decay_time > DECAY_CHECK_INTERVAL:
                 apply_gravity_decay()
+                compact_history_rollups()
+                refresh_stale_relations()
+                reconcile_counters()
+                maintain_time_partitions()
+                archive_cold_trends()
                 last_decay_time = current_time
             
             # مدیریت هوشمند خواب: اگر کار بود فقط ۱ ثانیه، اگر نبود ۵ ثانیه صبر کن
@@ -4,6 +4,9 @@ import time
 import json
 import re
 import csv
+import threading
+import redis
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from google import genai
 from google.genai import types
@@ -12,10 +15,19 @@ from google.genai import types
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from app.database.models import SessionLocal, Trend, RawNews, SystemSettings
 from sqlalchemy import desc
+from sqlalchemy.orm import load_only
 from app.config import Config
 from app.core.indexing_utils import notify_google 
 from app.core.text_utils import slugify_turkish 
 from app.core.alert_service import alert_service
+from app.core.cache import trend_cache
+from app.core.search import refresh_search_vector
+from app.core.counters import stats_counters
+from app.core.live_events import live_events, SUMMARIZED
+from app.core.cards import refresh_card
+from app.core.identifiers import identifier_index
+from app.core.rate_limit import TokenBucket
+from app.core.prompt_context import build_cluster_context
 
 # --- Google AI & System Configuration ---
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -25,6 +37,7 @@ if not GOOGLE_API_KEY:
 client = None
 MODEL_NAME = None 
 LOG_FILE = "ai_monitor_data.csv"
+log_lock = threading.Lock()
 
 # دریافت آدرس سایت از محیط؛ در صورت عدم وجود از دامنه واقعی استفاده می‌شود تا تلگرام خطا ندهد
 BASE_SITE_URL = os.getenv("BASE_SITE_URL", "https://trendiatr.com") 
@@ -32,6 +45,75 @@ BASE_SITE_URL = os.getenv("BASE_SITE_URL", "https://trendiatr.com")
 # Scoring threshold for instant Google Indexing (SEO Step)
 GOOGLE_INDEXING_THRESHOLD = 25
 
+# Bounded-concurrency summarization: Gemini calls share one token bucket sized to the API quota;
+# Telegram publishing and Google indexing run on their own small pool
+summary_pool = ThreadPoolExecutor(max_workers=Config.SUMMARY_CONCURRENCY, thread_name_prefix="summary")
+side_effect_pool = ThreadPoolExecutor(max_workers=Config.SUMMARY_SIDE_EFFECT_WORKERS, thread_name_prefix="side-effects")
+gemini_limiter = TokenBucket(rate=Config.GEMINI_RPM / 60.0, capacity=Config.GEMINI_BURST)
+# Gemini also enforces input tokens per minute: each call takes its estimated prompt size
+gemini_token_limiter = TokenBucket(rate=Config.GEMINI_TPM / 60.0, capacity=Config.GEMINI_TOKEN_BURST)
+# Instructions and JSON schema of the prompt around the news context
+PROMPT_TEMPLATE_TOKENS = 200
+
+class SummaryRetries:
+    """
+    Per-trend retry schedule for failed or empty summaries (Redis hash trend_id -> "attempts:retry_at").
+    Each failure doubles the wait from SUMMARY_RETRY_BASE_SECONDS up to SUMMARY_RETRY_MAX_SECONDS,
+    so one bad trend cannot spend a Gemini token on every loop pass.
+    """
+    KEY = "ttw:summary_retries"
+    # Entries of trends that were never retried (decayed, deleted) are dropped after this
+    PRUNE_AFTER_SECONDS = 86400
+
+    def __init__(self):
+        try:
+            self.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            self.redis = None
+            print(f"❌ Summary retry schedule disabled (Redis): {e}")
+
+    def waiting(self):
+        """Trend ids whose next attempt is not due yet."""
+        if not self.redis: return set()
+        try:
+            entries = self.redis.hgetall(self.KEY)
+        except Exception as e:
+            print(f"⚠️ Summary retry schedule read failed: {e}")
+            return set()
+        now = time.time()
+        waiting, expired = set(), []
+        for trend_id, value in entries.items():
+            retry_at = float(value.split(":")[1])
+            if retry_at > now:
+                waiting.add(int(trend_id))
+            elif now - retry_at > self.PRUNE_AFTER_SECONDS:
+                expired.append(trend_id)
+        if expired:
+            self.clear(*expired)
+        return waiting
+
+    def failed(self, trend_id):
+        """Records a failed attempt and schedules the next one; returns the attempt count."""
+        if not self.redis: return 1
+        try:
+            value = self.redis.hget(self.KEY, trend_id)
+            attempts = int(value.split(":")[0]) + 1 if value else 1
+            delay = min(Config.SUMMARY_RETRY_BASE_SECONDS * 2 ** (attempts - 1), Config.SUMMARY_RETRY_MAX_SECONDS)
+            self.redis.hset(self.KEY, trend_id, f"{attempts}:{time.time() + delay}")
+            return attempts
+        except Exception as e:
+            print(f"⚠️ Summary retry schedule write failed: {e}")
+            return 1
+
+    def clear(self, *trend_ids):
+        if not self.redis or not trend_ids: return
+        try:
+            self.redis.hdel(self.KEY, *trend_ids)
+        except Exception as e:
+            print(f"⚠️ Summary retry schedule delete failed: {e}")
+
+summary_retries = SummaryRetries()
+
 # Junk keywords for final filtering (Safety Layer)
 JUNK_KEYWORDS = ['burç', 'fal ', 'günlük burç', 'astroloji', 'horoskop', 'astrolog']
 
@@ -48,7 +130,8 @@ def log_to_csv(trend_id, model, in_tok, out_tok, duration, category, status):
         # Input: $0.075 / 1M | Output: $0.30 / 1M
         cost = (in_tok * 0.000000075) + (out_tok * 0.00000030)
         
-        with open(LOG_FILE, mode='a', newline='', encoding='utf-8') as f:
+        # Summary threads share the file
+        with log_lock, open(LOG_FILE, mode='a', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow([
                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -288,97 +371,192 @@ def generate_summary_with_gemini(text_cluster):
         print(f"   ❌ LLM Execution Error: {e}")
         return None, 0, 0, 0
 
-def process_pending_trends():
-    """Fetches high-TPS trends, processes them with AI, and updates SEO slugs"""
-    db = SessionLocal()
+def read_publish_threshold(db):
+    """آستانه انتشار خودکار از تنظیمات سیستم (فاز ۵.۳)"""
+    threshold_setting = db.query(SystemSettings).filter(SystemSettings.key == "auto_publish_threshold").first()
+    return float(threshold_setting.value) if threshold_setting else 35.0
+
+def run_side_effects(title, summary, category, slug, final_tps, publish_threshold):
+    """Telegram channel publish + Google Indexing, off the summarization critical path"""
+    target_url = f"{BASE_SITE_URL}/trend/{slug}"
     try:
-        # Fetching high-priority trends for summarization
-        pending_trends = db.query(Trend).filter(
-            (Trend.summary == None) | (Trend.summary == ""),
-            Trend.final_tps >= 20,
-            Trend.is_active == True
-        ).order_by(desc(Trend.final_tps)).limit(5).all()
+        # --- فاز ۵.۳: انتشار خودکار با آستانه داینامیک ---
+        if final_tps >= publish_threshold:
+            alert_service.publish_to_channel(
+                title=title,
+                summary=summary,
+                category=category,
+                url=target_url
+            )
+            print(f"   📢 Automatically published to Public Channel: {slug}")
 
-        if not pending_trends: return False
+        # Notify Google for instant indexing
+        if final_tps >= GOOGLE_INDEXING_THRESHOLD:
+            success, msg = notify_google(target_url)
+            if success: print(f"   🔗 Pushed to Google Indexing API: {slug}")
+            else: print(f"   ⚠️ SEO Indexing Warning: {msg}")
+    except Exception as e:
+        print(f"   ⚠️ Side Effect Error ({slug}): {e}")
+
+def discard_trend(db, trend_id, reason):
+    """Marks a trend inactive (irrelevant content or out of summary attempts)"""
+    db.query(Trend).filter(Trend.id == trend_id).update({Trend.is_active: False}, synchronize_session=False)
+    db.commit()
+    summary_retries.clear(trend_id)
+    stats_counters.trends_deactivated()
+    trend_cache.invalidate_trend(trend_id)
+    live_events.publish_removed([trend_id])
+    print(f"   🗑️  Discarded Trend {trend_id} ({reason})")
+
+def summary_failed(db, trend_id, reason):
+    """Schedules the next attempt with backoff; gives up after SUMMARY_MAX_ATTEMPTS"""
+    attempts = summary_retries.failed(trend_id)
+    if attempts >= Config.SUMMARY_MAX_ATTEMPTS:
+        discard_trend(db, trend_id, f"{reason}, {attempts} attempts")
+    else:
+        print(f"   ⏳ Summary attempt {attempts}/{Config.SUMMARY_MAX_ATTEMPTS} failed for trend {trend_id}: {reason}")
+
+def summarize_trend(trend_id, publish_threshold):
+    """Summarizes one trend in its own session (runs on the summary pool)"""
+    db = SessionLocal()
+    try:
+        trend = db.get(Trend, trend_id)
+        # Another pass may have summarized or discarded it meanwhile
+        if not trend or trend.summary or not trend.is_active: return
+
+        # Aggregate news context for the trend: most authoritative and newest first,
+        # reposts removed, fitted to the prompt token budget
+        news_items = db.query(RawNews).options(load_only(
+            RawNews.source_tier, RawNews.published_at, RawNews.clean_content, RawNews.content
+        )).filter(RawNews.trend_id == trend.id).order_by(
+            RawNews.source_tier, desc(RawNews.published_at)
+        ).limit(Config.SUMMARY_CONTEXT_CANDIDATES).all()
+        cluster_text, context = build_cluster_context(news_items) if news_items else (None, None)
+        if not cluster_text:
+            summary_failed(db, trend_id, "no news context")
+            return
+        print(f"   🧾 Context for trend {trend.id}: {context.used}/{context.candidates} items, "
+              f"{context.duplicates} duplicates dropped, ~{context.tokens} tokens")
+
+        # Generate AI Content (waits for a slot of the Gemini request and input-token quotas)
+        gemini_limiter.acquire()
+        gemini_token_limiter.acquire(context.tokens + PROMPT_TEMPLATE_TOKENS)
+        ai_result, in_tok, out_tok, duration = generate_summary_with_gemini(cluster_text)
+
+        if not ai_result:
+            # API error or unparsable response: retried later with backoff
+            log_to_csv(trend.id, MODEL_NAME, in_tok, out_tok, duration, trend.category, "Failed")
+            summary_failed(db, trend_id, "no response")
+        elif not ai_result.get("is_relevant_to_turkey", True):
+            # Mark irrelevant content as inactive
+            discard_trend(db, trend_id, "Irrelevant Content")
+        elif not ai_result.get("summary"):
+            log_to_csv(trend.id, MODEL_NAME, in_tok, out_tok, duration, trend.category, "Empty")
+            summary_failed(db, trend_id, "empty summary")
+        else:
+            ai_cat = ai_result.get("category", "Gündem")
+            
+            # Verify category through manual keyword analysis
+            final_category, overridden = decide_final_category(ai_cat, cluster_text)
+            
+            # Update Trend Record
+            trend.title = ai_result.get("headline", trend.title)
+            trend.summary = ai_result["summary"]
+            trend.category = final_category 
+            
+            # SEO CRITICAL: Upgrade temporary slug to professional slug
+            old_slug = trend.slug
+            trend.slug = generate_unique_slug(db, trend.title, trend.id)
+            trend.last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
 
-        print(f"✍️  Processing {len(pending_trends)} High-TPS Trends...")
+            print(f"   ✅ Published: [{trend.category}] {trend.title} (TPS: {trend.final_tps:.1f})")
+            print(f"   🚀 SEO Slug: /trend/{trend.slug}")
+            
+            # Save and Log Stats
+            log_to_csv(trend.id, MODEL_NAME, in_tok, out_tok, duration, trend.category, "Success")
+            db.flush()
+            # تیتر و خلاصه جدید در بردار جستجو (وزن A و B)
+            refresh_search_vector(db, trend.id)
+            # ترندهای مرتبط با جستجوی برداری در ورکر Gravity (تک‌نخی) محاسبه می‌شوند؛
+            # مدل Embedding و کلاینت Chroma در نخ‌های این Pool بارگذاری نمی‌شوند
+            trend.relations_updated_at = None
+            refresh_card(db, trend)
+            db.commit()
+            summary_retries.clear(trend.id)
+            trend_cache.invalidate_trend(trend.id)
+            # اسلاگ قدیمی همچنان به همین ترند اشاره می‌کند (ریدایرکت 301 به آدرس جدید)
+            identifier_index.register(trend.id, trend.slug, old_slug)
+            live_events.publish(SUMMARIZED, trend)
+            if trend.first_seen:
+                stats_counters.record_time_to_summary((trend.last_updated - trend.first_seen).total_seconds())
+
+            side_effect_pool.submit(
+                run_side_effects, trend.title, trend.summary, trend.category, trend.slug,
+                trend.final_tps, publish_threshold
+            )
+    except Exception as e:
+        db.rollback()
+        print(f"   ❌ Summarization Error (trend {trend_id}): {e}")
+        try:
+            summary_failed(db, trend_id, "error")
+        except Exception as inner:
+            db.rollback()
+            print(f"   ❌ Retry bookkeeping failed (trend {trend_id}): {inner}")
+    finally:
+        db.close()
 
-        for trend in pending_trends:
-            # Aggregate news context for the trend
-            news_items = db.query(RawNews).filter(RawNews.trend_id == trend.id).limit(15).all()
-            if not news_items: continue
+def process_pending_trends(in_flight):
+    """
+    Keeps the summary pool busy: reaps finished trends and tops the in-flight set up
+    with the highest-TPS pending trends (a small queue ahead of the Gemini limiter).
+    in_flight: {trend_id: Future}, owned by the main loop.
+    """
+    for trend_id in [tid for tid, future in in_flight.items() if future.done()]:
+        del in_flight[trend_id]
 
-            cluster_text = "\n".join([f"- {n.content[:1000]}" for n in news_items])
+    free_slots = Config.SUMMARY_CONCURRENCY * 2 - len(in_flight)
+    if free_slots <= 0: return True
 
-            # Generate AI Content
-            ai_result, in_tok, out_tok, duration = generate_summary_with_gemini(cluster_text)
-            
-            if ai_result and ai_result.get("is_relevant_to_turkey", True):
-                ai_cat = ai_result.get("category", "Gündem")
-                
-                # Verify category through manual keyword analysis
-                final_category, overridden = decide_final_category(ai_cat, cluster_text)
-                
-                # Update Trend Record
-                trend.title = ai_result.get("headline", trend.title)
-                trend.summary = ai_result.get("summary", "")
-                trend.category = final_category 
-                
-                # SEO CRITICAL: Upgrade temporary slug to professional slug
-                trend.slug = generate_unique_slug(db, trend.title, trend.id)
-                trend.last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
-
-                print(f"   ✅ Published: [{trend.category}] {trend.title} (TPS: {trend.final_tps:.1f})")
-                print(f"   🚀 SEO Slug: /trend/{trend.slug}")
-                
-                # Save and Log Stats
-                log_to_csv(trend.id, MODEL_NAME, in_tok, out_tok, duration, trend.category, "Success")
-                db.commit()
-
-                # --- فاز ۵.۳: انتشار خودکار با آستانه داینامیک ---
-                # دریافت آستانه از تنظیمات سیستم
-                threshold_setting = db.query(SystemSettings).filter(SystemSettings.key == "auto_publish_threshold").first()
-                publish_threshold = float(threshold_setting.value) if threshold_setting else 35.0
-                
-                if trend.final_tps >= publish_threshold:
-                    target_url = f"{BASE_SITE_URL}/trend/{trend.slug}"
-                    alert_service.publish_to_channel(
-                        title=trend.title,
-                        summary=trend.summary,
-                        category=trend.category,
-                        url=target_url
-                    )
-                    print(f"   📢 Automatically published to Public Channel.")
-
-                # Notify Google for instant indexing
-                if trend.final_tps >= GOOGLE_INDEXING_THRESHOLD:
-                    target_url = f"{BASE_SITE_URL}/trend/{trend.slug}"
-                    success, msg = notify_google(target_url)
-                    if success: print(f"   🔗 Pushed to Google Indexing API.")
-                    else: print(f"   ⚠️ SEO Indexing Warning: {msg}")
-
-            else:
-                # Mark irrelevant or failed content as inactive
-                trend.is_active = False 
-                db.commit()
-                print(f"   🗑️  Discarded Trend {trend.id} (Irrelevant Content)")
-
-        return True
+    db = SessionLocal()
+    try:
+        # Fetching high-priority trends for summarization
+        query = db.query(Trend.id).filter(
+            (Trend.summary == None) | (Trend.summary == ""),
+            Trend.final_tps >= 20,
+            Trend.is_active == True
+        )
+        # Trends already in flight or waiting out a retry backoff are skipped
+        skipped = set(in_flight) | summary_retries.waiting()
+        if skipped:
+            query = query.filter(Trend.id.notin_(list(skipped)))
+        pending_ids = [row.id for row in query.order_by(desc(Trend.final_tps)).limit(free_slots).all()]
+        if not pending_ids: return bool(in_flight)
+
+        publish_threshold = read_publish_threshold(db)
     finally:
         db.close()
 
+    print(f"✍️  Queued {len(pending_ids)} High-TPS Trends ({len(in_flight)} in flight)...")
+    for trend_id in pending_ids:
+        in_flight[trend_id] = summary_pool.submit(summarize_trend, trend_id, publish_threshold)
+    return True
+
 def main():
     """Continuous worker loop for AI Summarization Service"""
-    print(f"🤖 TrendiaTR AI Summary Worker Active. Current Model: {MODEL_NAME}")
+    print(f"🤖 TrendiaTR AI Summary Worker Active. Current Model: {MODEL_NAME} "
+          f"(concurrency: {Config.SUMMARY_CONCURRENCY}, quota: {Config.GEMINI_RPM:g} RPM / {Config.GEMINI_TPM} TPM)")
+    in_flight = {}
     while True:
         try:
-            has_work = process_pending_trends()
+            has_work = process_pending_trends(in_flight)
             # Dynamic sleep based on workload
             time.sleep(1 if has_work else 15)
         except KeyboardInterrupt: break
         except Exception as e:
             print(f"❌ Worker Loop Exception: {e}")
             time.sleep(30)
+    summary_pool.shutdown(wait=True)
+    side_effect_pool.shutdown(wait=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
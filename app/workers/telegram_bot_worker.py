@@ -3,14 +3,16 @@ import sys
 import time
 import logging
 import telebot
-from datetime import datetime, timedelta
 from sqlalchemy import desc
 
 # افزودن مسیر اصلی پروژه
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from app.config import Config
-from app.database.models import SessionLocal, Trend, RawNews
+from app.database.models import SessionLocal, Trend
+from app.core.counters import stats_counters
+from app.core.cache import trend_cache
+from app.core.live_events import live_events
 
 # تنظیمات لاگر
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -44,8 +46,14 @@ def handle_callback_actions(call):
             return
 
         if action == "del":
+            was_active = trend.is_active
             trend.is_active = False
             db.commit()
+            if was_active:
+                stats_counters.trends_deactivated()
+            # صفحه SSR، جزئیات و لیست‌ها فوراً منقضی می‌شوند
+            trend_cache.invalidate_trend(trend.id)
+            live_events.publish_removed([trend.id])
             bot.answer_callback_query(call.id, "ترند با موفقیت حذف شد.")
             bot.edit_message_text(
                 chat_id=call.message.chat.id,
@@ -87,25 +95,35 @@ def send_welcome(message):
 @bot.message_handler(commands=['stats'])
 def get_stats(message):
     if not is_admin(message.chat.id): return
-    db = SessionLocal()
     try:
-        total_news = db.query(RawNews).count()
-        active_trends = db.query(Trend).filter(Trend.is_active == True).count()
-        
-        last_24h = datetime.now() - timedelta(hours=24)
-        news_24h = db.query(RawNews).filter(RawNews.created_at >= last_24h).count()
-        
+        # همه اعداد از شمارنده‌های Redis خوانده می‌شوند (بدون اسکن جدول raw_news)
+        total_news, active_trends, stale = stats_counters.totals()
+
+        news_24h = stats_counters.ingested_last_24h()
+        by_source = stats_counters.ingested_by_source()
+        by_type = {}
+        for key, count in by_source.items():
+            source_type = key.split(':', 1)[0]
+            by_type[source_type] = by_type.get(source_type, 0) + count
+        top_sources = sorted(by_source.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        summaries, avg_sec, max_sec = stats_counters.time_to_summary_last_24h()
+
         msg = (
             "📊 <b>وضعیت پردازش سیستم</b>\n\n"
-            f"🗞 اخبار دریافت شده: <code>{total_news}</code>\n"
+            + ("⚠️ شمارنده‌ها در دسترس نیستند؛ آخرین مقادیر نمایش داده می‌شود.\n" if stale else "") +
+            f"🗞 اخبار ذخیره شده: <code>{total_news}</code>\n"
             f"🔥 خوشه‌های فعال: <code>{active_trends}</code>\n"
-            f"⏱ ورودی ۲۴ ساعت اخیر: <code>{news_24h}</code> خبر"
+            f"⏱ ورودی ۲۴ ساعت اخیر: <code>{news_24h}</code> خبر\n"
+            f"📅 ورودی امروز: " + " | ".join(f"{t}: <code>{c}</code>" for t, c in sorted(by_type.items())) + "\n"
+            f"✍️ خلاصه‌های ۲۴ ساعت اخیر: <code>{summaries}</code> | زمان تا خلاصه: "
+            f"میانگین <code>{avg_sec / 60:.1f}</code> دقیقه، حداکثر <code>{max_sec / 60:.1f}</code> دقیقه"
         )
+        if top_sources:
+            msg += "\n\n🏆 <b>منابع فعال امروز:</b>\n"
+            msg += "\n".join(f"{i}. {key.split(':', 1)[1]} — <code>{count}</code>" for i, (key, count) in enumerate(top_sources, 1))
         bot.reply_to(message, msg, parse_mode="HTML")
     except Exception as e:
         bot.reply_to(message, "خطا در دریافت آمار.")
-    finally:
-        db.close()
 
 @bot.message_handler(commands=['top'])
 def get_top_trends(message):
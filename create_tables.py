@@ -1,12 +1,12 @@
-from app.database.models import Base, engine
+from app.database.migrations import migrate
 
 def init_db():
-    print("⏳ Creating database tables...")
+    print("⏳ Applying database migrations...")
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tables created successfully!")
+        migrate()
+        print("✅ Database schema is up to date!")
     except Exception as e:
-        print(f"❌ Error creating tables: {e}")
+        print(f"❌ Error migrating database: {e}")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
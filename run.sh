@@ -31,6 +31,10 @@ python3 app/collectors/telegram_bot.py > logs/telegram.log 2>&1 &
 echo "📰 Starting RSS Fetcher... (Logs: logs/rss.log)"
 python3 app/collectors/rss_fetcher.py > logs/rss.log 2>&1 &
 
+# 2.5. اجرای ورکر خوشه‌بندی (مصرف‌کننده صف Redis)
+echo "🧩 Starting Cluster Worker... (Logs: logs/cluster.log)"
+python3 app/workers/cluster_worker.py > logs/cluster.log 2>&1 &
+
 # 3. اجرای هوش مصنوعی (در پس‌زمینه)
 echo "🧠 Starting AI Summarizer... (Logs: logs/ai.log)"
 python3 app/workers/summarizer.py > logs/ai.log 2>&1 &
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: legacy BeautifulSoup cleaning vs. app.core.preprocessing.
+
+Samples are real feed items: by default the latest rows of raw_news, or (with --rss)
+entries fetched live from app/collectors/rss_sources.txt.
+
+    python3 scripts/bench_preprocessing.py --limit 2000
+    python3 scripts/bench_preprocessing.py --rss --rounds 5
+"""
+import os
+import sys
+import re
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import preprocessing
+
+
+def legacy_clean_text(text):
+    """The previous text_utils.clean_text (html.parser tree per input + five re.sub passes)."""
+    from bs4 import BeautifulSoup
+    if not text:
+        return ""
+    try:
+        soup = BeautifulSoup(text, "html.parser")
+        for section in soup.find_all("section", class_="mceNonEditable"):
+            section.decompose()
+        text = soup.get_text(separator=" ")
+    except Exception:
+        text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'http\S+|www\.\S+', '', text)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#\w+', '', text)
+    text = re.sub(r'[^\w\sçğıöşüÇĞİÖŞÜ,.?!-]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def load_db_samples(limit):
+    from sqlalchemy import desc
+    from app.database.models import SessionLocal, RawNews
+    db = SessionLocal()
+    try:
+        rows = db.query(RawNews.content).order_by(desc(RawNews.id)).limit(limit).all()
+        return [r.content for r in rows if r.content]
+    finally:
+        db.close()
+
+
+def load_rss_samples(limit):
+    import feedparser
+    from app.collectors.rss_fetcher import load_rss_sources
+    samples = []
+    for url in load_rss_sources().values():
+        for entry in feedparser.parse(url).entries:
+            summary = entry.get('summary', '') or entry.get('description', '')
+            samples.append(f"{entry.get('title', '')}. {summary}")
+            if len(samples) >= limit:
+                return samples
+    return samples
+
+
+def bench(label, func, samples, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(samples)
+        best = min(best, time.perf_counter() - start)
+    per_item_us = best / len(samples) * 1e6
+    print(f"{label:<32} {best * 1000:9.1f} ms total | {per_item_us:8.1f} µs/item")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text preprocessing on real feed samples")
+    parser.add_argument("--limit", type=int, default=1000, help="number of samples")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions (best time is reported)")
+    parser.add_argument("--rss", action="store_true", help="fetch samples live from RSS feeds instead of raw_news")
+    args = parser.parse_args()
+
+    samples = load_rss_samples(args.limit) if args.rss else load_db_samples(args.limit)
+    if not samples:
+        print("❌ No samples found.")
+        return
+
+    html_share = sum(1 for s in samples if preprocessing.has_markup(s)) / len(samples) * 100
+    print(f"📊 {len(samples)} samples | {html_share:.1f}% contain markup | backend: {preprocessing.HTML_BACKEND}\n")
+
+    legacy = bench("legacy clean_text (bs4)", lambda xs: [legacy_clean_text(x) for x in xs], samples, args.rounds)
+    fast = bench("preprocessing.clean_batch", preprocessing.clean_batch, samples, args.rounds)
+    bench("preprocessing.display_batch", preprocessing.display_batch, samples, args.rounds)
+    print(f"\n⚡ Speed-up (clean_text): x{legacy / fast:.1f}")
+
+    mismatches = sum(1 for s in samples if legacy_clean_text(s) != preprocessing.clean_text(s))
+    print(f"ℹ️  Outputs differing from legacy: {mismatches}/{len(samples)} (separator/script handling)")
+
+
+if __name__ == "__main__":
+    main()
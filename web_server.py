@@ -2,7 +2,7 @@ import os
 import logging
 from flask import Flask
 from app.api.routes import api_bp
-from app.database.models import init_db
+from app.database.migrations import check_schema_version
 
 # تنظیمات لاگر برای مانیتورینگ متمرکز سیستم
 logging.basicConfig(
@@ -30,14 +30,18 @@ def create_app():
     # ثبت بلوپرینت اصلی API و مسیرهای مسیریابی (Routing)
     app.register_blueprint(api_bp)
 
-    # اطمینان از آماده‌سازی دیتابیس در بدو ورود به اپلیکیشن
+    # فقط بررسی نسخه اسکیما (یک SELECT)؛ مهاجرت‌ها یک بار توسط سرویس db_init اجرا می‌شوند
+    # (python3 -m app.database.migrations migrate) تا ورکرهای Gunicorn هنگام بالا آمدن قفل DDL نگیرند.
+    # اسکیمای قدیمی‌تر از کد: راه‌اندازی متوقف می‌شود. دیتابیس در دسترس نیست: /healthz تا رفع مشکل 503 می‌دهد
     with app.app_context():
         try:
-            # فراخوانی تابع هماهنگ‌سازی دیتابیس (برگرفته از منطق اصلی فایل قبلی)
-            init_db()
-            logger.info("✅ Database schemas verified and synchronized.")
+            version, latest = check_schema_version()
         except Exception as e:
-            logger.error(f"❌ Database Initialization Error: {e}")
+            logger.error(f"❌ Database schema check failed: {e}")
+        else:
+            if version < latest:
+                raise RuntimeError(f"Database schema is at version {version}, code expects {latest}; run migrations first.")
+            logger.info(f"✅ Database schema verified (version {version}).")
 
     return app
 